@@ -0,0 +1,337 @@
+"""
+Conformal Prediction Intervals
+
+Split-conformal intervals for models that only produce point forecasts
+(XGBoost, LightGBM, SeasonalNaive, Naive), calibrated on the residuals of
+rolling-origin windows that were already forecast:
+- conformal_offsets: per-horizon residual quantiles for stacked
+  (segment, model, window, horizon) residuals, all segments and models in one
+  sort; optionally pooled across segments on a scale-free basis
+- sequential_intervals: intervals for every cross-validation window from the
+  windows before it, so CV results get intervals without extra fits
+- attach_conformal: add yhat_lower/yhat_upper to cross_validate-style results
+- truncate_segment: a segment without its last periods, for calibration
+  windows that end before the holdout
+- conformal_backtest: coverage of per-segment vs cross-segment calibration
+  on the last of several rolling-origin windows
+
+Quantiles use the finite-sample split-conformal rank ceil((n + 1)(1 - alpha));
+with fewer calibration residuals than that rank needs, the largest residual is
+used (slight under-coverage instead of an infinite interval). horizon_pool
+borrows residuals from neighbouring horizon steps to grow small calibration sets.
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from forecast_metrics import MetricEngine
+
+
+ALPHA = 0.05
+METHODS = ('symmetric', 'asymmetric')
+
+
+def _rank_values(sorted_values: np.ndarray, n: np.ndarray, rank: np.ndarray) -> np.ndarray:
+    """Value of 1-based `rank` along the last axis of NaN-last sorted values (NaN where n == 0)."""
+    index = np.clip(rank, 1, np.maximum(n, 1)) - 1
+    values = np.take_along_axis(sorted_values, index[..., None], axis=-1)[..., 0]
+    return np.where(n > 0, values, np.nan)
+
+
+def _pool_horizons(residuals: np.ndarray, width: int) -> np.ndarray:
+    """Stack residuals from steps h-width..h+width onto the window axis (NaN past the ends)."""
+    if width <= 0:
+        return residuals
+
+    horizon = residuals.shape[-1]
+    shifted = []
+    for offset in range(-width, width + 1):
+        block = np.full(residuals.shape, np.nan)
+        if offset >= 0:
+            block[..., :horizon - offset] = residuals[..., offset:]
+        else:
+            block[..., -offset:] = residuals[..., :horizon + offset]
+        shifted.append(block)
+    return np.concatenate(shifted, axis=-2)
+
+
+def conformal_offsets(
+    residuals: np.ndarray,
+    alpha: float = ALPHA,
+    method: str = 'symmetric',
+    pool_segments: bool = False,
+    horizon_pool: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-horizon interval offsets from calibration residuals.
+
+    Args:
+        residuals: (segment, model, window, horizon) actual - forecast; NaN = missing
+        alpha: Miscoverage (0.05 -> 95% intervals)
+        method: 'symmetric' (quantile of |residual|) or 'asymmetric' (alpha/2 and
+            1 - alpha/2 quantiles of the signed residuals, absorbs bias)
+        pool_segments: Pool residuals across segments after dividing each
+            segment x model by its calibration MAE (more residuals per quantile)
+        horizon_pool: Also use residuals from this many neighbouring steps
+
+    Returns:
+        (lower, upper) offsets shaped (segment, model, horizon): the interval is
+        [yhat + lower, yhat + upper]
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+
+    residuals = np.asarray(residuals, dtype=float)
+    n_segments = residuals.shape[0]
+
+    scale = None
+    if pool_segments:
+        with np.errstate(invalid='ignore'):
+            scale = np.nanmean(np.abs(residuals), axis=(2, 3), keepdims=True)
+        scale = np.where(scale > 0, scale, 1.0)
+        residuals = residuals / scale
+
+    calibration = _pool_horizons(residuals, horizon_pool)
+    # (segment, model, horizon, calibration); pooled: every segment's calibration on one axis
+    calibration = np.moveaxis(calibration, 2, -1)
+    if pool_segments:
+        calibration = np.moveaxis(calibration, 0, -2).reshape(1, *calibration.shape[1:3], -1)
+
+    if method == 'symmetric':
+        values = np.sort(np.abs(calibration), axis=-1)
+        n = np.sum(~np.isnan(values), axis=-1)
+        upper = _rank_values(values, n, np.ceil((n + 1) * (1 - alpha)).astype(int))
+        lower = -upper
+    else:
+        values = np.sort(calibration, axis=-1)
+        n = np.sum(~np.isnan(values), axis=-1)
+        lower = _rank_values(values, n, np.floor((n + 1) * (alpha / 2)).astype(int))
+        upper = _rank_values(values, n, np.ceil((n + 1) * (1 - alpha / 2)).astype(int))
+
+    if pool_segments:
+        lower = np.broadcast_to(lower, (n_segments,) + lower.shape[1:]) * scale[..., 0]
+        upper = np.broadcast_to(upper, (n_segments,) + upper.shape[1:]) * scale[..., 0]
+
+    return lower, upper
+
+
+def sequential_intervals(
+    y_true: np.ndarray,
+    y_pred: np.ndarray,
+    alpha: float = ALPHA,
+    min_windows: int = 1,
+    **offset_kwargs,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Conformal bounds for every window, calibrated only on the windows before it.
+
+    Args:
+        y_true: (segment, window, horizon) or (segment, model, window, horizon) actuals
+        y_pred: (segment, model, window, horizon) forecasts
+        alpha: Miscoverage
+        min_windows: Earlier windows required before a window gets intervals
+        **offset_kwargs: conformal_offsets options (method, pool_segments, horizon_pool)
+
+    Returns:
+        (lower, upper) bounds shaped like y_pred; NaN for windows without enough history
+    """
+    y_pred = np.asarray(y_pred, dtype=float)
+    y_true = np.asarray(y_true, dtype=float)
+    if y_true.ndim == 3:
+        y_true = y_true[:, None]
+    residuals = y_true - y_pred
+
+    lower = np.full(y_pred.shape, np.nan)
+    upper = np.full(y_pred.shape, np.nan)
+    for w in range(min_windows, y_pred.shape[2]):
+        lo, hi = conformal_offsets(residuals[:, :, :w], alpha, **offset_kwargs)
+        lower[:, :, w] = y_pred[:, :, w] + lo
+        upper[:, :, w] = y_pred[:, :, w] + hi
+
+    return lower, upper
+
+
+def attach_conformal(
+    results: Dict[str, Dict[str, Dict]],
+    alpha: float = ALPHA,
+    models: Optional[Sequence[str]] = None,
+    min_windows: int = 1,
+    **offset_kwargs,
+) -> float:
+    """
+    Add conformal yhat_lower/yhat_upper to cross-validation results in place.
+
+    Args:
+        results: Segment -> model -> {'predictions': {'yhat', 'actuals' (window, horizon), ...}}
+            (ForecastBenchmark.cross_validate output per segment)
+        alpha: Miscoverage
+        models: Models to give intervals (default: every model without them)
+        min_windows: Earlier windows required before a window gets intervals
+        **offset_kwargs: conformal_offsets options (method, pool_segments, horizon_pool)
+
+    Returns:
+        Seconds spent (stacking, quantiles and writing bounds)
+    """
+    start = time.perf_counter()
+
+    if models is None:
+        models = sorted({
+            name for segment_results in results.values()
+            for name, result in segment_results.items()
+            if 'predictions' in result and result['predictions'].get('yhat_lower') is None
+        })
+    selected = {
+        segment: {name: result for name, result in segment_results.items() if name in models and 'predictions' in result}
+        for segment, segment_results in results.items()
+    }
+    selected = {segment: segment_results for segment, segment_results in selected.items() if segment_results}
+    if not selected:
+        return time.perf_counter() - start
+
+    actuals = {
+        segment: next(iter(segment_results.values()))['predictions']['actuals']
+        for segment, segment_results in selected.items()
+    }
+    engine = MetricEngine.from_results(selected, actuals)
+    lower, upper = sequential_intervals(engine.y_true, engine.y_pred, alpha, min_windows, **offset_kwargs)
+
+    for s, segment in enumerate(engine.labels['segment']):
+        for m, name in enumerate(engine.labels['model']):
+            if name not in selected[segment]:
+                continue
+            predictions = selected[segment][name]['predictions']
+            n_windows, horizon = np.shape(predictions['yhat'])
+            predictions['yhat_lower'] = lower[s, m, :n_windows, :horizon]
+            predictions['yhat_upper'] = upper[s, m, :n_windows, :horizon]
+            predictions['interval'] = 'conformal'
+
+    return time.perf_counter() - start
+
+
+def truncate_segment(segment_data: Dict, n_periods: int) -> Dict:
+    """
+    Copy of a segment dict without its last n_periods (every per-period list is cut).
+
+    Args:
+        segment_data: Segment JSON data
+        n_periods: Trailing periods to drop
+
+    Returns:
+        Segment dict over the shorter calendar (other entries shared, not copied)
+    """
+    length = len(segment_data['calendar']['ds'])
+
+    def cut(value):
+        if isinstance(value, dict):
+            return {key: cut(v) for key, v in value.items()}
+        if isinstance(value, list) and len(value) == length:
+            return value[:length - n_periods]
+        return value
+
+    return cut(segment_data)
+
+
+def conformal_backtest(
+    segments_data: List[Dict],
+    families: Sequence[str] = ('Baselines', 'XGBoost', 'LightGBM'),
+    test_horizon: int = 56,
+    n_windows: int = 4,
+    alpha: float = ALPHA,
+    horizon_pool: int = 3,
+) -> Tuple[pd.DataFrame, Dict[str, float]]:
+    """
+    Coverage of conformal intervals on each segment's last window.
+
+    Every segment is cross-validated over n_windows + 1 windows once; the first
+    n_windows calibrate the last one, either per segment or pooled across
+    segments (scale-normalized), from the same residuals.
+
+    Args:
+        segments_data: Segment dicts
+        families: Registered families (models with native intervals are skipped)
+        test_horizon: Periods per window
+        n_windows: Calibration windows
+        alpha: Miscoverage
+        horizon_pool: Neighbouring horizon steps pooled into each step's quantile
+
+    Returns:
+        (model x calibration table of coverage and mean interval width,
+         seconds for the fits and for each calibration)
+    """
+    from model_benchmark import ForecastBenchmark
+
+    start = time.perf_counter()
+    results = {}
+    for segment_data in segments_data:
+        benchmark = ForecastBenchmark(segment_data, test_horizon=test_horizon, prophet_uncertainty_samples=0)
+        results[segment_data['meta']['segment']] = benchmark.cross_validate(
+            n_windows + 1, families=list(families), parallel=False
+        )
+    seconds = {'fits': time.perf_counter() - start}
+
+    rows = []
+    for calibration, pool_segments in (('segment', False), ('pooled', True)):
+        for segment_results in results.values():
+            for result in segment_results.values():
+                if result.get('predictions', {}).get('interval') == 'conformal':
+                    result['predictions']['yhat_lower'] = None
+        seconds[calibration] = attach_conformal(
+            results, alpha, min_windows=n_windows, pool_segments=pool_segments, horizon_pool=horizon_pool
+        )
+
+        for segment, segment_results in results.items():
+            for name, result in segment_results.items():
+                predictions = result.get('predictions', {})
+                if predictions.get('interval') != 'conformal':
+                    continue
+                actual = predictions['actuals'][-1]
+                lower, upper = predictions['yhat_lower'][-1], predictions['yhat_upper'][-1]
+                rows.append({
+                    'model': name,
+                    'calibration': calibration,
+                    'coverage': np.mean((actual >= lower) & (actual <= upper)),
+                    'width': np.mean(upper - lower),
+                })
+
+    table = pd.DataFrame(rows).groupby(['model', 'calibration'])[['coverage', 'width']].mean()
+    return table, seconds
+
+
+def main():
+    """Compare per-segment and cross-segment conformal calibration on the Air Jordan segments."""
+    parser = argparse.ArgumentParser(description="Conformal intervals from rolling-origin residuals")
+    parser.add_argument("--data-dir", default="./data", help="Directory with AirJordan_*.json files")
+    parser.add_argument("--models", default="Baselines,XGBoost,LightGBM", help="Comma-separated model families")
+    parser.add_argument("--horizon", type=int, default=56, help="Periods per window")
+    parser.add_argument("--windows", type=int, default=4, help="Calibration windows")
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="Miscoverage (0.05 = 95%% intervals)")
+    parser.add_argument("--horizon-pool", type=int, default=3, help="Neighbouring horizon steps per quantile")
+
+    args = parser.parse_args()
+
+    segments_data = []
+    for json_file in sorted(Path(args.data_dir).glob("AirJordan_*.json")):
+        with open(json_file, 'r') as f:
+            segment_data = json.load(f)
+        segment_data['meta']['segment'] = json_file.stem
+        segments_data.append(segment_data)
+
+    print("="*60)
+    print(f"CONFORMAL INTERVALS ({1 - args.alpha:.0%} nominal, {args.windows} calibration windows)")
+    print("="*60)
+
+    table, seconds = conformal_backtest(
+        segments_data, args.models.split(","), args.horizon, args.windows, args.alpha, args.horizon_pool
+    )
+    print(table.round(3).to_string())
+    print(f"\nFits: {seconds['fits']:.2f}s; intervals: {seconds['segment'] * 1000:.1f}ms per segment, "
+          f"{seconds['pooled'] * 1000:.1f}ms pooled")
+
+
+if __name__ == "__main__":
+    main()
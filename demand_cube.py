@@ -0,0 +1,316 @@
+"""
+Demand Cube
+
+One contiguous array with named axes for the demand hierarchy both generators
+produce (measure x [sku x] region x channel x date):
+- sel / isel: label or position slicing on any axis; a single label or a slice
+  is a view (O(1)), a list of labels copies just the selected rows
+- sum: vectorized totals over any subset of axes
+- group_sum: totals over groups along one axis (e.g. SKUs by family)
+- to_frame / wide: long or (date x series) DataFrames for plotting and models
+
+Usage:
+    cube = generator.generate_cube()                 # ShoeSalesGenerator
+    cube = DemandCube.from_segments(segments_data)   # Air Jordan segment dicts
+    cube.sel(measure='units', region='EMEA').sum('sku')
+    cube.sel(measure='units').group_sum('sku', 'sku_family').sum('region', 'channel')
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Union
+
+
+# Segment JSON blocks searched (in order) for a measure
+SEGMENT_BLOCKS = ('observed', 'inventory', 'events')
+
+
+class DemandCube:
+    """
+    Named-axis demand array with coordinate labels.
+
+    Axis 'date' has DatetimeIndex coordinates; other axes have label indexes
+    (pd.Index, hash lookups). Auxiliary coordinates attach extra labels to one
+    axis, e.g. aux={'sku_family': ('sku', families)}.
+    """
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        dims: Sequence[str],
+        coords: Dict[str, Sequence],
+        aux: Optional[Dict[str, tuple]] = None,
+        attrs: Optional[Dict] = None,
+    ):
+        """
+        Initialize cube.
+
+        Args:
+            values: Array with one axis per dim
+            dims: Axis names
+            coords: Dim -> labels (length of that axis)
+            aux: Name -> (dim, labels) auxiliary coordinates
+            attrs: Free-form metadata (e.g. product_line, freq)
+        """
+        values = np.asarray(values)
+        dims = tuple(dims)
+        if values.ndim != len(dims):
+            raise ValueError(f"values has {values.ndim} axes but {len(dims)} dims were given")
+
+        self.values = values
+        self.dims = dims
+        self.coords = {}
+        for axis, dim in enumerate(dims):
+            index = pd.DatetimeIndex(coords[dim]) if dim == 'date' else pd.Index(coords[dim])
+            if len(index) != values.shape[axis]:
+                raise ValueError(f"{len(index)} labels for axis '{dim}' of length {values.shape[axis]}")
+            self.coords[dim] = index
+
+        self.aux = {}
+        for name, (dim, labels) in (aux or {}).items():
+            labels = np.asarray(labels)
+            if len(labels) != len(self.coords[dim]):
+                raise ValueError(f"Auxiliary coordinate '{name}' doesn't match axis '{dim}'")
+            self.aux[name] = (dim, labels)
+
+        self.attrs = dict(attrs or {})
+
+    def __repr__(self) -> str:
+        axes = ", ".join(f"{dim}: {len(self.coords[dim])}" for dim in self.dims)
+        return f"DemandCube({axes})"
+
+    @property
+    def shape(self) -> tuple:
+        return self.values.shape
+
+    def axis(self, dim: str) -> int:
+        """Position of a named axis."""
+        if dim not in self.dims:
+            raise KeyError(f"No axis '{dim}' (axes: {self.dims})")
+        return self.dims.index(dim)
+
+    def _new(self, values: np.ndarray, dims: Sequence[str], coords: Dict, aux: Dict) -> "DemandCube":
+        return DemandCube(values, dims, coords, aux=aux, attrs=self.attrs)
+
+    def isel(self, **indexers: Union[int, slice, Sequence[int]]) -> "DemandCube":
+        """
+        Select by position along named axes.
+
+        An int drops the axis, a slice keeps it as a view, a sequence of positions
+        takes those rows (copy).
+
+        Args:
+            **indexers: Dim -> int, slice or positions
+
+        Returns:
+            Selected cube
+        """
+        for dim in indexers:
+            self.axis(dim)
+
+        values = self.values
+        dims = list(self.dims)
+        coords = dict(self.coords)
+        aux = dict(self.aux)
+
+        # Basic indexing first (views), then one take per list indexer
+        basic = tuple(
+            indexers[dim] if dim in indexers and isinstance(indexers[dim], (int, np.integer, slice)) else slice(None)
+            for dim in self.dims
+        )
+        values = values[basic]
+
+        for dim, index in indexers.items():
+            if isinstance(index, (int, np.integer)):
+                dims.remove(dim)
+                del coords[dim]
+                aux = {name: (d, labels) for name, (d, labels) in aux.items() if d != dim}
+            elif isinstance(index, slice):
+                coords[dim] = coords[dim][index]
+                aux = {name: (d, labels[index] if d == dim else labels) for name, (d, labels) in aux.items()}
+
+        for dim, index in indexers.items():
+            if not isinstance(index, (int, np.integer, slice)):
+                positions = np.asarray(index, dtype=int)
+                values = np.take(values, positions, axis=dims.index(dim))
+                coords[dim] = coords[dim][positions]
+                aux = {name: (d, labels[positions] if d == dim else labels) for name, (d, labels) in aux.items()}
+
+        return self._new(values, dims, coords, aux)
+
+    def sel(self, **selectors) -> "DemandCube":
+        """
+        Select by label along named axes.
+
+        A single label drops the axis, a slice of labels (dates: inclusive, like
+        pandas .loc) keeps it as a view, a list of labels takes those rows.
+
+        Args:
+            **selectors: Dim -> label, slice of labels or list of labels
+
+        Returns:
+            Selected cube
+        """
+        indexers = {}
+        for dim, label in selectors.items():
+            self.axis(dim)
+            index = self.coords[dim]
+            if isinstance(label, slice):
+                indexers[dim] = index.slice_indexer(label.start, label.stop, label.step)
+            elif isinstance(label, (list, tuple, np.ndarray, pd.Index)):
+                positions = index.get_indexer(label)
+                if (positions < 0).any():
+                    missing = [l for l, p in zip(label, positions) if p < 0]
+                    raise KeyError(f"Labels {missing} not on axis '{dim}'")
+                indexers[dim] = positions
+            else:
+                indexers[dim] = index.get_loc(label)
+        return self.isel(**indexers)
+
+    def sum(self, *dims: str) -> Union["DemandCube", float]:
+        """
+        Total over the given axes (all axes if none given).
+
+        Args:
+            *dims: Axes to sum out
+
+        Returns:
+            Cube over the remaining axes, or a float when none remain
+        """
+        dims = dims or self.dims
+        axes = tuple(self.axis(dim) for dim in dims)
+        values = self.values.sum(axis=axes)
+
+        kept = [dim for dim in self.dims if dim not in dims]
+        if not kept:
+            return float(values)
+
+        coords = {dim: self.coords[dim] for dim in kept}
+        aux = {name: (d, labels) for name, (d, labels) in self.aux.items() if d in kept}
+        return self._new(values, kept, coords, aux)
+
+    def group_sum(self, dim: str, by: Union[str, Sequence]) -> "DemandCube":
+        """
+        Total over groups of labels along one axis.
+
+        Args:
+            dim: Axis to group (e.g. 'sku')
+            by: Auxiliary coordinate name on that axis (e.g. 'sku_family') or one
+                group label per position
+
+        Returns:
+            Cube whose `dim` axis is replaced by an axis named after `by` (or `dim`)
+            with the sorted group labels
+        """
+        axis = self.axis(dim)
+        if isinstance(by, str):
+            by_dim, labels = self.aux[by]
+            if by_dim != dim:
+                raise ValueError(f"'{by}' labels axis '{by_dim}', not '{dim}'")
+            name = by
+        else:
+            labels = np.asarray(by)
+            name = dim
+
+        codes, groups = pd.factorize(labels, sort=True)
+        membership = np.zeros((len(groups), len(codes)))
+        membership[codes, np.arange(len(codes))] = 1.0
+
+        values = np.moveaxis(np.tensordot(membership, self.values, axes=([1], [axis])), 0, axis)
+        dims = [name if d == dim else d for d in self.dims]
+        coords = {(name if d == dim else d): (groups if d == dim else self.coords[d]) for d in self.dims}
+        aux = {n: (d, labels_) for n, (d, labels_) in self.aux.items() if d != dim}
+        return self._new(values, dims, coords, aux)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Long frame: one row per label combination (last axis fastest).
+
+        A 'measure' axis becomes one column per measure; otherwise values go in a
+        'value' column. Auxiliary coordinates become columns too.
+
+        Returns:
+            DataFrame with one column per non-measure axis, auxiliary coordinates
+            and the values
+        """
+        dims = [dim for dim in self.dims if dim != 'measure']
+        shape = [len(self.coords[dim]) for dim in dims]
+        n_rows = int(np.prod(shape))
+
+        columns = {}
+        for axis, dim in enumerate(dims):
+            repeats = int(np.prod(shape[axis + 1:]))
+            tiles = n_rows // (repeats * shape[axis])
+            positions = np.tile(np.repeat(np.arange(shape[axis]), repeats), tiles)
+            columns[dim] = self.coords[dim].values[positions]
+            for name, (d, labels) in self.aux.items():
+                if d == dim:
+                    columns[name] = labels[positions]
+
+        if 'measure' in self.dims:
+            values = np.moveaxis(self.values, self.axis('measure'), -1).reshape(n_rows, -1)
+            for i, measure in enumerate(self.coords['measure']):
+                columns[measure] = values[:, i]
+        else:
+            columns['value'] = self.values.reshape(n_rows)
+
+        return pd.DataFrame(columns)
+
+    def wide(self, index: str = 'date') -> pd.DataFrame:
+        """
+        (index x series) frame with one column per combination of the other axes.
+
+        Args:
+            index: Axis for the rows
+
+        Returns:
+            DataFrame; columns are labels (one other axis) or a MultiIndex
+        """
+        others = [dim for dim in self.dims if dim != index]
+        values = np.moveaxis(self.values, self.axis(index), 0).reshape(len(self.coords[index]), -1)
+
+        if len(others) == 1:
+            columns = self.coords[others[0]]
+        else:
+            columns = pd.MultiIndex.from_product([self.coords[dim] for dim in others], names=others)
+        return pd.DataFrame(values, index=self.coords[index], columns=columns)
+
+    @classmethod
+    def from_segments(
+        cls,
+        segments_data: List[Dict],
+        measures: Sequence[str] = ('units', 'revenue', 'price'),
+    ) -> "DemandCube":
+        """
+        Stack Air Jordan segment dicts into a (measure x region x channel x date) cube.
+
+        Args:
+            segments_data: Segment dicts sharing one calendar
+            measures: Keys of each segment's 'observed' block (or, failing that,
+                its 'inventory' or 'events' block, e.g. 'stockout_flag')
+
+        Returns:
+            DemandCube; region/channel combinations without a segment are NaN
+        """
+        calendar = segments_data[0]['calendar']['ds']
+        if any(seg['calendar']['ds'] != calendar for seg in segments_data):
+            raise ValueError("All segments must share one calendar")
+
+        regions = list(dict.fromkeys(seg['meta']['region'] for seg in segments_data))
+        channels = list(dict.fromkeys(seg['meta']['channel'] for seg in segments_data))
+
+        values = np.full((len(measures), len(regions), len(channels), len(calendar)), np.nan)
+        for seg in segments_data:
+            r = regions.index(seg['meta']['region'])
+            c = channels.index(seg['meta']['channel'])
+            for m, measure in enumerate(measures):
+                block = next(seg[key] for key in SEGMENT_BLOCKS if measure in seg.get(key, {}))
+                values[m, r, c] = block[measure]
+
+        meta = segments_data[0]['meta']
+        return cls(
+            values,
+            ('measure', 'region', 'channel', 'date'),
+            {'measure': list(measures), 'region': regions, 'channel': channels, 'date': pd.to_datetime(calendar)},
+            attrs={'product_line': meta.get('product_line'), 'freq': meta.get('freq')},
+        )
@@ -0,0 +1,330 @@
+"""
+Vectorized Forecast Metrics
+
+Scores stacked forecasts in a few array operations instead of one model and
+segment at a time:
+- score: MAE / RMSE / floored MAPE / bias / coverage over any axes of
+  broadcastable arrays, NaN-masked and optionally weighted
+- MetricEngine: labelled (segment x model x window x horizon) arrays with
+  per-model, per-segment, per-horizon-step and weighted aggregates, and
+  horizon sweeps (metrics over steps 1..h for several h from one forecast)
+
+Conventions (same as ForecastBenchmark.compute_metrics):
+- bias = mean(forecast - actual)
+- MAPE denominator floored at 5 units
+- coverage only over points that have both interval bounds
+
+Usage:
+    engine = MetricEngine.from_results(results, actuals)
+    engine.score(by=('model',))
+    engine.per_horizon(by=('model',))
+    engine.horizon_sweep([7, 14, 28, 56], by=('model',))
+    engine.score(by=('model',), weights={'segment': volumes})
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+
+METRICS = ['mae', 'rmse', 'mape', 'bias', 'coverage']
+MAPE_FLOOR = 5.0
+
+# Axis order of MetricEngine arrays
+AXES = ('segment', 'model', 'window', 'horizon')
+
+
+def score(
+    y_true: np.ndarray,
+    y_pred: np.ndarray,
+    y_lower: Optional[np.ndarray] = None,
+    y_upper: Optional[np.ndarray] = None,
+    axis: Union[None, int, Tuple[int, ...]] = None,
+    weights: Optional[np.ndarray] = None,
+    mape_floor: float = MAPE_FLOOR,
+) -> Dict[str, np.ndarray]:
+    """
+    Forecast metrics over the given axes.
+
+    Points where the actual or the forecast is NaN are ignored, so ragged
+    windows/horizons can be NaN-padded into one array.
+
+    Args:
+        y_true: Actuals (broadcastable against y_pred)
+        y_pred: Forecasts
+        y_lower: Optional lower interval bounds (NaN = no interval for that point)
+        y_upper: Optional upper interval bounds
+        axis: Axes to reduce (None = all)
+        weights: Optional non-negative weights broadcastable to the data
+        mape_floor: MAPE denominator floor
+
+    Returns:
+        Dict of mae, rmse, mape, bias, coverage (NaN where no intervals) and n
+        (points scored), each shaped like the data with `axis` reduced
+    """
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    y_true, y_pred = np.broadcast_arrays(y_true, y_pred)
+
+    # Invalid points get zero error (and a harmless denominator) so plain sums skip them
+    valid = ~(np.isnan(y_true) | np.isnan(y_pred))
+    errors = np.where(valid, y_pred - y_true, 0.0)
+    abs_errors = np.abs(errors)
+    denominators = np.maximum(np.where(valid, y_true, mape_floor), mape_floor)
+
+    if weights is None:
+        w = None
+        total = valid.sum(axis=axis)
+    else:
+        w = valid * np.broadcast_to(np.asarray(weights, dtype=float), valid.shape)
+        total = w.sum(axis=axis)
+
+    def mean(values: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (values if w is None else values * w).sum(axis=axis) / total
+
+    metrics = {
+        'mae': mean(abs_errors),
+        'rmse': np.sqrt(mean(errors * errors)),
+        'mape': mean(abs_errors / denominators) * 100,
+        'bias': mean(errors),
+    }
+
+    if y_lower is not None and y_upper is not None:
+        y_lower = np.broadcast_to(np.asarray(y_lower, dtype=float), valid.shape)
+        y_upper = np.broadcast_to(np.asarray(y_upper, dtype=float), valid.shape)
+        # NaN bounds compare False, so points without an interval drop out of both sums
+        scored = valid & (y_lower <= y_upper)
+        hits = scored & (y_lower <= y_true) & (y_true <= y_upper)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if w is None:
+                metrics['coverage'] = hits.sum(axis=axis) / scored.sum(axis=axis)
+            else:
+                metrics['coverage'] = (hits * w).sum(axis=axis) / (scored * w).sum(axis=axis)
+    else:
+        metrics['coverage'] = np.full(np.shape(metrics['mae']), np.nan)
+
+    metrics['n'] = valid.sum(axis=axis)
+
+    return metrics
+
+
+def to_scalars(metrics: Dict[str, np.ndarray]) -> Dict:
+    """Fully reduced score() output as plain floats (None for NaN coverage), without 'n'."""
+    result = {name: float(metrics[name]) for name in METRICS}
+    if np.isnan(result['coverage']):
+        result['coverage'] = None
+    return result
+
+
+class MetricEngine:
+    """
+    Labelled forecast arrays shaped (segment, model, window, horizon).
+
+    Holdout results are a single window; cross-validation results have one
+    window per origin. Missing models/windows/steps are NaN and ignored.
+    """
+
+    def __init__(
+        self,
+        y_true: np.ndarray,
+        y_pred: np.ndarray,
+        y_lower: Optional[np.ndarray] = None,
+        y_upper: Optional[np.ndarray] = None,
+        segments: Optional[Sequence[str]] = None,
+        models: Optional[Sequence[str]] = None,
+        mape_floor: float = MAPE_FLOOR,
+    ):
+        """
+        Initialize engine.
+
+        Args:
+            y_true: (segment, window, horizon) actuals, or (segment, model, window, horizon)
+            y_pred: (segment, model, window, horizon) forecasts
+            y_lower: Optional lower bounds, same shape as y_pred (NaN = no interval)
+            y_upper: Optional upper bounds, same shape as y_pred
+            segments: Segment labels (default: 0..S-1)
+            models: Model labels (default: 0..M-1)
+            mape_floor: MAPE denominator floor
+        """
+        y_pred = np.asarray(y_pred, dtype=float)
+        y_true = np.asarray(y_true, dtype=float)
+        if y_true.ndim == 3:
+            y_true = y_true[:, None, :, :]
+
+        if y_pred.ndim != 4:
+            raise ValueError(f"y_pred must be (segment, model, window, horizon), got shape {y_pred.shape}")
+
+        self.y_true = y_true
+        self.y_pred = y_pred
+        self.y_lower = y_lower
+        self.y_upper = y_upper
+        self.mape_floor = mape_floor
+
+        n_segments, n_models, n_windows, horizon = y_pred.shape
+        self.labels = {
+            'segment': list(segments) if segments is not None else list(range(n_segments)),
+            'model': list(models) if models is not None else list(range(n_models)),
+            'window': list(range(n_windows)),
+            'horizon': list(range(1, horizon + 1)),
+        }
+
+    @classmethod
+    def from_results(
+        cls,
+        results: Dict[str, Dict[str, Dict]],
+        actuals: Dict[str, np.ndarray],
+        mape_floor: float = MAPE_FLOOR,
+    ) -> "MetricEngine":
+        """
+        Stack benchmark results into one engine.
+
+        Args:
+            results: Segment -> model -> {'predictions': {'yhat', optional bounds}}
+                (ForecastBenchmark.run_all / cross_validate output; error entries are skipped)
+            actuals: Segment -> actuals, (horizon,) or (window, horizon)
+            mape_floor: MAPE denominator floor
+
+        Returns:
+            MetricEngine with NaN where a segment lacks a model
+        """
+        segments = list(results)
+        models = []
+        for segment_results in results.values():
+            for model_name, model_result in segment_results.items():
+                if 'predictions' in model_result and model_name not in models:
+                    models.append(model_name)
+
+        blocks = {name: np.atleast_2d(np.asarray(actuals[name], dtype=float)) for name in segments}
+        n_windows = max(b.shape[0] for b in blocks.values())
+        horizon = max(b.shape[1] for b in blocks.values())
+
+        shape = (len(segments), len(models), n_windows, horizon)
+        y_true = np.full((len(segments), n_windows, horizon), np.nan)
+        y_pred = np.full(shape, np.nan)
+        y_lower = np.full(shape, np.nan)
+        y_upper = np.full(shape, np.nan)
+
+        for s, name in enumerate(segments):
+            block = blocks[name]
+            y_true[s, :block.shape[0], :block.shape[1]] = block
+            for m, model in enumerate(models):
+                predictions = results[name].get(model, {}).get('predictions')
+                if predictions is None:
+                    continue
+                for key, target in (('yhat', y_pred), ('yhat_lower', y_lower), ('yhat_upper', y_upper)):
+                    if predictions.get(key) is not None:
+                        values = np.atleast_2d(np.asarray(predictions[key], dtype=float))
+                        target[s, m, :values.shape[0], :values.shape[1]] = values
+
+        return cls(y_true, y_pred, y_lower, y_upper, segments=segments, models=models, mape_floor=mape_floor)
+
+    def _weights(self, weights: Optional[Dict[str, np.ndarray]]) -> Optional[np.ndarray]:
+        """Product of per-axis weight vectors, broadcastable to the data."""
+        if not weights:
+            return None
+
+        combined = np.ones((1, 1, 1, 1))
+        for axis_name, values in weights.items():
+            shape = [1, 1, 1, 1]
+            shape[AXES.index(axis_name)] = -1
+            combined = combined * np.asarray(values, dtype=float).reshape(shape)
+        return combined
+
+    def metrics(
+        self,
+        by: Sequence[str] = ('segment', 'model'),
+        weights: Optional[Dict[str, np.ndarray]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Metric arrays keeping the `by` axes (in AXES order) and reducing the rest.
+
+        Args:
+            by: Axes to keep
+            weights: Axis name -> weight vector (e.g. {'segment': volumes})
+
+        Returns:
+            score() output
+        """
+        unknown = [name for name in by if name not in AXES]
+        if unknown:
+            raise ValueError(f"Unknown axes {unknown}, expected some of {AXES}")
+
+        axis = tuple(i for i, name in enumerate(AXES) if name not in by)
+        return score(
+            self.y_true, self.y_pred, self.y_lower, self.y_upper,
+            axis=axis, weights=self._weights(weights), mape_floor=self.mape_floor,
+        )
+
+    def score(
+        self,
+        by: Sequence[str] = ('segment', 'model'),
+        weights: Optional[Dict[str, np.ndarray]] = None,
+    ) -> pd.DataFrame:
+        """
+        Metrics table indexed by the `by` axes.
+
+        Args:
+            by: Axes to keep, e.g. ('model',) or ('segment', 'model')
+            weights: Axis name -> weight vector (e.g. {'segment': volumes})
+
+        Returns:
+            DataFrame with METRICS columns plus n
+        """
+        metrics = self.metrics(by, weights)
+        kept = [name for name in AXES if name in by]
+
+        if kept:
+            index = pd.MultiIndex.from_product([self.labels[name] for name in kept], names=kept)
+        else:
+            index = pd.Index(['all'])
+
+        frame = pd.DataFrame({name: np.ravel(metrics[name]) for name in METRICS + ['n']}, index=index)
+        if len(kept) == 1:
+            frame.index = frame.index.get_level_values(0)
+        return frame
+
+    def per_horizon(
+        self,
+        by: Sequence[str] = ('model',),
+        weights: Optional[Dict[str, np.ndarray]] = None,
+    ) -> pd.DataFrame:
+        """Metrics per horizon step (1..H), keeping the `by` axes as well."""
+        return self.score(by=tuple(by) + ('horizon',), weights=weights)
+
+    def truncate(self, horizon: int) -> "MetricEngine":
+        """Engine over the first `horizon` steps of every window."""
+        def head(values):
+            return None if values is None else np.asarray(values, dtype=float)[..., :horizon]
+
+        return MetricEngine(
+            head(self.y_true), head(self.y_pred), head(self.y_lower), head(self.y_upper),
+            segments=self.labels['segment'], models=self.labels['model'], mape_floor=self.mape_floor,
+        )
+
+    def horizon_sweep(
+        self,
+        horizons: Sequence[int],
+        by: Sequence[str] = ('model',),
+        weights: Optional[Dict[str, np.ndarray]] = None,
+    ) -> pd.DataFrame:
+        """
+        Metrics over steps 1..h for each h, as if forecasting h periods ahead from the same origins.
+
+        Args:
+            horizons: Horizons to score (each at most the forecast length)
+            by: Axes to keep besides the horizon ('horizon' itself is not allowed)
+            weights: Axis name -> weight vector (e.g. {'segment': volumes})
+
+        Returns:
+            DataFrame indexed by (horizon, *by) with METRICS columns plus n
+        """
+        longest = self.y_pred.shape[-1]
+        too_long = [h for h in horizons if not 0 < h <= longest]
+        if too_long:
+            raise ValueError(f"Horizons {too_long} are outside the {longest}-step forecast")
+        if 'horizon' in by:
+            raise ValueError("horizon_sweep already indexes by horizon")
+
+        frames = {int(h): self.truncate(h).score(by=by, weights=weights) for h in horizons}
+        return pd.concat(frames, names=['horizon'])
@@ -0,0 +1,301 @@
+"""
+Lag Features for the ML Benchmark Models
+
+- create_lag_features: vectorized feature frame over a whole history
+- LagFeatureEngine: ring-buffer version for walk-forward prediction; appending
+  one observation and emitting its feature row is O(1)
+- FeatureStore: per-segment training matrix + walk-forward test rows, built once
+  as contiguous float64 arrays and shared by every tree model
+
+Feature semantics (identical in all three):
+- lag_k: y[t-k]
+- rolling_mean_7 / rolling_std_7 / rolling_mean_28: over y[t-w..t-1] (shifted by 1)
+- dayofweek, month, quarter, dayofyear of ds[t]
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional, Sequence
+
+
+ROLLING_MEAN_WINDOWS = (7, 28)
+ROLLING_STD_WINDOWS = (7,)
+DATE_FEATURES = ['dayofweek', 'month', 'quarter', 'dayofyear']
+
+
+def feature_names(lags: Sequence[int] = (1, 7, 14, 28)) -> List[str]:
+    """Column order produced by create_lag_features for the given lags."""
+    return (
+        [f'lag_{lag}' for lag in lags] +
+        ['rolling_mean_7', 'rolling_std_7', 'rolling_mean_28'] +
+        DATE_FEATURES
+    )
+
+
+def create_lag_features(df: pd.DataFrame, lags: Sequence[int] = (1, 7, 14, 28)) -> pd.DataFrame:
+    """
+    Create lagged features for ML models.
+
+    Args:
+        df: Frame with 'ds' and 'y'
+        lags: Lag offsets
+
+    Returns:
+        Copy of df with feature columns, rows with missing features dropped
+    """
+    df = df.copy()
+
+    for lag in lags:
+        df[f'lag_{lag}'] = df['y'].shift(lag)
+
+    # Rolling statistics
+    df['rolling_mean_7'] = df['y'].shift(1).rolling(window=7).mean()
+    df['rolling_std_7'] = df['y'].shift(1).rolling(window=7).std()
+    df['rolling_mean_28'] = df['y'].shift(1).rolling(window=28).mean()
+
+    # Date features
+    df['dayofweek'] = df['ds'].dt.dayofweek
+    df['month'] = df['ds'].dt.month
+    df['quarter'] = df['ds'].dt.quarter
+    df['dayofyear'] = df['ds'].dt.dayofyear
+
+    # Drop NaN rows
+    df = df.dropna()
+
+    return df
+
+
+class LagFeatureEngine:
+    """
+    Maintain lag/rolling features for a single series as observations arrive.
+
+    Keeps a ring buffer of the last max(lag, window) + 1 values and running
+    sums (and sums of squares) for the rolling windows.
+    """
+
+    def __init__(self, lags: Sequence[int] = (1, 7, 14, 28)):
+        """
+        Initialize engine.
+
+        Args:
+            lags: Lag offsets (same default as _create_lag_features)
+        """
+        self.lags = tuple(lags)
+        self.feature_names = feature_names(self.lags)
+
+        # Buffer holds y[t-depth+1..t]; rolling windows look back to y[t-28]
+        self.depth = max(max(self.lags), max(ROLLING_MEAN_WINDOWS + ROLLING_STD_WINDOWS)) + 1
+        self.buffer = np.zeros(self.depth)
+        self.n_seen = 0
+        self.last_ds = None
+
+        # Running sums over y[t-w..t-1] for each window w
+        self.window_sum = {w: 0.0 for w in set(ROLLING_MEAN_WINDOWS + ROLLING_STD_WINDOWS)}
+        self.window_sumsq = {w: 0.0 for w in ROLLING_STD_WINDOWS}
+
+        # Running total for the "not enough history" fallback (history mean)
+        self.total = 0.0
+
+    def _value(self, lag: int) -> float:
+        """y[t-lag] for the latest index t."""
+        return self.buffer[(self.n_seen - 1 - lag) % self.depth]
+
+    def push(self, ds, y: float):
+        """
+        Append one observation.
+
+        Args:
+            ds: Date of the observation
+            y: Observed value
+        """
+        # The previous latest value y[t-1] enters every window; y[t-1-w] leaves it
+        if self.n_seen > 0:
+            prev = self._value(0)
+            for w in self.window_sum:
+                self.window_sum[w] += prev
+                if self.n_seen > w:
+                    self.window_sum[w] -= self._value(w)
+            for w in self.window_sumsq:
+                self.window_sumsq[w] += prev * prev
+                if self.n_seen > w:
+                    leaving = self._value(w)
+                    self.window_sumsq[w] -= leaving * leaving
+
+        self.buffer[self.n_seen % self.depth] = y
+        self.n_seen += 1
+        self.last_ds = pd.Timestamp(ds)
+        self.total += y
+
+    def extend(self, ds: Iterable, y: Iterable[float]):
+        """Append a history of observations in order."""
+        for d, v in zip(ds, y):
+            self.push(d, v)
+
+    @property
+    def ready(self) -> bool:
+        """True once the latest row has no missing features (dropna would keep it)."""
+        return self.n_seen >= self.depth
+
+    @property
+    def history_mean(self) -> float:
+        """Mean of all observations pushed so far."""
+        return self.total / self.n_seen if self.n_seen else float('nan')
+
+    def current_row(self) -> Optional[np.ndarray]:
+        """
+        Feature row for the latest observation.
+
+        Returns:
+            Float array in `feature_names` order, or None if history is too short
+        """
+        if not self.ready:
+            return None
+
+        row = [self._value(lag) for lag in self.lags]
+
+        mean_7 = self.window_sum[7] / 7
+        var_7 = (self.window_sumsq[7] - self.window_sum[7] * mean_7) / 6
+        row.append(mean_7)
+        row.append(np.sqrt(max(var_7, 0.0)))
+        row.append(self.window_sum[28] / 28)
+
+        ds = self.last_ds
+        row.extend([ds.dayofweek, ds.month, ds.quarter, ds.dayofyear])
+
+        return np.array(row, dtype=float)
+
+    def next_row(self, ds) -> Optional[np.ndarray]:
+        """
+        Feature row for the period after the latest observation (not yet observed).
+
+        Same alignment as create_lag_features for row t+1: lag_k = y[t+1-k],
+        rolling windows end at y[t], date features of `ds`.
+
+        Args:
+            ds: Date of the period to forecast
+
+        Returns:
+            Float array in `feature_names` order, or None if history is too short
+        """
+        if self.n_seen < self.depth - 1:
+            return None
+
+        row = [self._value(lag - 1) for lag in self.lags]
+
+        # Windows over y[t+1-w..t]: y[t] enters, y[t-w] leaves
+        latest = self._value(0)
+        window_sum = {}
+        for w, total in self.window_sum.items():
+            window_sum[w] = total + latest - (self._value(w) if self.n_seen > w else 0.0)
+        window_sumsq = {}
+        for w, total in self.window_sumsq.items():
+            leaving = self._value(w) if self.n_seen > w else 0.0
+            window_sumsq[w] = total + latest * latest - leaving * leaving
+
+        mean_7 = window_sum[7] / 7
+        var_7 = (window_sumsq[7] - window_sum[7] * mean_7) / 6
+        row.append(mean_7)
+        row.append(np.sqrt(max(var_7, 0.0)))
+        row.append(window_sum[28] / 28)
+
+        ds = pd.Timestamp(ds)
+        row.extend([ds.dayofweek, ds.month, ds.quarter, ds.dayofyear])
+
+        return np.array(row, dtype=float)
+
+
+class FeatureStore:
+    """
+    Precomputed ML features for one segment's train/test split.
+
+    Test rows follow the walk-forward assumption: the row for step i is built from
+    the training history plus the first i test ACTUALS, exactly as if the model
+    were re-fed yesterday's actuals in production. Because those rows don't depend
+    on the model, they are computed once and every tree model predicts them in a
+    single batched call.
+    """
+
+    def __init__(
+        self,
+        X_train: np.ndarray,
+        y_train: np.ndarray,
+        X_test: np.ndarray,
+        test_ready: np.ndarray,
+        test_fallback: np.ndarray,
+        feature_names: List[str],
+    ):
+        """
+        Initialize store (use FeatureStore.build).
+
+        Args:
+            X_train: (n_train_rows, n_features) float64 training matrix
+            y_train: (n_train_rows,) float64 targets
+            X_test: (horizon, n_features) float64 walk-forward rows (NaN where not ready)
+            test_ready: (horizon,) bool, False where history was too short for features
+            test_fallback: (horizon,) history mean used where test_ready is False
+            feature_names: Column names for X_train/X_test
+        """
+        self.X_train = X_train
+        self.y_train = y_train
+        self.X_test = X_test
+        self.test_ready = test_ready
+        self.test_fallback = test_fallback
+        self.feature_names = feature_names
+
+    @classmethod
+    def build(
+        cls,
+        train_df: pd.DataFrame,
+        test_df: pd.DataFrame,
+        lags: Sequence[int] = (1, 7, 14, 28),
+    ) -> "FeatureStore":
+        """
+        Build the training matrix and walk-forward test rows.
+
+        Args:
+            train_df: Training frame with 'ds' and 'y'
+            test_df: Test frame with 'ds' and 'y' (actuals fed back step by step)
+            lags: Lag offsets
+
+        Returns:
+            FeatureStore
+        """
+        names = feature_names(lags)
+
+        train_feat = create_lag_features(train_df, lags)
+        X_train = np.ascontiguousarray(train_feat[names].values, dtype=float)
+        y_train = np.ascontiguousarray(train_feat['y'].values, dtype=float)
+
+        horizon = len(test_df)
+        X_test = np.full((horizon, len(names)), np.nan)
+        test_ready = np.zeros(horizon, dtype=bool)
+        test_fallback = np.zeros(horizon)
+
+        engine = LagFeatureEngine(lags)
+        engine.extend(train_df['ds'], train_df['y'])
+
+        for i, (ds, y) in enumerate(zip(test_df['ds'], test_df['y'])):
+            row = engine.current_row()
+            if row is None:
+                test_fallback[i] = engine.history_mean
+            else:
+                X_test[i] = row
+                test_ready[i] = True
+            engine.push(ds, y)
+
+        return cls(X_train, y_train, X_test, test_ready, test_fallback, names)
+
+    def predict(self, model) -> np.ndarray:
+        """
+        Walk-forward predictions for the test horizon in one batched call.
+
+        Args:
+            model: Regressor fitted on X_train (sklearn-style predict)
+
+        Returns:
+            (horizon,) predictions; history mean where features weren't ready
+        """
+        yhat = self.test_fallback.copy()
+        if self.test_ready.any():
+            yhat[self.test_ready] = model.predict(self.X_test[self.test_ready])
+        return yhat
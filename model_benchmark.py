@@ -6,30 +6,197 @@ Tests:
 - StatsForecast (AutoARIMA, AutoETS)
 - XGBoost (with lag features)
 - LightGBM (with lag features)
+- Global XGBoost/LightGBM across all segments (optional)
 - Baseline (Naive, Seasonal Naive)
+- FourierRegression (Prophet-like trend/Fourier/holiday design, batched least squares)
 
-Evaluates on same test set with MAE, MAPE, RMSE, coverage.
+Evaluates on same test set with MAE, MAPE, RMSE, coverage (optionally pooled
+over rolling-origin cross-validation windows with --cv-windows). With
+--conformal, models without native intervals get split-conformal ones from
+rolling-origin residuals, so every model has a coverage score. With
+--horizons 7,14,28,56 models are fit once at the longest horizon and scored
+over the first h steps for every h (one row per horizon).
+
+Model families live in MODEL_REGISTRY; each imports its backend only when it
+runs, so `--models XGBoost` never loads Prophet or StatsForecast.
+
+With --model-timeout each family runs in its own killable process; a hung
+AutoARIMA or Stan fit is killed after the limit and recorded as a timeout.
 """
 
+import argparse
+import hashlib
+import importlib
+import importlib.util
 import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.connection import wait as wait_connections
 import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Tuple
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
-# Prophet
-from prophet import Prophet
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+from conformal import ALPHA, attach_conformal, conformal_offsets, truncate_segment
+from forecast_metrics import MetricEngine, score, to_scalars
+from fourier_regression import fit_predict_segments
+from lag_features import FeatureStore, LagFeatureEngine, create_lag_features, feature_names
+
+
+# Per-model cost measurements written next to the accuracy metrics;
+# interval_time_s is the conformal calibration cost (also counted in cpu_time_s)
+COST_COLUMNS = ['fit_time_s', 'predict_time_s', 'interval_time_s', 'cpu_time_s', 'peak_rss_mb']
+
+# Neighbouring horizon steps whose residuals calibrate each step's conformal quantile
+CONFORMAL_HORIZON_POOL = 3
+
+
+def new_cost() -> Dict:
+    """Empty cost record (see COST_COLUMNS)."""
+    return {'fit_time_s': 0.0, 'predict_time_s': 0.0, 'interval_time_s': 0.0, 'cpu_time_s': 0.0, 'peak_rss_mb': None}
+
+
+def cpu_seconds() -> float:
+    """User + system CPU time of this process and its reaped children (e.g. StatsForecast workers)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def peak_rss_mb() -> Optional[float]:
+    """High-water resident set size of this process in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+@contextmanager
+def timed(cost: Dict, stage: str):
+    """
+    Add the block's wall time to cost['<stage>_time_s'] and its CPU time to cost['cpu_time_s'].
+
+    Args:
+        cost: Cost record from new_cost()
+        stage: 'fit', 'predict' or 'interval'
+    """
+    wall_start = time.perf_counter()
+    cpu_start = cpu_seconds()
+    try:
+        yield cost
+    finally:
+        cost[f'{stage}_time_s'] += time.perf_counter() - wall_start
+        cost['cpu_time_s'] += cpu_seconds() - cpu_start
+
+
+class ModelSpec:
+    """
+    A registered model family.
+
+    `run(benchmark)` fits on the benchmark's train split and returns
+    model name -> {'yhat', optional 'yhat_lower'/'yhat_upper'} for the test
+    horizon (one family may produce several models, e.g. StatsForecast).
+    `cross_validate(benchmark, cutoffs, step, parallel)` returns the same
+    layout with (window, horizon) arrays. Backends must be imported inside
+    the runners so unselected families cost nothing.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run,
+        cross_validate=None,
+        threaded: bool = False,
+        backends: Tuple[str, ...] = (),
+    ):
+        """
+        Initialize spec.
+
+        Args:
+            name: Family name used in --models and results
+            run: Holdout runner
+            cross_validate: Rolling-origin runner (None if unsupported)
+            threaded: Family uses benchmark.n_jobs threads (gets a share of cores in parallel runs)
+            backends: Modules the runners import
+        """
+        self.name = name
+        self.run = run
+        self.cross_validate = cross_validate
+        self.threaded = threaded
+        self.backends = tuple(backends)
+
+    def missing_backends(self) -> List[str]:
+        """Backend modules that aren't installed (checked without importing them)."""
+        return [module for module in self.backends if importlib.util.find_spec(module) is None]
+
+    def import_backends(self):
+        """Import the backends now (e.g. to keep import time out of a timing)."""
+        for module in self.backends:
+            importlib.import_module(module)
+
+
+# Family name -> ModelSpec, in result order
+MODEL_REGISTRY: Dict[str, ModelSpec] = {}
+
+
+def register_model(
+    name: str,
+    run,
+    cross_validate=None,
+    threaded: bool = False,
+    backends: Tuple[str, ...] = (),
+) -> ModelSpec:
+    """
+    Add a model family to the benchmark (run_all, cross_validate and --models pick it up).
+
+    Register at import time of a module: spawned worker processes re-import
+    modules and only see families registered there.
+
+    Args:
+        name: Family name
+        run: Holdout runner, see ModelSpec
+        cross_validate: Optional rolling-origin runner, see ModelSpec
+        threaded: Family uses benchmark.n_jobs threads
+        backends: Modules the runners import
+
+    Returns:
+        The registered spec
+    """
+    spec = ModelSpec(name, run, cross_validate, threaded, backends)
+    MODEL_REGISTRY[name] = spec
+    return spec
+
 
-# StatsForecast
-from statsforecast import StatsForecast
-from statsforecast.models import AutoARIMA, AutoETS, SeasonalNaive, Naive
+def resolve_models(models: Optional[List[str]] = None) -> List[str]:
+    """
+    Validate a family selection and return it in registry order.
+
+    Args:
+        models: Family names (None = every registered family)
+
+    Returns:
+        Family names
+    """
+    if models is None:
+        return list(MODEL_REGISTRY)
+
+    unknown = [m for m in models if m not in MODEL_REGISTRY]
+    if unknown:
+        raise ValueError(f"Unknown model families {unknown}, expected some of {list(MODEL_REGISTRY)}")
 
-# Gradient Boosting
-import xgboost as xgb
-import lightgbm as lgb
-from sklearn.metrics import mean_absolute_error, mean_squared_error
+    return [name for name in MODEL_REGISTRY if name in models]
 
 
 class ForecastBenchmark:
@@ -41,7 +208,9 @@ class ForecastBenchmark:
         self,
         segment_data: Dict,
         test_horizon: int = 7,  # Default: 1 week (was 8 weeks)
-        forecast_freq: str = "D"
+        forecast_freq: str = "D",
+        prophet_uncertainty_samples: int = 1000,
+        n_jobs: int = -1,
     ):
         """
         Initialize benchmark.
@@ -50,10 +219,14 @@ class ForecastBenchmark:
             segment_data: Segment JSON data
             test_horizon: Number of periods to hold out for testing
             forecast_freq: Forecast frequency ('D' daily, 'W' weekly)
+            prophet_uncertainty_samples: Prophet trend simulations for intervals (0 = no intervals)
+            n_jobs: Threads for XGBoost/LightGBM (-1 = all cores)
         """
         self.segment_data = segment_data
         self.test_horizon = test_horizon
         self.freq = forecast_freq
+        self.prophet_uncertainty_samples = prophet_uncertainty_samples
+        self.n_jobs = n_jobs
 
         # Prepare data
         self.df = pd.DataFrame({
@@ -66,82 +239,121 @@ class ForecastBenchmark:
         self.test_df = self.df.iloc[-test_horizon:].copy()
 
         self.results = {}
+        self._feature_store = None
+        self._full_features = None
+
+        # Model name -> cost record, filled in by the runners
+        self.costs = {}
+        self._feature_cost = new_cost()
+        self._full_feature_cost = new_cost()
+
+    def _cost(self, model_name: str) -> Dict:
+        """Cost record for a model (created on first use)."""
+        return self.costs.setdefault(model_name, new_cost())
 
     def _create_lag_features(self, df: pd.DataFrame, lags: List[int] = [1, 7, 14, 28]) -> pd.DataFrame:
         """Create lagged features for ML models."""
-        df = df.copy()
+        return create_lag_features(df, lags)
 
-        for lag in lags:
-            df[f'lag_{lag}'] = df['y'].shift(lag)
+    def feature_store(self) -> FeatureStore:
+        """
+        ML features for this segment, built once and shared by every tree model.
 
-        # Rolling statistics
-        df['rolling_mean_7'] = df['y'].shift(1).rolling(window=7).mean()
-        df['rolling_std_7'] = df['y'].shift(1).rolling(window=7).std()
-        df['rolling_mean_28'] = df['y'].shift(1).rolling(window=28).mean()
+        Returns:
+            FeatureStore with training matrix and walk-forward test rows
+        """
+        if self._feature_store is None:
+            with timed(self._feature_cost, 'fit'):
+                self._feature_store = FeatureStore.build(self.train_df, self.test_df)
+        return self._feature_store
 
-        # Date features
-        df['dayofweek'] = df['ds'].dt.dayofweek
-        df['month'] = df['ds'].dt.month
-        df['quarter'] = df['ds'].dt.quarter
-        df['dayofyear'] = df['ds'].dt.dayofyear
+    def _run_tree_model(self, model_name: str, model) -> Dict:
+        """
+        Fit a tree regressor on the shared feature store and predict the test horizon.
 
-        # Drop NaN rows
-        df = df.dropna()
+        Args:
+            model_name: Name the model's cost is recorded under
+            model: Unfitted sklearn-style regressor (XGBoost, LightGBM, CatBoost, ...)
 
-        return df
+        Returns:
+            Dict with walk-forward 'yhat'
+        """
+        store = self.feature_store()
+        cost = self._cost(model_name)
+
+        # The shared feature build is charged to every model using it (cost as if run alone)
+        cost['fit_time_s'] += self._feature_cost['fit_time_s']
+        cost['cpu_time_s'] += self._feature_cost['cpu_time_s']
+
+        with timed(cost, 'fit'):
+            model.fit(store.X_train, store.y_train)
+
+        # Walk-forward prediction with ACTUAL values for lags (rows precomputed in the store)
+        with timed(cost, 'predict'):
+            yhat = store.predict(model)
+
+        return {
+            'yhat': yhat,
+        }
 
     def run_prophet(self) -> Dict:
         """Run Prophet with multiplicative seasonality and exogenous regressors."""
         print("  Running Prophet (with regressors)...")
 
-        # Prepare data with regressors
-        train_with_regressors = self.train_df.copy()
-
-        # Add ALL exogenous features from segment data
-        holiday_flag = self.segment_data['events']['holiday_flag']
-        drop_flag = self.segment_data['events']['drop_flag']
-        price = self.segment_data['observed']['price']
-        hype = self.segment_data['ground_truth']['hype_lead14']
-        marketing = self.segment_data['ground_truth']['marketing_lead7']
-
-        train_with_regressors['holiday_flag'] = holiday_flag[:len(train_with_regressors)]
-        train_with_regressors['drop_flag'] = drop_flag[:len(train_with_regressors)]
-        train_with_regressors['price'] = price[:len(train_with_regressors)]
-        train_with_regressors['hype'] = hype[:len(train_with_regressors)]
-        train_with_regressors['marketing'] = marketing[:len(train_with_regressors)]
-
-        model = Prophet(
-            seasonality_mode='multiplicative',
-            changepoint_prior_scale=0.05,
-            seasonality_prior_scale=10.0,
-            interval_width=0.95
-        )
+        return self._fit_predict_prophet(len(self.train_df), self.test_horizon, self._cost('Prophet'))
 
-        model.add_country_holidays(country_name='US')
+    def _fit_predict_prophet(self, train_end: int, horizon: int, cost: Optional[Dict] = None) -> Dict:
+        """
+        Fit Prophet on rows [0, train_end) and forecast the next `horizon` rows.
 
-        # Add all regressors
-        model.add_regressor('holiday_flag')
-        model.add_regressor('drop_flag')
-        model.add_regressor('price')
-        model.add_regressor('hype')
-        model.add_regressor('marketing')
+        Args:
+            train_end: Number of leading rows used for training
+            horizon: Periods to forecast
+            cost: Cost record to add fit/predict timings to
 
-        model.fit(train_with_regressors)
+        Returns:
+            Dict with 'yhat' and, when uncertainty sampling is on, 'yhat_lower'/'yhat_upper'
+        """
+        from prophet import Prophet
+
+        cost = cost if cost is not None else new_cost()
+        regressors = self._prophet_regressors()
+
+        with timed(cost, 'fit'):
+            # Prepare data with regressors
+            train_with_regressors = self.df.iloc[:train_end].copy()
+            for name, values in regressors.items():
+                train_with_regressors[name] = values[:len(train_with_regressors)]
+
+            model = Prophet(
+                seasonality_mode='multiplicative',
+                changepoint_prior_scale=0.05,
+                seasonality_prior_scale=10.0,
+                interval_width=0.95,
+                uncertainty_samples=self.prophet_uncertainty_samples,
+            )
+
+            model.add_country_holidays(country_name='US')
 
-        # Create future dataframe with regressors
-        future = model.make_future_dataframe(periods=self.test_horizon, freq=self.freq)
+            # Add all regressors
+            for name in regressors:
+                model.add_regressor(name)
 
-        # Add ALL regressor values for future periods
-        future['holiday_flag'] = holiday_flag[:len(future)]
-        future['drop_flag'] = drop_flag[:len(future)]
-        future['price'] = price[:len(future)]
-        future['hype'] = hype[:len(future)]
-        future['marketing'] = marketing[:len(future)]
+            model.fit(train_with_regressors)
 
-        forecast = model.predict(future)
+        with timed(cost, 'predict'):
+            # Create future dataframe with regressors
+            future = model.make_future_dataframe(periods=horizon, freq=self.freq)
 
-        # Extract test predictions
-        forecast_test = forecast.iloc[-self.test_horizon:]
+            # Add ALL regressor values for future periods
+            for name, values in regressors.items():
+                future[name] = values[:len(future)]
+
+            # Predict only the test horizon (uncertainty sampling scales with rows predicted)
+            forecast_test = model.predict(future.iloc[-horizon:])
+
+        if 'yhat_lower' not in forecast_test:
+            return {'yhat': forecast_test['yhat'].values}
 
         return {
             'yhat': forecast_test['yhat'].values,
@@ -149,292 +361,1745 @@ class ForecastBenchmark:
             'yhat_upper': forecast_test['yhat_upper'].values,
         }
 
-    def run_statsforecast(self) -> Dict:
-        """Run StatsForecast AutoARIMA and AutoETS."""
-        print("  Running StatsForecast (AutoARIMA, AutoETS, SeasonalNaive)...")
+    def _prophet_regressors(self) -> Dict[str, list]:
+        """ALL exogenous features from segment data, over the full calendar."""
+        return {
+            'holiday_flag': self.segment_data['events']['holiday_flag'],
+            'drop_flag': self.segment_data['events']['drop_flag'],
+            'price': self.segment_data['observed']['price'],
+            'hype': self.segment_data['ground_truth']['hype_lead14'],
+            'marketing': self.segment_data['ground_truth']['marketing_lead7'],
+        }
+
+    def run_statsforecast(self, models: Optional[List[str]] = None) -> Dict:
+        """
+        Run StatsForecast models (AutoARIMA, AutoETS, SeasonalNaive, Naive).
+
+        Args:
+            models: Model aliases to run (default: all of statsforecast_models())
+        """
+        sf_models = statsforecast_models(models)
+        print(f"  Running StatsForecast ({', '.join(m.alias for m in sf_models)})...")
 
         # Prepare data for statsforecast (needs unique_id column)
         sf_df = self.train_df.copy()
         sf_df['unique_id'] = 'segment'
         sf_df = sf_df[['unique_id', 'ds', 'y']]
 
-        # Initialize models
-        models = [
-            AutoARIMA(season_length=7),  # Weekly seasonality
-            AutoETS(season_length=7),
-            SeasonalNaive(season_length=7),
-            Naive(),
-        ]
-
-        sf = StatsForecast(
-            models=models,
-            freq=self.freq,
-            n_jobs=1
+        forecast = fit_predict_statsforecast(
+            sf_df, self.test_horizon, self.freq, n_jobs=1, costs=self.costs, models=models,
+            per_model_timings=True,
         )
 
-        sf.fit(sf_df)
-        forecast = sf.predict(h=self.test_horizon, level=[95])
-
-        return {
-            'AutoARIMA': {
-                'yhat': forecast['AutoARIMA'].values,
-                'yhat_lower': forecast['AutoARIMA-lo-95'].values,
-                'yhat_upper': forecast['AutoARIMA-hi-95'].values,
-            },
-            'AutoETS': {
-                'yhat': forecast['AutoETS'].values,
-                'yhat_lower': forecast['AutoETS-lo-95'].values,
-                'yhat_upper': forecast['AutoETS-hi-95'].values,
-            },
-            'SeasonalNaive': {
-                'yhat': forecast['SeasonalNaive'].values,
-            },
-            'Naive': {
-                'yhat': forecast['Naive'].values,
-            }
-        }
+        return parse_statsforecast(forecast, models)
 
     def run_xgboost(self) -> Dict:
         """Run XGBoost with lag features using walk-forward validation (realistic: uses actual lags)."""
         print("  Running XGBoost (walk-forward with actuals)...")
 
-        # Create features for training
-        train_feat = self._create_lag_features(self.train_df)
-        feature_cols = [c for c in train_feat.columns if c not in ['ds', 'y']]
-
-        X_train = train_feat[feature_cols]
-        y_train = train_feat['y']
-
-        # Train model
-        model = xgb.XGBRegressor(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.05,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            random_state=42,
-            n_jobs=-1
-        )
+        # Features come from the shared per-segment store
+        return self._run_tree_model('XGBoost', xgboost_regressor(self.n_jobs))
 
-        model.fit(X_train, y_train)
+    def run_lightgbm(self) -> Dict:
+        """Run LightGBM with lag features using walk-forward validation (realistic: uses actual lags)."""
+        print("  Running LightGBM (walk-forward with actuals)...")
 
-        # Walk-forward prediction with ACTUAL values for lags (realistic)
-        predictions = []
-        history_df = self.df.iloc[:-self.test_horizon].copy()  # Start with training data
+        # Features come from the shared per-segment store
+        return self._run_tree_model('LightGBM', lightgbm_regressor(self.n_jobs))
 
-        for i in range(self.test_horizon):
-            # Create features using only historical data
-            feat = self._create_lag_features(history_df)
-            if len(feat) == 0:
-                # Not enough history to create features
-                predictions.append(history_df['y'].mean())
-                continue
+    def compute_metrics(self, y_true: np.ndarray, y_pred: np.ndarray, y_lower: np.ndarray = None, y_upper: np.ndarray = None) -> Dict:
+        """Compute evaluation metrics (MAPE floored at 5 units, bias = forecast - actual)."""
+        return to_scalars(score(y_true, y_pred, y_lower, y_upper))
 
-            # Get the last row (most recent features)
-            X_current = feat[feature_cols].iloc[[-1]]
+    def window_cutoffs(self, n_windows: int, step_size: Optional[int] = None) -> np.ndarray:
+        """
+        Training-end positions for rolling-origin windows (oldest first).
 
-            # Predict next value
-            pred = model.predict(X_current)[0]
-            predictions.append(pred)
+        The last window is the usual holdout (train on all but test_horizon rows).
 
-            # Add ACTUAL value to history (realistic: we know yesterday's actuals in production)
-            next_date = self.test_df.iloc[i]['ds']
-            actual_value = self.test_df.iloc[i]['y']
-            next_row = pd.DataFrame({'ds': [next_date], 'y': [actual_value]})
-            history_df = pd.concat([history_df, next_row], ignore_index=True)
+        Args:
+            n_windows: Number of windows
+            step_size: Periods between window origins (default: test_horizon)
 
-        return {
-            'yhat': np.array(predictions),
-        }
+        Returns:
+            Array of train_end row positions
+        """
+        step = step_size or self.test_horizon
+        cutoffs = len(self.df) - self.test_horizon - step * np.arange(n_windows)[::-1]
 
-    def run_lightgbm(self) -> Dict:
-        """Run LightGBM with lag features using walk-forward validation (realistic: uses actual lags)."""
-        print("  Running LightGBM (walk-forward with actuals)...")
+        # Lag features need max lag + rolling window rows of history before training starts
+        if cutoffs[0] < 2 * LagFeatureEngine().depth:
+            raise ValueError(
+                f"Not enough history for {n_windows} windows of {self.test_horizon} "
+                f"periods with step {step} ({len(self.df)} rows)"
+            )
 
-        # Create features for training
-        train_feat = self._create_lag_features(self.train_df)
-        feature_cols = [c for c in train_feat.columns if c not in ['ds', 'y']]
-
-        X_train = train_feat[feature_cols]
-        y_train = train_feat['y']
-
-        # Train model
-        model = lgb.LGBMRegressor(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.05,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            random_state=42,
-            n_jobs=-1,
-            verbosity=-1
-        )
+        return cutoffs
+
+    def _cv_statsforecast(self, cutoffs: np.ndarray, step: int, models: Optional[List[str]] = None) -> Dict:
+        """StatsForecast native cross-validation, reshaped to (window, horizon) blocks (cost split over models)."""
+        from statsforecast import StatsForecast
 
-        model.fit(X_train, y_train)
+        print(f"  Running StatsForecast cross-validation ({len(cutoffs)} windows)...")
+
+        sf_df = self.df.copy()
+        sf_df['unique_id'] = 'segment'
+        sf_df = sf_df[['unique_id', 'ds', 'y']]
+
+        sf_models = statsforecast_models(models)
+        sf = StatsForecast(models=sf_models, freq=self.freq, n_jobs=1)
+
+        # Fits and forecasts interleave inside one call: all of it is fit time,
+        # split evenly over the models
+        spent = new_cost()
+        with timed(spent, 'fit'):
+            cv = sf.cross_validation(
+                df=sf_df,
+                h=self.test_horizon,
+                n_windows=len(cutoffs),
+                step_size=step,
+                level=[95],
+            )
+        for model in sf_models:
+            cost = self._cost(model.alias)
+            for key in ('fit_time_s', 'cpu_time_s'):
+                cost[key] += spent[key] / len(sf_models)
+        cv = cv.reset_index() if 'cutoff' not in cv.columns else cv
+        cv = cv.sort_values(['cutoff', 'ds'])
+
+        shape = (len(cutoffs), self.test_horizon)
+        blocks = {col: cv[col].values.reshape(shape) for col in cv.columns if col not in ('unique_id', 'ds', 'cutoff')}
+        return parse_statsforecast(blocks, models)
+
+    def _cv_tree_model(self, model_name: str, make_model, cutoffs: np.ndarray) -> Dict:
+        """
+        Fit a tree model per window on slices of one precomputed feature matrix.
 
-        # Walk-forward prediction (no data leakage)
-        predictions = []
-        history_df = self.df.iloc[:-self.test_horizon].copy()  # Start with training data
+        Walk-forward rows for window w (train_end c) are feature rows c-1 .. c+h-2,
+        the same rows FeatureStore builds for the single holdout. Fit and predict
+        times add up over the windows; the shared feature build is charged to
+        every model using it, as in _run_tree_model.
 
-        for i in range(self.test_horizon):
-            # Create features using only historical data
-            feat = self._create_lag_features(history_df)
-            if len(feat) == 0:
-                # Not enough history to create features
-                predictions.append(history_df['y'].mean())
+        Args:
+            model_name: Name for progress output and the cost record
+            make_model: n_jobs -> unfitted regressor
+            cutoffs: Training-end positions from window_cutoffs
+
+        Returns:
+            Dict with (window, horizon) 'yhat'
+        """
+        print(f"  Running {model_name} cross-validation ({len(cutoffs)} windows)...")
+
+        # Built once per segment and shared by every tree model
+        if self._full_features is None:
+            with timed(self._full_feature_cost, 'fit'):
+                self._full_features = full_feature_matrix(self.df)
+        features, ready = self._full_features
+
+        cost = self._cost(model_name)
+        cost['fit_time_s'] += self._full_feature_cost['fit_time_s']
+        cost['cpu_time_s'] += self._full_feature_cost['cpu_time_s']
+
+        y = self.df['y'].values.astype(np.float32)
+        idx = np.arange(len(self.df))
+        h = self.test_horizon
+
+        # Rows without full features fall back to the history mean through that row
+        history_mean = np.cumsum(self.df['y'].values, dtype=float) / (idx + 1)
+
+        yhat = np.zeros((len(cutoffs), h))
+
+        for w, cut in enumerate(cutoffs):
+            with timed(cost, 'fit'):
+                train_mask = ready & (idx < cut)
+                model = make_model(self.n_jobs)
+                model.fit(np.ascontiguousarray(features[train_mask]), y[train_mask])
+
+            with timed(cost, 'predict'):
+                test_rows = np.arange(cut - 1, cut + h - 1)
+                test_ready = ready[test_rows]
+                yhat[w, ~test_ready] = history_mean[test_rows[~test_ready]]
+                if test_ready.any():
+                    yhat[w, test_ready] = model.predict(features[test_rows[test_ready]])
+
+        return {'yhat': yhat}
+
+    def _cv_prophet(self, cutoffs: np.ndarray, parallel: bool) -> Dict:
+        """Prophet per window; windows are independent so they fit in parallel processes (costs add up)."""
+        print(f"  Running Prophet cross-validation ({len(cutoffs)} windows)...")
+
+        h = self.test_horizon
+
+        if parallel and len(cutoffs) > 1:
+            ctx = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=min(len(cutoffs), os.cpu_count() or 1), mp_context=ctx) as executor:
+                windows = list(executor.map(
+                    _prophet_window_worker,
+                    [self.segment_data] * len(cutoffs),
+                    [int(c) for c in cutoffs],
+                    [h] * len(cutoffs),
+                    [self.freq] * len(cutoffs),
+                    [self.prophet_uncertainty_samples] * len(cutoffs),
+                ))
+            cost = self._cost('Prophet')
+            for _, window_cost in windows:
+                for key in ('fit_time_s', 'predict_time_s', 'cpu_time_s'):
+                    cost[key] += window_cost[key]
+            windows = [prediction for prediction, _ in windows]
+        else:
+            windows = [self._fit_predict_prophet(int(c), h, self._cost('Prophet')) for c in cutoffs]
+
+        return {key: np.vstack([w[key] for w in windows]) for key in windows[0]}
+
+    def cross_validate(
+        self,
+        n_windows: int = 4,
+        step_size: Optional[int] = None,
+        families: Optional[List[str]] = None,
+        parallel: bool = True,
+        timeout_s: Optional[float] = None,
+    ) -> Dict:
+        """
+        Rolling-origin cross-validation over n_windows test windows.
+
+        Built-in families:
+        - StatsForecast: native cross_validation (one call for all windows)
+        - XGBoost/LightGBM: features built once over the full series, each window
+          fits on a slice and predicts its precomputed walk-forward rows
+        - Prophet: one fit per window, windows run in parallel processes
+
+        Metrics are computed on (window x horizon) arrays; costs add up over the
+        windows (the whole run of each model, comparable across models).
+
+        Args:
+            n_windows: Number of test windows
+            step_size: Periods between window origins (default: test_horizon)
+            families: Registered families to run (default: all)
+            parallel: Let runners fit windows in parallel processes
+            timeout_s: Wall-clock limit per family (all its windows); families then
+                run one at a time in killable worker processes (see run_isolated)
+
+        Returns:
+            Model name -> {'predictions': (window, horizon) arrays + 'cutoffs', 'metrics', 'cost'} or {'error'}
+        """
+        families = resolve_models(families)
+
+        if timeout_s is not None:
+            cv = {'n_windows': n_windows, 'step_size': step_size, 'parallel': parallel}
+            family_results = self.run_isolated(families, timeout_s=timeout_s, cv=cv)
+            results = {}
+            for family in families:
+                results.update(family_results[family])
+            return results
+
+        step = step_size or self.test_horizon
+        cutoffs = self.window_cutoffs(n_windows, step)
+
+        # Actuals for every window in one gather
+        positions = cutoffs[:, None] + np.arange(self.test_horizon)[None, :]
+        actuals = self.df['y'].values[positions]
+
+        results = {}
+
+        for family in families:
+            spec = MODEL_REGISTRY[family]
+            if spec.cross_validate is None:
+                results[family] = {'error': f"{family} has no cross-validation runner"}
+                continue
+
+            try:
+                predictions = spec.cross_validate(self, cutoffs, step, parallel)
+            except Exception as e:
+                print(f"    {family} failed: {e}")
+                results[family] = {'error': str(e)}
                 continue
 
-            # Get the last row (most recent features)
-            X_current = feat[feature_cols].iloc[[-1]]
+            for model_name, pred_data in predictions.items():
+                results[model_name] = {
+                    'predictions': {**pred_data, 'actuals': actuals, 'cutoffs': self.df['ds'].values[cutoffs - 1]},
+                    'metrics': compute_block_metrics(
+                        actuals,
+                        pred_data['yhat'],
+                        pred_data.get('yhat_lower'),
+                        pred_data.get('yhat_upper'),
+                    ),
+                }
+
+        # Same cost records as run_family (peak RSS is the process high-water mark)
+        peak = peak_rss_mb()
+        for model_name, model_result in results.items():
+            if model_name in self.costs:
+                model_result['cost'] = {**self.costs[model_name], 'peak_rss_mb': peak}
 
-            # Predict next value
-            pred = model.predict(X_current)[0]
-            predictions.append(pred)
+        return results
 
-            # Add ACTUAL value to history (realistic: we know yesterday's actuals in production)
-            next_date = self.test_df.iloc[i]['ds']
-            actual_value = self.test_df.iloc[i]['y']
-            next_row = pd.DataFrame({'ds': [next_date], 'y': [actual_value]})
-            history_df = pd.concat([history_df, next_row], ignore_index=True)
+    def conformal_intervals(
+        self,
+        results: Dict,
+        n_windows: int = 4,
+        alpha: float = ALPHA,
+        horizon_pool: int = CONFORMAL_HORIZON_POOL,
+        timeout_s: Optional[float] = None,
+    ) -> Dict:
+        """
+        Give models without native intervals split-conformal ones and rescore them.
 
-        return {
-            'yhat': np.array(predictions),
-        }
+        Cross-validation results (window blocks) are calibrated window by window on
+        the windows before each one, so no extra fits run. Holdout results are
+        calibrated on n_windows rolling-origin windows ending where the holdout
+        starts; those fits are the interval cost. Either way the cost lands in
+        the model's cost['interval_time_s'] (shared calibration time is split
+        evenly over a family's models).
 
-    def compute_metrics(self, y_true: np.ndarray, y_pred: np.ndarray, y_lower: np.ndarray = None, y_upper: np.ndarray = None) -> Dict:
-        """Compute evaluation metrics."""
-        mae = mean_absolute_error(y_true, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_true, y_pred))
+        Args:
+            results: run_all, run_family or cross_validate output (updated in place)
+            n_windows: Calibration windows for holdout results
+            alpha: Miscoverage (0.05 -> 95% intervals)
+            horizon_pool: Neighbouring horizon steps pooled into each step's quantile
+            timeout_s: Wall-clock limit per calibration family (see cross_validate)
+
+        Returns:
+            results
+        """
+        needed = [
+            name for name, result in results.items()
+            if 'predictions' in result and result['predictions'].get('yhat_lower') is None
+            and model_family(name) in MODEL_REGISTRY
+        ]
+        if not needed:
+            return results
+
+        # Cross-validation blocks: earlier windows calibrate later ones
+        if np.ndim(results[needed[0]]['predictions']['yhat']) == 2:
+            spent = attach_conformal({'segment': results}, alpha, models=needed, horizon_pool=horizon_pool)
+            for name in needed:
+                predictions = results[name]['predictions']
+                results[name]['metrics'] = compute_block_metrics(
+                    predictions['actuals'], predictions['yhat'], predictions['yhat_lower'], predictions['yhat_upper']
+                )
+                results[name].setdefault('cost', {})['interval_time_s'] = spent / len(needed)
+            return results
+
+        print(f"  Calibrating conformal intervals ({n_windows} windows: {', '.join(needed)})...")
+        calibration = ForecastBenchmark(
+            truncate_segment(self.segment_data, self.test_horizon),
+            test_horizon=self.test_horizon,
+            forecast_freq=self.freq,
+            prophet_uncertainty_samples=0,
+            n_jobs=self.n_jobs,
+        )
 
-        # MAPE with floor
-        mape = np.mean(np.abs((y_true - y_pred) / np.maximum(y_true, 5.0))) * 100
+        by_family = {}
+        for name in needed:
+            by_family.setdefault(model_family(name), []).append(name)
+
+        costs = {name: results[name].setdefault('cost', new_cost()) for name in needed}
+        residuals = {}
+        for family, names in by_family.items():
+            spent = new_cost()
+            with timed(spent, 'interval'):
+                windows = calibration.cross_validate(
+                    n_windows, families=[family], parallel=False, timeout_s=timeout_s
+                )
+            for name in names:
+                for key in ('interval_time_s', 'cpu_time_s'):
+                    costs[name][key] = (costs[name].get(key) or 0.0) + spent[key] / len(names)
+                if 'predictions' in windows.get(name, {}):
+                    predictions = windows[name]['predictions']
+                    residuals[name] = predictions['actuals'] - predictions['yhat']
+                else:
+                    print(f"    {name} calibration failed: {windows.get(name, windows.get(family))}")
+
+        if not residuals:
+            return results
+
+        names = list(residuals)
+        spent = new_cost()
+        with timed(spent, 'interval'):
+            lower, upper = conformal_offsets(
+                np.stack([residuals[name] for name in names])[None], alpha, horizon_pool=horizon_pool
+            )
+            y_true = self.test_df['y'].values
+            for m, name in enumerate(names):
+                predictions = results[name]['predictions']
+                predictions['yhat_lower'] = np.asarray(predictions['yhat']) + lower[0, m]
+                predictions['yhat_upper'] = np.asarray(predictions['yhat']) + upper[0, m]
+                predictions['interval'] = 'conformal'
+                results[name]['metrics'] = self.compute_metrics(
+                    y_true, predictions['yhat'], predictions['yhat_lower'], predictions['yhat_upper']
+                )
+        for name in names:
+            for key in ('interval_time_s', 'cpu_time_s'):
+                costs[name][key] = (costs[name].get(key) or 0.0) + spent[key] / len(names)
 
-        # Bias
-        bias = np.mean(y_pred - y_true)
+        return results
 
-        # Coverage (if intervals provided)
-        coverage = None
-        if y_lower is not None and y_upper is not None:
-            in_bounds = (y_lower <= y_true) & (y_true <= y_upper)
-            coverage = in_bounds.mean()
+    def run_family(self, family: str, timeout_s: Optional[float] = None) -> Dict:
+        """
+        Run one registered model family and score it.
 
-        return {
-            'mae': float(mae),
-            'rmse': float(rmse),
-            'mape': float(mape),
-            'bias': float(bias),
-            'coverage': float(coverage) if coverage is not None else None
-        }
+        Args:
+            family: Name in MODEL_REGISTRY
+            timeout_s: Wall-clock limit; the family then runs in a killable
+                worker process (see run_isolated)
+
+        Returns:
+            Model name -> {'predictions', 'metrics', 'cost'} or {'error'} (same entries as run_all)
+        """
+        if timeout_s is not None:
+            return self.run_isolated([family], timeout_s=timeout_s)[family]
 
-    def run_all(self) -> Dict:
-        """Run all models and return results."""
+        spec = MODEL_REGISTRY[resolve_models([family])[0]]
         y_true = self.test_df['y'].values
 
         results = {}
 
-        # Prophet
         try:
-            prophet_result = self.run_prophet()
-            results['Prophet'] = {
-                'predictions': prophet_result,
+            predictions = spec.run(self)
+        except Exception as e:
+            print(f"    {family} failed: {e}")
+            predictions = {}
+            results[family] = {'error': str(e)}
+
+        for model_name, pred_data in predictions.items():
+            results[model_name] = {
+                'predictions': pred_data,
                 'metrics': self.compute_metrics(
                     y_true,
-                    prophet_result['yhat'],
-                    prophet_result['yhat_lower'],
-                    prophet_result['yhat_upper']
+                    pred_data['yhat'],
+                    pred_data.get('yhat_lower'),
+                    pred_data.get('yhat_upper')
                 )
             }
-        except Exception as e:
-            print(f"    Prophet failed: {e}")
-            results['Prophet'] = {'error': str(e)}
 
-        # StatsForecast
-        try:
-            sf_results = self.run_statsforecast()
+        # Peak RSS is the process high-water mark: per family in parallel runs,
+        # cumulative over earlier families in serial runs
+        peak = peak_rss_mb()
+        for model_name, model_result in results.items():
+            if model_name in self.costs:
+                model_result['cost'] = {**self.costs[model_name], 'peak_rss_mb': peak}
 
-            for model_name, pred_data in sf_results.items():
-                results[model_name] = {
-                    'predictions': pred_data,
-                    'metrics': self.compute_metrics(
-                        y_true,
-                        pred_data['yhat'],
-                        pred_data.get('yhat_lower'),
-                        pred_data.get('yhat_upper')
+        return results
+
+    def race(
+        self,
+        threshold: float,
+        metric: str = "mape",
+        budget_s: Optional[float] = None,
+        tiers: Optional[List[Tuple[str, List[str]]]] = None,
+        families: Optional[List[str]] = None,
+        timeout_s: Optional[float] = None,
+    ) -> Tuple[Dict, Dict]:
+        """
+        Run model tiers cheapest first, escalating only while accuracy misses the threshold.
+
+        After each tier the best model so far is compared with `threshold`; the race
+        stops as soon as it is met, or before starting a tier once `budget_s` of wall
+        time is used (a running tier is not interrupted).
+
+        Args:
+            threshold: Stop once the best model's metric is at or below this
+            metric: 'mae', 'rmse' or 'mape'
+            budget_s: Wall-clock budget per segment in seconds (None = unlimited)
+            tiers: (tier name, families) in run order (default: RACING_TIERS)
+            families: Registered families allowed to run (default: all)
+            timeout_s: Wall-clock limit per family (see run_isolated); a timed-out
+                family counts as tried and the race moves on
+
+        Returns:
+            (results as in run_all with a 'tier' on each entry,
+             summary with stopped_at, reason, best_model, best_score, elapsed_s)
+        """
+        if metric not in ('mae', 'rmse', 'mape'):
+            raise ValueError(f"metric must be 'mae', 'rmse' or 'mape', got {metric!r}")
+
+        allowed = set(resolve_models(families))
+        tiers = [
+            (tier_name, [f for f in tier_families if f in allowed])
+            for tier_name, tier_families in (tiers or RACING_TIERS)
+        ]
+        tiers = [(tier_name, tier_families) for tier_name, tier_families in tiers if tier_families]
+
+        results = {}
+        summary = {'stopped_at': None, 'reason': 'exhausted', 'best_model': None, 'best_score': None}
+        start = time.perf_counter()
+
+        for tier_name, tier_families in tiers:
+            if budget_s is not None and time.perf_counter() - start >= budget_s:
+                summary['reason'] = 'budget'
+                break
+
+            for family in tier_families:
+                for model_name, model_result in self.run_family(family, timeout_s).items():
+                    model_result['tier'] = tier_name
+                    results[model_name] = model_result
+            summary['stopped_at'] = tier_name
+
+            scored = {name: r['metrics'][metric] for name, r in results.items() if 'metrics' in r}
+            if scored:
+                best_model = min(scored, key=scored.get)
+                summary['best_model'] = best_model
+                summary['best_score'] = scored[best_model]
+                if scored[best_model] <= threshold:
+                    summary['reason'] = 'threshold'
+                    break
+
+        summary['elapsed_s'] = time.perf_counter() - start
+        return results, summary
+
+    def run_isolated(
+        self,
+        families: List[str],
+        n_workers: int = 1,
+        timeout_s: Optional[float] = None,
+        cv: Optional[Dict] = None,
+    ) -> Dict[str, Dict]:
+        """
+        Run model families in killable worker processes under a wall-clock watchdog.
+
+        Up to n_workers families run at once, each in its own spawned process. A
+        family still running timeout_s after it started is killed (with any
+        processes it spawned) and recorded as
+        {family: {'error', 'status': 'timeout', 'elapsed_s'}}; the others carry on.
+
+        Args:
+            families: Registered families to run
+            n_workers: Families running concurrently
+            timeout_s: Wall-clock limit per family in seconds (None = no limit)
+            cv: cross_validate keyword arguments to cross-validate instead of
+                scoring the holdout
+
+        Returns:
+            Family -> that family's run_family (or cross_validate) results
+        """
+        families = resolve_models(families)
+        thread_caps = family_thread_caps(n_workers, families)
+        benchmark_kwargs = {
+            'segment_data': self.segment_data,
+            'test_horizon': self.test_horizon,
+            'forecast_freq': self.freq,
+            'prophet_uncertainty_samples': self.prophet_uncertainty_samples,
+        }
+
+        # Spawn (not fork): forking after OpenMP/Stan threads start can deadlock the child
+        ctx = multiprocessing.get_context('spawn')
+        pending = list(families)
+        running = {}
+        family_results = {}
+
+        while pending or running:
+            while pending and len(running) < n_workers:
+                family = pending.pop(0)
+                parent_conn, child_conn = ctx.Pipe(duplex=False)
+                process = ctx.Process(
+                    target=_isolated_family_worker,
+                    args=(child_conn, benchmark_kwargs, family, thread_caps[family], cv),
+                )
+                process.start()
+                child_conn.close()
+                running[parent_conn] = (family, process, time.perf_counter())
+
+            if timeout_s is None:
+                wait_s = None
+            else:
+                next_deadline = min(started + timeout_s for _, _, started in running.values())
+                wait_s = max(0.0, next_deadline - time.perf_counter())
+
+            for conn in wait_connections(list(running), timeout=wait_s):
+                family, process, started = running.pop(conn)
+                try:
+                    family_results[family] = conn.recv()
+                except EOFError:
+                    # Died without sending results (e.g. killed by the OS)
+                    process.join()
+                    error = f"worker exited with code {process.exitcode}"
+                    print(f"    {family} failed: {error}")
+                    family_results[family] = {family: {'error': error}}
+                conn.close()
+                process.join()
+
+            if timeout_s is not None:
+                now = time.perf_counter()
+                for conn, (family, process, started) in list(running.items()):
+                    elapsed = now - started
+                    if elapsed >= timeout_s:
+                        _kill_process_tree(process)
+                        conn.close()
+                        del running[conn]
+                        print(f"    {family} timed out after {elapsed:.1f}s")
+                        family_results[family] = {family: {
+                            'error': f"timed out after {elapsed:.1f}s",
+                            'status': 'timeout',
+                            'elapsed_s': elapsed,
+                        }}
+
+        return family_results
+
+    def run_all(
+        self,
+        parallel: bool = False,
+        max_workers: Optional[int] = None,
+        families: Optional[List[str]] = None,
+        timeout_s: Optional[float] = None,
+    ) -> Dict:
+        """
+        Run all models and return results.
+
+        Args:
+            parallel: Run model families concurrently in worker processes
+            max_workers: Worker processes when parallel (default: one per family)
+            families: Registered families to run (default: all)
+            timeout_s: Wall-clock limit per family; families then run in killable
+                worker processes (see run_isolated)
+
+        Returns:
+            Model name -> {'predictions', 'metrics'} or {'error'}
+        """
+        families = resolve_models(families)
+
+        if not parallel and timeout_s is None:
+            results = {}
+            for family in families:
+                results.update(self.run_family(family))
+            return results
+
+        n_workers = (max_workers or len(families)) if parallel else 1
+        family_results = self.run_isolated(families, n_workers, timeout_s)
+
+        # Same model order as the serial run
+        results = {}
+        for family in families:
+            results.update(family_results[family])
+
+        return results
+
+
+# Built-in model families; registration order is result order
+
+# Racing tiers, cheapest first: (tier name, families)
+RACING_TIERS = [
+    ('baselines', ['Baselines']),
+    ('stats', ['StatsForecast']),
+    ('ml', ['XGBoost', 'LightGBM']),
+    ('prophet', ['Prophet']),
+]
+
+# StatsForecast-backed families -> model aliases (--statsforecast-batch fits them together)
+STATSFORECAST_FAMILIES = {
+    'StatsForecast': ['AutoARIMA', 'AutoETS'],
+    'Baselines': ['SeasonalNaive', 'Naive'],
+}
+STATSFORECAST_INTERVAL_MODELS = ('AutoARIMA', 'AutoETS')
+
+
+def model_family(model_name: str) -> str:
+    """Registered family that produces a model (e.g. 'SeasonalNaive' -> 'Baselines')."""
+    for family, aliases in STATSFORECAST_FAMILIES.items():
+        if model_name in aliases:
+            return family
+    return model_name
+
+
+def _run_prophet_family(benchmark: ForecastBenchmark) -> Dict:
+    return {'Prophet': benchmark.run_prophet()}
+
+
+def _cv_prophet_family(benchmark: ForecastBenchmark, cutoffs: np.ndarray, step: int, parallel: bool) -> Dict:
+    return {'Prophet': benchmark._cv_prophet(cutoffs, parallel)}
+
+
+def _run_statsforecast_family(benchmark: ForecastBenchmark) -> Dict:
+    return benchmark.run_statsforecast(STATSFORECAST_FAMILIES['StatsForecast'])
+
+
+def _cv_statsforecast_family(benchmark: ForecastBenchmark, cutoffs: np.ndarray, step: int, parallel: bool) -> Dict:
+    return benchmark._cv_statsforecast(cutoffs, step, STATSFORECAST_FAMILIES['StatsForecast'])
+
+
+def _run_baselines_family(benchmark: ForecastBenchmark) -> Dict:
+    return benchmark.run_statsforecast(STATSFORECAST_FAMILIES['Baselines'])
+
+
+def _cv_baselines_family(benchmark: ForecastBenchmark, cutoffs: np.ndarray, step: int, parallel: bool) -> Dict:
+    return benchmark._cv_statsforecast(cutoffs, step, STATSFORECAST_FAMILIES['Baselines'])
+
+
+def _run_xgboost_family(benchmark: ForecastBenchmark) -> Dict:
+    return {'XGBoost': benchmark.run_xgboost()}
+
+
+def _cv_xgboost_family(benchmark: ForecastBenchmark, cutoffs: np.ndarray, step: int, parallel: bool) -> Dict:
+    return {'XGBoost': benchmark._cv_tree_model('XGBoost', xgboost_regressor, cutoffs)}
+
+
+def _run_lightgbm_family(benchmark: ForecastBenchmark) -> Dict:
+    return {'LightGBM': benchmark.run_lightgbm()}
+
+
+def _cv_lightgbm_family(benchmark: ForecastBenchmark, cutoffs: np.ndarray, step: int, parallel: bool) -> Dict:
+    return {'LightGBM': benchmark._cv_tree_model('LightGBM', lightgbm_regressor, cutoffs)}
+
+
+def _run_fourier_family(benchmark: ForecastBenchmark) -> Dict:
+    print("  Running FourierRegression...")
+    forecast = fit_predict_segments(
+        [benchmark.segment_data], len(benchmark.train_df), benchmark.test_horizon,
+        cost=benchmark._cost('FourierRegression'),
+    )
+    return {'FourierRegression': forecast[0]}
+
+
+def _cv_fourier_family(benchmark: ForecastBenchmark, cutoffs: np.ndarray, step: int, parallel: bool) -> Dict:
+    print(f"  Running FourierRegression cross-validation ({len(cutoffs)} windows)...")
+    cost = benchmark._cost('FourierRegression')
+    windows = [
+        fit_predict_segments([benchmark.segment_data], int(c), benchmark.test_horizon, cost=cost)[0]
+        for c in cutoffs
+    ]
+    return {'FourierRegression': {key: np.vstack([w[key] for w in windows]) for key in windows[0]}}
+
+
+register_model('Prophet', _run_prophet_family, _cv_prophet_family, backends=('prophet',))
+register_model('StatsForecast', _run_statsforecast_family, _cv_statsforecast_family, backends=('statsforecast',))
+register_model('Baselines', _run_baselines_family, _cv_baselines_family, backends=('statsforecast',))
+register_model('XGBoost', _run_xgboost_family, _cv_xgboost_family, threaded=True, backends=('xgboost',))
+register_model('LightGBM', _run_lightgbm_family, _cv_lightgbm_family, threaded=True, backends=('lightgbm',))
+register_model('FourierRegression', _run_fourier_family, _cv_fourier_family, backends=('holidays',))
+
+
+def statsforecast_models(names: Optional[List[str]] = None) -> List:
+    """
+    StatsForecast models benchmarked (weekly seasonality).
+
+    Args:
+        names: Model aliases to keep (default: all)
+    """
+    from statsforecast.models import AutoARIMA, AutoETS, SeasonalNaive, Naive
+
+    models = [
+        AutoARIMA(season_length=7),  # Weekly seasonality
+        AutoETS(season_length=7),
+        SeasonalNaive(season_length=7),
+        Naive(),
+    ]
+    return [m for m in models if names is None or m.alias in names]
+
+
+def fit_predict_statsforecast(
+    df: pd.DataFrame,
+    horizon: int,
+    freq: str,
+    n_jobs: int = 1,
+    costs: Optional[Dict[str, Dict]] = None,
+    models: Optional[List[str]] = None,
+    per_model_timings: bool = False,
+) -> pd.DataFrame:
+    """
+    Fit and forecast StatsForecast models.
+
+    By default all models are fit in one StatsForecast call (setup and worker
+    pool paid once) and its wall/CPU time is split evenly over the models. With
+    per_model_timings each model gets its own call and its own measured cost.
+
+    Args:
+        df: Long frame with unique_id, ds, y
+        horizon: Periods to forecast
+        freq: Series frequency
+        n_jobs: StatsForecast worker processes
+        costs: Model name -> cost record to add timings to (created as needed)
+        models: Model aliases to run (default: all of statsforecast_models())
+        per_model_timings: One call per model instead of one shared call
+
+    Returns:
+        Forecast frame with unique_id, ds and every model's columns (predict() layout)
+    """
+    from statsforecast import StatsForecast
+
+    def fit_predict(sf_models: List) -> Tuple[pd.DataFrame, Dict]:
+        cost = new_cost()
+        sf = StatsForecast(models=sf_models, freq=freq, n_jobs=n_jobs)
+        with timed(cost, 'fit'):
+            sf.fit(df)
+        with timed(cost, 'predict'):
+            forecast = sf.predict(h=horizon, level=[95])
+        # Older StatsForecast versions return unique_id as the index
+        if 'unique_id' not in forecast.columns:
+            forecast = forecast.reset_index()
+        return forecast, cost
+
+    costs = costs if costs is not None else {}
+    sf_models = statsforecast_models(models)
+
+    if not per_model_timings:
+        forecast, cost = fit_predict(sf_models)
+        for model in sf_models:
+            record = costs.setdefault(model.alias, new_cost())
+            for key in ('fit_time_s', 'predict_time_s', 'cpu_time_s'):
+                record[key] += cost[key] / len(sf_models)
+        return forecast
+
+    forecast = None
+    for model in sf_models:
+        model_forecast, cost = fit_predict([model])
+        record = costs.setdefault(model.alias, new_cost())
+        for key in ('fit_time_s', 'predict_time_s', 'cpu_time_s'):
+            record[key] += cost[key]
+
+        if forecast is None:
+            forecast = model_forecast
+        else:
+            forecast = forecast.merge(model_forecast, on=['unique_id', 'ds'], how='left', validate='one_to_one')
+
+    return forecast
+
+
+def parse_statsforecast(forecast: pd.DataFrame, models: Optional[List[str]] = None) -> Dict:
+    """
+    Convert one series' StatsForecast predict() output into per-model predictions.
+
+    Args:
+        forecast: Forecast rows for a single unique_id, ordered by ds (or a mapping
+            of column name -> array, e.g. (window, horizon) cross-validation blocks)
+        models: Model aliases to extract (default: all of statsforecast_models())
+
+    Returns:
+        Model name -> {'yhat', optional 'yhat_lower'/'yhat_upper'}
+    """
+    names = models or ['AutoARIMA', 'AutoETS', 'SeasonalNaive', 'Naive']
+
+    predictions = {}
+    for name in names:
+        predictions[name] = {'yhat': np.asarray(forecast[name])}
+        # Baselines' intervals aren't scored
+        if name in STATSFORECAST_INTERVAL_MODELS:
+            predictions[name]['yhat_lower'] = np.asarray(forecast[f'{name}-lo-95'])
+            predictions[name]['yhat_upper'] = np.asarray(forecast[f'{name}-hi-95'])
+
+    return predictions
+
+
+def benchmark_statsforecast_batch(
+    segments_data: List[Dict],
+    test_horizon: int = 56,
+    freq: str = "D",
+    n_jobs: int = -1,
+    models: Optional[List[str]] = None,
+) -> Dict[str, Dict]:
+    """
+    Fit the StatsForecast models on every segment in one multi-series call.
+
+    Segments are stacked into one long frame keyed by their real segment names,
+    so StatsForecast's setup cost is paid once and series are fit in parallel
+    across n_jobs. Results are split back per segment and scored exactly as
+    run_family('StatsForecast') would.
+
+    Args:
+        segments_data: Segment data dicts
+        test_horizon: Periods held out per segment
+        freq: Series frequency
+        n_jobs: StatsForecast worker processes (-1 = all cores)
+        models: Model aliases to fit (default: all of statsforecast_models())
+
+    Returns:
+        Segment name -> {model name -> {'predictions', 'metrics', 'cost'}} (or {} on failure);
+        costs are the single batched call's fit/predict time split evenly over
+        the models and then divided by the number of series
+    """
+    print(f"  Running StatsForecast batch ({len(segments_data)} series, n_jobs={n_jobs})...")
+
+    benchmarks = {
+        seg['meta']['segment']: ForecastBenchmark(seg, test_horizon=test_horizon, forecast_freq=freq)
+        for seg in segments_data
+    }
+
+    long_df = pd.concat(
+        [bench.train_df.assign(unique_id=name) for name, bench in benchmarks.items()],
+        ignore_index=True,
+    )[['unique_id', 'ds', 'y']]
+
+    costs = {}
+    try:
+        forecast = fit_predict_statsforecast(long_df, test_horizon, freq, n_jobs=n_jobs, costs=costs, models=models)
+    except Exception as e:
+        print(f"    StatsForecast batch failed: {e}")
+        return {name: {} for name in benchmarks}
+
+    # Batched cost is amortized evenly over the series
+    peak = peak_rss_mb()
+    per_series = {
+        model_name: {**{k: cost[k] / len(benchmarks) for k in ('fit_time_s', 'predict_time_s', 'cpu_time_s')},
+                     'peak_rss_mb': peak}
+        for model_name, cost in costs.items()
+    }
+
+    results = {
+        name: {
+            model_name: {'predictions': pred_data, 'cost': dict(per_series[model_name])}
+            for model_name, pred_data in parse_statsforecast(group.sort_values('ds'), models).items()
+        }
+        for name, group in forecast.groupby('unique_id', sort=False)
+    }
+
+    # Score every segment x model in one pass
+    actuals = {name: benchmarks[name].test_df['y'].values for name in results}
+    attach_metrics(results, MetricEngine.from_results(results, actuals))
+
+    return results
+
+
+def benchmark_fourier_batch(segments_data: List[Dict], test_horizon: int = 56) -> Dict[str, Dict]:
+    """
+    Fit FourierRegression on every segment in one batched solve.
+
+    Args:
+        segments_data: Segment data dicts sharing one calendar
+        test_horizon: Periods held out per segment
+
+    Returns:
+        Segment name -> {'FourierRegression': {'predictions', 'metrics', 'cost'}};
+        cost is the batch time divided by the number of series
+    """
+    print(f"  Running FourierRegression batch ({len(segments_data)} series)...")
+
+    train_end = len(segments_data[0]['calendar']['ds']) - test_horizon
+    cost = new_cost()
+    forecasts = fit_predict_segments(segments_data, train_end, test_horizon, cost=cost)
+
+    per_series = {**{k: cost[k] / len(segments_data) for k in ('fit_time_s', 'predict_time_s', 'interval_time_s', 'cpu_time_s')},
+                  'peak_rss_mb': peak_rss_mb()}
+    results = {
+        seg['meta']['segment']: {'FourierRegression': {'predictions': forecast, 'cost': dict(per_series)}}
+        for seg, forecast in zip(segments_data, forecasts)
+    }
+
+    actuals = {seg['meta']['segment']: np.asarray(seg['observed']['units'][train_end:]) for seg in segments_data}
+    attach_metrics(results, MetricEngine.from_results(results, actuals))
+
+    return results
+
+
+def xgboost_regressor(n_jobs: int = -1):
+    """XGBoost regressor with the benchmark's hyperparameters."""
+    import xgboost as xgb
+
+    return xgb.XGBRegressor(
+        n_estimators=200,
+        max_depth=6,
+        learning_rate=0.05,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=42,
+        n_jobs=n_jobs
+    )
+
+
+def lightgbm_regressor(n_jobs: int = -1):
+    """LightGBM regressor with the benchmark's hyperparameters."""
+    import lightgbm as lgb
+
+    return lgb.LGBMRegressor(
+        n_estimators=200,
+        max_depth=6,
+        learning_rate=0.05,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=42,
+        n_jobs=n_jobs,
+        verbosity=-1
+    )
+
+
+# Segment-level categorical features appended to the lag features in the global model
+GLOBAL_CATEGORICALS = ['segment', 'region', 'channel']
+
+
+def benchmark_global_gbm(
+    segments_data: List[Dict],
+    test_horizon: int = 56,
+    models: Tuple[str, ...] = ('XGBoost', 'LightGBM'),
+    n_jobs: int = -1,
+) -> Dict[str, Dict]:
+    """
+    Train one gradient-boosting model across all segments and score every segment.
+
+    Each segment's FeatureStore rows are stacked and extended with integer-coded
+    segment/region/channel columns, which both libraries treat as categorical
+    (LightGBM categorical_feature, XGBoost feature_types 'c' with hist trees).
+    One model is fit per library, and all test
+    horizons are predicted in a single batched predict call, then split back per
+    segment. Results are reported as '<model>-Global'.
+
+    Args:
+        segments_data: Segment data dicts (meta.segment/region/channel are used as categories)
+        test_horizon: Periods held out per segment
+        models: Libraries to train ('XGBoost', 'LightGBM')
+        n_jobs: Threads per model (-1 = all cores)
+
+    Returns:
+        Segment name -> {'<model>-Global' -> {'predictions', 'metrics', 'cost'} or {'error'}}
+    """
+    print(f"  Running global GBM ({len(segments_data)} series: {', '.join(models)})...")
+
+    benchmarks = [ForecastBenchmark(seg, test_horizon=test_horizon) for seg in segments_data]
+    names = [seg['meta']['segment'] for seg in segments_data]
+    stores = [bench.feature_store() for bench in benchmarks]
+    n_series = len(segments_data)
+
+    # Integer codes per categorical (sorted labels -> stable codes)
+    codes = np.zeros((len(segments_data), len(GLOBAL_CATEGORICALS)), dtype=np.float32)
+    for j, key in enumerate(GLOBAL_CATEGORICALS):
+        labels = [seg['meta'].get(key, '') for seg in segments_data]
+        lookup = {label: k for k, label in enumerate(sorted(set(labels)))}
+        codes[:, j] = [lookup[label] for label in labels]
+
+    def with_codes(X: np.ndarray, i: int) -> np.ndarray:
+        return np.hstack([X, np.broadcast_to(codes[i], (len(X), codes.shape[1]))])
+
+    X_train = np.ascontiguousarray(np.vstack([with_codes(st.X_train, i) for i, st in enumerate(stores)]))
+    y_train = np.concatenate([st.y_train for st in stores])
+
+    # Only walk-forward rows with full features go through the model
+    X_test = np.ascontiguousarray(np.vstack([with_codes(st.X_test[st.test_ready], i) for i, st in enumerate(stores)]))
+    offsets = np.cumsum([0] + [int(st.test_ready.sum()) for st in stores])
+
+    n_lag_features = stores[0].X_train.shape[1]
+    categorical_idx = list(range(n_lag_features, n_lag_features + len(GLOBAL_CATEGORICALS)))
+
+    results = {name: {} for name in names}
+
+    for model_name in models:
+        label = f"{model_name}-Global"
+        cost = new_cost()
+        try:
+            with timed(cost, 'fit'):
+                if model_name == 'XGBoost':
+                    model = xgboost_regressor(n_jobs)
+                    model.set_params(
+                        tree_method='hist',
+                        enable_categorical=True,
+                        feature_types=['q'] * n_lag_features + ['c'] * len(GLOBAL_CATEGORICALS),
                     )
+                    model.fit(X_train, y_train)
+                elif model_name == 'LightGBM':
+                    model = lightgbm_regressor(n_jobs)
+                    model.fit(X_train, y_train, categorical_feature=categorical_idx)
+                else:
+                    raise ValueError(f"Unknown global model {model_name!r}")
+
+            # One batched predict for every segment's horizon
+            with timed(cost, 'predict'):
+                preds = model.predict(X_test) if len(X_test) else np.array([])
+            peak = peak_rss_mb()
+
+            for i, (name, bench, st) in enumerate(zip(names, benchmarks, stores)):
+                yhat = st.test_fallback.copy()
+                yhat[st.test_ready] = preds[offsets[i]:offsets[i + 1]]
+                results[name][label] = {
+                    'predictions': {'yhat': yhat},
+                    # Global fit/predict amortized per series, plus this segment's own feature build
+                    'cost': {
+                        'fit_time_s': cost['fit_time_s'] / n_series + bench._feature_cost['fit_time_s'],
+                        'predict_time_s': cost['predict_time_s'] / n_series,
+                        'cpu_time_s': cost['cpu_time_s'] / n_series + bench._feature_cost['cpu_time_s'],
+                        'peak_rss_mb': peak,
+                    },
                 }
         except Exception as e:
-            print(f"    StatsForecast failed: {e}")
+            print(f"    {label} failed: {e}")
+            for name in names:
+                results[name][label] = {'error': str(e)}
 
-        # XGBoost
-        try:
-            xgb_result = self.run_xgboost()
-            results['XGBoost'] = {
-                'predictions': xgb_result,
-                'metrics': self.compute_metrics(y_true, xgb_result['yhat'])
-            }
-        except Exception as e:
-            print(f"    XGBoost failed: {e}")
-            results['XGBoost'] = {'error': str(e)}
+    # Score every segment x model in one pass
+    actuals = {name: bench.test_df['y'].values for name, bench in zip(names, benchmarks)}
+    attach_metrics(results, MetricEngine.from_results(results, actuals))
 
-        # LightGBM
-        try:
-            lgb_result = self.run_lightgbm()
-            results['LightGBM'] = {
-                'predictions': lgb_result,
-                'metrics': self.compute_metrics(y_true, lgb_result['yhat'])
-            }
-        except Exception as e:
-            print(f"    LightGBM failed: {e}")
-            results['LightGBM'] = {'error': str(e)}
+    return results
+
+
+def attach_metrics(results: Dict[str, Dict[str, Dict]], engine: MetricEngine):
+    """Add per segment x model 'metrics' (compute_metrics layout) to results scored by engine."""
+    table = engine.score(by=('segment', 'model'))
+    for (segment, model_name), row in table.iterrows():
+        if model_name in results[segment] and 'predictions' in results[segment][model_name]:
+            results[segment][model_name]['metrics'] = to_scalars(row)
+
+
+def attach_horizon_metrics(results: Dict[str, Dict], actuals: np.ndarray, horizons: List[int]) -> Dict:
+    """
+    Score one segment's forecasts over the first h steps for every h in horizons.
+
+    The forecasts are sliced, not refit: one run at the longest horizon yields
+    every shorter horizon from the same origins.
+
+    Args:
+        results: run_all or cross_validate output for one segment (updated in place)
+        actuals: (horizon,) holdout or (window, horizon) actuals
+        horizons: Horizons to score, each at most the forecast length
 
+    Returns:
+        results, with 'metrics_by_horizon' ({h: metrics}) on every scored model
+    """
+    scored = {name: result for name, result in results.items() if 'predictions' in result}
+    if not scored:
         return results
 
+    engine = MetricEngine.from_results({'segment': scored}, {'segment': actuals})
+    for (horizon, model_name), row in engine.horizon_sweep(horizons).iterrows():
+        results[model_name].setdefault('metrics_by_horizon', {})[int(horizon)] = to_scalars(row)
+
+    return results
 
-def benchmark_all_segments(data_dir: Path = Path("./data")) -> pd.DataFrame:
+
+def full_feature_matrix(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Run benchmark on all segments and return summary DataFrame.
+    Lag features for every row of a series (NaN rows kept) as a float32 matrix.
+
+    Args:
+        df: Frame with 'ds' and 'y'
+
+    Returns:
+        (features (n_rows, n_features), ready mask where no feature is missing)
     """
-    json_files = sorted(data_dir.glob("AirJordan_*.json"))
+    names = feature_names()
+    feat = create_lag_features(df.reset_index(drop=True)).reindex(range(len(df)))
+    features = np.ascontiguousarray(feat[names].values, dtype=np.float32)
+    return features, ~np.isnan(features).any(axis=1)
+
+
+def compute_block_metrics(
+    y_true: np.ndarray,
+    y_pred: np.ndarray,
+    y_lower: Optional[np.ndarray] = None,
+    y_upper: Optional[np.ndarray] = None,
+) -> Dict:
+    """
+    Metrics over a (window, horizon) block, pooled over all points.
 
-    all_results = []
+    Same definitions as ForecastBenchmark.compute_metrics, plus per-window MAE.
 
-    for json_file in json_files:
-        print(f"\nBenchmarking {json_file.stem}...")
+    Args:
+        y_true: (n_windows, horizon) actuals
+        y_pred: (n_windows, horizon) predictions
+        y_lower: Optional lower interval bounds, same shape
+        y_upper: Optional upper interval bounds, same shape
 
-        with open(json_file, 'r') as f:
-            segment_data = json.load(f)
+    Returns:
+        Dict with mae, rmse, mape, bias, coverage, windows and mae_by_window
+    """
+    return {
+        **to_scalars(score(y_true, y_pred, y_lower, y_upper)),
+        'windows': int(np.shape(y_true)[0]),
+        'mae_by_window': score(y_true, y_pred, axis=1)['mae'].tolist(),
+    }
+
+
+def _prophet_window_worker(
+    segment_data: Dict,
+    train_end: int,
+    horizon: int,
+    freq: str,
+    prophet_uncertainty_samples: int,
+) -> Dict:
+    """Worker process entry: fit Prophet for one cross-validation window; returns (prediction, cost)."""
+    _limit_threads(1)
+
+    benchmark = ForecastBenchmark(
+        segment_data,
+        test_horizon=horizon,
+        forecast_freq=freq,
+        prophet_uncertainty_samples=prophet_uncertainty_samples,
+    )
+    cost = new_cost()
+    return benchmark._fit_predict_prophet(train_end, horizon, cost), cost
+
+
+def family_thread_caps(n_workers: int, families: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Threads each model family may use when families run side by side.
 
-        benchmark = ForecastBenchmark(segment_data, test_horizon=56)
-        results = benchmark.run_all()
+    Single-threaded families (Prophet/Stan, StatsForecast) get one thread; the
+    threaded ones (gradient boosting) split the remaining cores so n_jobs=-1
+    doesn't oversubscribe.
 
-        # Extract metrics for each model
-        for model_name, model_result in results.items():
-            if 'metrics' in model_result:
-                metrics = model_result['metrics']
-                all_results.append({
-                    'segment': json_file.stem,
-                    'model': model_name,
+    Args:
+        n_workers: Number of concurrently running families
+        families: Families running (default: all registered)
+
+    Returns:
+        Family -> thread count
+    """
+    families = resolve_models(families)
+    n_cores = os.cpu_count() or 1
+    single_threaded = [f for f in families if not MODEL_REGISTRY[f].threaded]
+    threaded = [f for f in families if MODEL_REGISTRY[f].threaded]
+
+    caps = {family: 1 for family in single_threaded}
+    if threaded:
+        spare = max(len(threaded), n_cores - len(single_threaded))
+        threads = max(1, spare // len(threaded)) if n_workers > 1 else n_cores
+        caps.update({family: threads for family in threaded})
+    return caps
+
+
+def _limit_threads(n_threads: int):
+    """Cap native thread pools (OpenMP/BLAS) in a worker process."""
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS'):
+        os.environ[var] = str(n_threads)
+
+
+def _isolated_family_worker(
+    conn,
+    benchmark_kwargs: Dict,
+    family: str,
+    n_threads: int,
+    cv: Optional[Dict] = None,
+):
+    """
+    Watchdog child entry: run one model family and send its results back over `conn`.
+
+    The child starts its own session so the watchdog can kill it together with
+    anything it spawned (Stan/cmdstan executables, window pools).
+    """
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    _limit_threads(n_threads)
+
+    try:
+        benchmark = ForecastBenchmark(**benchmark_kwargs, n_jobs=n_threads)
+        if cv is not None:
+            results = benchmark.cross_validate(families=[family], **cv)
+        else:
+            results = benchmark.run_family(family)
+    except Exception as e:
+        results = {family: {'error': str(e)}}
+
+    conn.send(results)
+    conn.close()
+
+
+def _kill_process_tree(process):
+    """Kill a watchdog child and its process group, then reap it."""
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            # Killed before setsid() ran: the child isn't a group leader yet
+            pass
+    if process.is_alive():
+        process.kill()
+    process.join()
+
+
+# tier / race_stop are filled in racing runs only (tier that produced the row, tier the segment stopped at)
+# horizon is the number of steps scored (rows of a horizon sweep share one fit and its cost)
+RESULT_COLUMNS = ['segment', 'model', 'horizon', 'mae', 'rmse', 'mape', 'bias', 'coverage'] + COST_COLUMNS + ['tier', 'race_stop']
+# elapsed_s is the wall time a timed-out family ran before it was killed
+CHECKPOINT_COLUMNS = RESULT_COLUMNS + ['status', 'error', 'elapsed_s', 'config_hash']
+
+
+def benchmark_config_hash(json_file: Path, config: Dict) -> str:
+    """
+    Hash a segment file's contents together with the benchmark settings.
+
+    A checkpointed segment is reused on restart only if this hash matches, so
+    editing the data or changing the horizon/models invalidates it.
+
+    Args:
+        json_file: Segment JSON path
+        config: Benchmark settings that affect results
+
+    Returns:
+        Short hex digest
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(config, sort_keys=True).encode())
+    with open(json_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def results_to_rows(segment: str, results: Dict, horizon: Optional[int] = None) -> List[Dict]:
+    """
+    Flatten run_all results into checkpoint rows (metrics and errors).
+
+    Models with 'metrics_by_horizon' (attach_horizon_metrics) get one row per horizon.
+
+    Args:
+        segment: Segment name
+        results: run_all output
+        horizon: Forecast horizon the metrics cover
+
+    Returns:
+        List of dicts with CHECKPOINT_COLUMNS (minus config_hash)
+    """
+    rows = []
+
+    for model_name, model_result in results.items():
+        if 'metrics' in model_result:
+            by_horizon = model_result.get('metrics_by_horizon') or {horizon: model_result['metrics']}
+            for steps, metrics in by_horizon.items():
+                row = {'segment': segment, 'model': model_name, 'horizon': steps}
+                row.update({
                     'mae': metrics['mae'],
                     'rmse': metrics['rmse'],
                     'mape': metrics['mape'],
                     'bias': metrics['bias'],
                     'coverage': metrics.get('coverage'),
+                    'status': 'ok',
+                    'error': None,
                 })
+                row.update({col: model_result.get('cost', {}).get(col) for col in COST_COLUMNS})
+                row['tier'] = model_result.get('tier')
+                rows.append(row)
+        else:
+            row = {'segment': segment, 'model': model_name}
+            row.update({
+                'status': model_result.get('status', 'error'),
+                'error': model_result.get('error'),
+                'elapsed_s': model_result.get('elapsed_s'),
+            })
+            rows.append(row)
+
+    return rows
+
+
+def load_checkpoint(checkpoint_path: Path) -> pd.DataFrame:
+    """Read checkpoint rows (empty frame if the file doesn't exist)."""
+    if checkpoint_path is None or not checkpoint_path.exists():
+        return pd.DataFrame(columns=CHECKPOINT_COLUMNS)
+    return pd.read_csv(checkpoint_path, float_precision='round_trip')
+
+
+def append_checkpoint(checkpoint_path: Path, rows: List[Dict], config_hash: str):
+    """
+    Append one finished segment's rows and flush them to disk.
+
+    Args:
+        checkpoint_path: Checkpoint CSV
+        rows: Rows from results_to_rows
+        config_hash: benchmark_config_hash of the segment
+    """
+    if not rows:
+        # Record the segment as done even if every model failed silently
+        rows = [{'segment': None, 'model': None, 'status': 'empty'}]
+
+    frame = pd.DataFrame(rows)
+    frame['config_hash'] = config_hash
+    frame = frame.reindex(columns=CHECKPOINT_COLUMNS)
+
+    write_header = not checkpoint_path.exists() or checkpoint_path.stat().st_size == 0
+    with open(checkpoint_path, 'a') as f:
+        frame.to_csv(f, header=write_header, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def merge_family_rows(rows: List[Dict], batch_rows: List[Dict]) -> List[Dict]:
+    """Insert batched StatsForecast/Baselines rows after Prophet, keeping the serial model order."""
+    if not batch_rows:
+        return rows
+    prophet_rows = [r for r in rows if r['model'] == 'Prophet']
+    other_rows = [r for r in rows if r['model'] != 'Prophet']
+    return prophet_rows + batch_rows + other_rows
+
+
+def _benchmark_segment_worker(
+    json_file: str,
+    test_horizon: int,
+    parallel_models: bool,
+    n_jobs: int,
+    families: Optional[List[str]] = None,
+    cv_windows: int = 1,
+    race: Optional[Dict] = None,
+    model_timeout: Optional[float] = None,
+    conformal: Optional[Dict] = None,
+    horizons: Optional[List[int]] = None,
+) -> Tuple[str, List[Dict]]:
+    """
+    Worker process entry: benchmark one segment file.
+
+    Cross-validated if cv_windows > 1; raced through RACING_TIERS if race
+    ({'threshold', 'metric', 'budget_s'}) is given. With model_timeout, every
+    family runs in a killable worker process under that wall-clock limit.
+    With conformal ({'alpha', 'windows', 'horizon_pool'}), models without
+    intervals get conformal ones (see ForecastBenchmark.conformal_intervals).
+    With horizons, every model is also scored over the first h of its
+    test_horizon steps for each h (see attach_horizon_metrics).
+    """
+    if n_jobs > 0:
+        _limit_threads(n_jobs)
+
+    json_file = Path(json_file)
+    print(f"\nBenchmarking {json_file.stem}...")
+
+    with open(json_file, 'r') as f:
+        segment_data = json.load(f)
+
+    benchmark = ForecastBenchmark(segment_data, test_horizon=test_horizon, n_jobs=n_jobs)
+
+    def finish(results: Dict) -> List[Dict]:
+        if conformal is not None:
+            benchmark.conformal_intervals(
+                results,
+                n_windows=conformal['windows'],
+                alpha=conformal['alpha'],
+                horizon_pool=conformal['horizon_pool'],
+                timeout_s=model_timeout,
+            )
+        if horizons:
+            scored = [r['predictions'] for r in results.values() if 'predictions' in r]
+            actuals = scored[0].get('actuals', benchmark.test_df['y'].values) if scored else None
+            attach_horizon_metrics(results, actuals, horizons)
+        return results_to_rows(json_file.stem, results, test_horizon)
+
+    if race is not None:
+        results, summary = benchmark.race(families=families, timeout_s=model_timeout, **race)
+        best = f"{summary['best_model']} {race['metric']}={summary['best_score']:.2f}" if summary['best_model'] else "no model"
+        print(f"  Stopped at {summary['stopped_at']} ({summary['reason']}, {best}, {summary['elapsed_s']:.1f}s)")
+        rows = finish(results)
+        for row in rows:
+            row['race_stop'] = f"{summary['stopped_at']}:{summary['reason']}"
+        return json_file.stem, rows
+
+    if cv_windows > 1:
+        results = benchmark.cross_validate(
+            n_windows=cv_windows, families=families, parallel=parallel_models, timeout_s=model_timeout
+        )
+    else:
+        results = benchmark.run_all(parallel=parallel_models, families=families, timeout_s=model_timeout)
+
+    return json_file.stem, finish(results)
+
+
+def benchmark_all_segments(
+    data_dir: Path = Path("./data"),
+    parallel_models: bool = False,
+    test_horizon: int = 56,
+    n_workers: int = 1,
+    checkpoint_path: Optional[Path] = None,
+    resume: bool = True,
+    statsforecast_batch: bool = False,
+    global_gbm: bool = False,
+    cv_windows: int = 1,
+    models: Optional[List[str]] = None,
+    race: Optional[Dict] = None,
+    model_timeout: Optional[float] = None,
+    fourier_batch: bool = False,
+    conformal: Optional[Dict] = None,
+    horizons: Optional[List[int]] = None,
+) -> pd.DataFrame:
+    """
+    Run benchmark on all segments and return summary DataFrame.
+
+    Each finished segment is appended to the checkpoint immediately, so a crash
+    only loses segments that were in flight. On restart, segments already in the
+    checkpoint with the same config hash are skipped.
+
+    Args:
+        data_dir: Directory with AirJordan_*.json segment files
+        parallel_models: Run model families concurrently within each segment
+            (ignored when n_workers > 1 to avoid nested process pools)
+        test_horizon: Periods held out per segment
+        n_workers: Segments benchmarked concurrently in worker processes
+        checkpoint_path: Checkpoint CSV (None disables checkpointing)
+        resume: Skip segments already completed with the same config hash
+        statsforecast_batch: Fit StatsForecast models for all pending segments in one
+            multi-series call instead of once per segment
+        global_gbm: Also train one XGBoost/LightGBM model across all segments
+            (reported as 'XGBoost-Global'/'LightGBM-Global')
+        cv_windows: Rolling-origin windows per segment (1 = single holdout);
+            metrics are pooled over all windows
+        models: Registered families to run (default: all)
+        race: Race each segment through RACING_TIERS instead of running every family,
+            as {'threshold', 'metric', 'budget_s'} (see ForecastBenchmark.race)
+        model_timeout: Wall-clock limit in seconds per model family and segment;
+            a family that exceeds it is killed and checkpointed with status
+            'timeout' (batched StatsForecast and global models are not covered)
+        fourier_batch: Fit FourierRegression for all pending segments in one
+            batched solve instead of once per segment
+        conformal: Conformal intervals for per-segment models without native ones,
+            as {'alpha', 'windows', 'horizon_pool'}; holdout runs calibrate on
+            'windows' extra rolling-origin windows, cross-validation runs on their
+            own earlier windows (batched and global models are not covered)
+        horizons: Horizon sweep: fit once at max(horizons) (overriding test_horizon)
+            and report every model over the first h steps for each h, one row per
+            horizon (rows of one fit share its cost)
+
+    Returns:
+        DataFrame with RESULT_COLUMNS for every model that produced metrics
+    """
+    if horizons:
+        if min(horizons) < 1:
+            raise ValueError(f"Horizons must be positive, got {horizons}")
+        horizons = sorted(set(horizons))
+        test_horizon = horizons[-1]
+
+    if cv_windows > 1 and (statsforecast_batch or global_gbm or fourier_batch):
+        raise ValueError("cv_windows > 1 is not supported with statsforecast_batch, global_gbm or fourier_batch")
+    if race is not None and (cv_windows > 1 or statsforecast_batch):
+        raise ValueError("race is not supported with cv_windows > 1 or statsforecast_batch")
+
+    json_files = sorted(data_dir.glob("AirJordan_*.json"))
+    families = resolve_models(models)
+
+    config = {
+        'test_horizon': test_horizon,
+        'models': families,
+        'statsforecast_batch': statsforecast_batch,
+        'global_gbm': global_gbm,
+        'cv_windows': cv_windows,
+        'race': race,
+        'model_timeout': model_timeout,
+        'fourier_batch': fourier_batch,
+        'conformal': conformal,
+        'horizons': horizons,
+    }
+    hashes = {json_file.stem: benchmark_config_hash(json_file, config) for json_file in json_files}
+
+    # Completed segments from a previous run
+    checkpoint = load_checkpoint(checkpoint_path)
+    stale_layout = list(checkpoint.columns) != CHECKPOINT_COLUMNS
+    if stale_layout and resume:
+        print(f"Checkpoint {checkpoint_path} has an older column layout; starting over")
+    if (not resume or stale_layout) and checkpoint_path is not None and checkpoint_path.exists():
+        checkpoint_path.unlink()
+        checkpoint = load_checkpoint(None)
+
+    done_hashes = set(checkpoint['config_hash'].dropna())
+    pending = [f for f in json_files if hashes[f.stem] not in done_hashes]
+    reused = checkpoint[checkpoint['config_hash'].isin([hashes[f.stem] for f in json_files])]
+
+    if len(json_files) > len(pending):
+        print(f"Resuming: {len(json_files) - len(pending)} of {len(json_files)} segments already in {checkpoint_path}")
+
+    all_rows = reused.to_dict('records')
+
+    def batch_to_rows(batch_results: Dict[str, Dict], segments_data: List[Dict]) -> Dict[str, List[Dict]]:
+        units = {seg['meta']['segment']: seg['observed']['units'] for seg in segments_data}
+        rows = {}
+        for name, results in batch_results.items():
+            if horizons:
+                attach_horizon_metrics(results, np.asarray(units[name][-test_horizon:], dtype=float), horizons)
+            rows[name] = results_to_rows(name, results, test_horizon)
+        return rows
+
+    # StatsForecast for every pending segment in one stacked fit; rows are merged per segment below
+    batch_rows = {}
+    batch_families = [f for f in families if f in STATSFORECAST_FAMILIES]
+    if statsforecast_batch and batch_families and pending:
+        families = [f for f in families if f not in STATSFORECAST_FAMILIES]
+        batch_models = [m for family in batch_families for m in STATSFORECAST_FAMILIES[family]]
+        segments_data = []
+        for json_file in pending:
+            with open(json_file, 'r') as f:
+                segment_data = json.load(f)
+            segment_data['meta']['segment'] = json_file.stem
+            segments_data.append(segment_data)
+
+        sf_results = benchmark_statsforecast_batch(segments_data, test_horizon=test_horizon, models=batch_models)
+        batch_rows = batch_to_rows(sf_results, segments_data)
+        del segments_data
+
+    # FourierRegression for every pending segment in one batched solve
+    fourier_rows = {}
+    if fourier_batch and 'FourierRegression' in families and pending:
+        families = [f for f in families if f != 'FourierRegression']
+        segments_data = []
+        for json_file in pending:
+            with open(json_file, 'r') as f:
+                segment_data = json.load(f)
+            segment_data['meta']['segment'] = json_file.stem
+            segments_data.append(segment_data)
+
+        fr_results = benchmark_fourier_batch(segments_data, test_horizon=test_horizon)
+        fourier_rows = batch_to_rows(fr_results, segments_data)
+        del segments_data
+
+    # Global models train on every segment (not just pending ones) so resumed runs match full runs
+    global_rows = {}
+    if global_gbm and pending:
+        segments_data = []
+        for json_file in json_files:
+            with open(json_file, 'r') as f:
+                segment_data = json.load(f)
+            segment_data['meta']['segment'] = json_file.stem
+            segments_data.append(segment_data)
+
+        global_results = benchmark_global_gbm(segments_data, test_horizon=test_horizon)
+        global_rows = batch_to_rows(global_results, segments_data)
+        del segments_data
+
+    if n_workers > 1:
+        n_jobs = max(1, (os.cpu_count() or 1) // n_workers)
+        ctx = multiprocessing.get_context('spawn')
+
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx) as executor:
+            futures = {
+                executor.submit(
+                    _benchmark_segment_worker,
+                    str(json_file), test_horizon, False, n_jobs, families, cv_windows, race, model_timeout,
+                    conformal, horizons,
+                ): json_file
+                for json_file in pending
+            }
 
-    return pd.DataFrame(all_results)
+            for i, future in enumerate(as_completed(futures)):
+                json_file = futures[future]
+                try:
+                    segment, rows = future.result()
+                except Exception as e:
+                    print(f"  {json_file.stem} failed: {e}")
+                    continue
+
+                rows = (merge_family_rows(rows, batch_rows.get(segment, []))
+                        + fourier_rows.get(segment, []) + global_rows.get(segment, []))
+                if checkpoint_path is not None:
+                    append_checkpoint(checkpoint_path, rows, hashes[segment])
+                all_rows.extend(rows)
+                print(f"  [{i+1}/{len(pending)}] {segment} done")
+    else:
+        for json_file in pending:
+            segment, rows = _benchmark_segment_worker(
+                str(json_file), test_horizon, parallel_models, -1, families, cv_windows, race, model_timeout,
+                conformal, horizons,
+            )
+            rows = (merge_family_rows(rows, batch_rows.get(segment, []))
+                    + fourier_rows.get(segment, []) + global_rows.get(segment, []))
+            if checkpoint_path is not None:
+                append_checkpoint(checkpoint_path, rows, hashes[segment])
+            all_rows.extend(rows)
+
+    results_df = pd.DataFrame(all_rows, columns=CHECKPOINT_COLUMNS)
+    timeouts = results_df[results_df['status'] == 'timeout']
+    if len(timeouts):
+        print(f"\n{len(timeouts)} model runs timed out:")
+        for _, row in timeouts.iterrows():
+            print(f"  {row['segment']} / {row['model']} after {row['elapsed_s']:.1f}s")
+    results_df = results_df[results_df['status'] == 'ok']
+
+    # Stable segment order regardless of completion order
+    order = {json_file.stem: i for i, json_file in enumerate(json_files)}
+    results_df = results_df.sort_values('segment', key=lambda col: col.map(order), kind='stable')
+
+    return results_df[RESULT_COLUMNS].reset_index(drop=True)
 
 
 def main():
     """Run full benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark forecasting models on Air Jordan segments")
+    parser.add_argument("--data-dir", default="./data", help="Directory with AirJordan_*.json files")
+    parser.add_argument("--horizon", type=int, default=56, help="Test horizon in periods")
+    parser.add_argument("--workers", type=int, default=1, help="Segments benchmarked in parallel")
+    parser.add_argument("--parallel-models", action="store_true",
+                        help="Run model families concurrently within each segment (single worker only)")
+    parser.add_argument("--checkpoint", default="benchmark_checkpoint.csv",
+                        help="Per-segment checkpoint CSV (appended as segments finish)")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore and overwrite an existing checkpoint")
+    parser.add_argument("--statsforecast-batch", action="store_true",
+                        help="Fit StatsForecast models for all segments in one multi-series call")
+    parser.add_argument("--global-gbm", action="store_true",
+                        help="Also train one XGBoost/LightGBM model across all segments")
+    parser.add_argument("--fourier-batch", action="store_true",
+                        help="Fit FourierRegression for all segments in one batched solve")
+    parser.add_argument("--models", default=",".join(MODEL_REGISTRY),
+                        help=f"Comma-separated model families to run (registered: {', '.join(MODEL_REGISTRY)})")
+    parser.add_argument("--cv-windows", type=int, default=1,
+                        help="Rolling-origin cross-validation windows per segment (1 = single holdout)")
+    parser.add_argument("--race", action="store_true",
+                        help="Run baselines first and escalate per segment only while accuracy misses --race-threshold")
+    parser.add_argument("--race-threshold", type=float, default=40.0,
+                        help="Racing stops once the best model's --race-metric is at or below this")
+    parser.add_argument("--race-metric", default="mape", choices=["mae", "rmse", "mape"], help="Racing metric")
+    parser.add_argument("--race-budget", type=float, default=None,
+                        help="Racing wall-clock budget per segment in seconds (checked between tiers)")
+    parser.add_argument("--model-timeout", type=float, default=None,
+                        help="Wall-clock limit in seconds per model family and segment; "
+                             "hung fits are killed and recorded as timeouts")
+    parser.add_argument("--conformal", action="store_true",
+                        help="Conformal intervals for models without native ones (Naive, SeasonalNaive, XGBoost, LightGBM)")
+    parser.add_argument("--conformal-windows", type=int, default=4,
+                        help="Rolling-origin calibration windows for conformal intervals on the holdout")
+    parser.add_argument("--conformal-alpha", type=float, default=ALPHA,
+                        help="Conformal miscoverage (0.05 = 95%% intervals)")
+    parser.add_argument("--horizons", default=None,
+                        help="Comma-separated horizons (e.g. 7,14,28,56): fit once at the longest "
+                             "and score every horizon from the same forecasts (overrides --horizon)")
+    parser.add_argument("--output", default="benchmark_results.csv", help="Results CSV")
+
+    args = parser.parse_args()
+    if args.model_timeout is not None and args.model_timeout <= 0:
+        parser.error("--model-timeout must be positive")
+    if args.conformal and not 0 < args.conformal_alpha < 1:
+        parser.error("--conformal-alpha must be between 0 and 1")
+    horizons = None
+    if args.horizons:
+        try:
+            horizons = sorted({int(h) for h in args.horizons.split(",")})
+        except ValueError:
+            parser.error("--horizons must be comma-separated integers")
+        if horizons[0] < 1:
+            parser.error("--horizons must be positive")
+
+    try:
+        models = resolve_models(args.models.split(","))
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Skip families whose backend isn't installed instead of failing every segment
+    for name in list(models):
+        missing = MODEL_REGISTRY[name].missing_backends()
+        if missing:
+            print(f"Skipping {name}: missing {', '.join(missing)} (pip install {' '.join(missing)})")
+            models.remove(name)
+    if not models:
+        parser.error("No selected model family has its backend installed")
+
     print("="*60)
     print("MODEL BENCHMARK: Air Jordan Demand Forecasting")
     print("="*60)
 
-    results_df = benchmark_all_segments()
+    results_df = benchmark_all_segments(
+        data_dir=Path(args.data_dir),
+        parallel_models=args.parallel_models,
+        test_horizon=args.horizon,
+        n_workers=args.workers,
+        checkpoint_path=Path(args.checkpoint) if args.checkpoint else None,
+        resume=not args.no_resume,
+        statsforecast_batch=args.statsforecast_batch,
+        global_gbm=args.global_gbm,
+        cv_windows=args.cv_windows,
+        models=models,
+        race={
+            'threshold': args.race_threshold,
+            'metric': args.race_metric,
+            'budget_s': args.race_budget,
+        } if args.race else None,
+        model_timeout=args.model_timeout,
+        fourier_batch=args.fourier_batch,
+        conformal={
+            'alpha': args.conformal_alpha,
+            'windows': args.conformal_windows,
+            'horizon_pool': CONFORMAL_HORIZON_POOL,
+        } if args.conformal else None,
+        horizons=horizons,
+    )
 
     # Save results
-    results_df.to_csv("benchmark_results.csv", index=False)
-    print(f"\n✓ Saved benchmark_results.csv")
+    results_df.to_csv(args.output, index=False)
+    print(f"\n✓ Saved {args.output}")
+
+    if horizons:
+        print("\n" + "="*60)
+        print(f"ACCURACY BY HORIZON (one fit at {horizons[-1]} periods, mean over segments)")
+        print("="*60)
+        for metric in ('mae', 'mape'):
+            table = results_df.pivot_table(index='horizon', columns='model', values=metric, aggfunc='mean')
+            print(f"\n{metric.upper()}:")
+            print(table.round(2).to_string())
+
+        # Remaining summaries cover the full (longest) horizon
+        results_df = results_df[results_df['horizon'] == horizons[-1]]
 
     # Print summary
     print("\n" + "="*60)
@@ -452,6 +2117,44 @@ def main():
     summary = summary.sort_values('mae')
     print(summary.to_string())
 
+    print("\n" + "="*60)
+    print("ACCURACY vs COST (per segment; peak RSS is the max seen)")
+    print("="*60)
+
+    cost = results_df.groupby('model').agg({
+        'mae': 'mean',
+        'mape': 'mean',
+        'fit_time_s': 'mean',
+        'predict_time_s': 'mean',
+        'interval_time_s': 'mean',
+        'cpu_time_s': 'mean',
+        'peak_rss_mb': 'max',
+    })
+    # CPU-hours to run the model on 10k series at the measured per-segment cost
+    cost['cpu_h_per_10k'] = cost['cpu_time_s'] * 10_000 / 3600
+    cost = cost.sort_values('mae')
+    print(cost.round(3).to_string())
+
+    # Models no other model beats on both MAE and CPU time
+    frontier = [
+        model for model, row in cost.iterrows()
+        if not ((cost['mae'] < row['mae']) & (cost['cpu_time_s'] < row['cpu_time_s'])).any()
+    ]
+    print(f"\nPareto front (MAE vs CPU time): {', '.join(frontier)}")
+
+    if args.race:
+        print("\n" + "="*60)
+        print("RACING: where segments stopped")
+        print("="*60)
+
+        stops = results_df.drop_duplicates('segment')['race_stop'].str.split(':', expand=True)
+        stops.columns = ['tier', 'reason']
+        print(stops.value_counts().rename('segments').to_string())
+
+        # Compute spent per tier (summed over segments)
+        print("\nCPU seconds by tier:")
+        print(results_df.groupby('tier')['cpu_time_s'].sum().round(2).to_string())
+
     print("\n" + "="*60)
     print("WINNER (Lowest MAE):")
     print("="*60)
@@ -0,0 +1,422 @@
+"""
+Online Forecast Updates
+
+Daily refresh without a nightly refit: fitted models are kept per series and
+each new period of actuals only updates their state:
+- AutoETS / AutoARIMA: the fitted model is re-applied to the extended series
+  with its estimated parameters (StatsForecast forward), i.e. the filter state
+  is updated but nothing is re-estimated
+- XGBoost / LightGBM: the LagFeatureEngine rolls forward one observation and the
+  feature row of the next period (lags and rolling windows up to the newest
+  actual, calendar of the forecast date; create_lag_features alignment) is
+  predicted with the trained model (no retraining)
+- Drift monitoring: one-step errors of the drift model are tracked per series;
+  a refit is scheduled only when the recent MAE or bias crosses a threshold
+  (or the fit is older than max_age periods)
+
+Usage:
+    forecaster = OnlineForecaster(models=['AutoETS', 'LightGBM'])
+    forecaster.fit(history)                  # long frame: unique_id, ds, y
+    summary = forecaster.update(new_day)     # one row per series with the newest actuals
+    forecaster.forecasts()                   # long frame: unique_id, ds, one column per model
+
+    python online_forecast.py --days 28 --series 1000
+"""
+
+import argparse
+import json
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from lag_features import LagFeatureEngine, create_lag_features, feature_names
+from model_benchmark import lightgbm_regressor, statsforecast_models, xgboost_regressor
+
+
+STATS_MODELS = ('AutoETS', 'AutoARIMA')
+GBM_MODELS = {'XGBoost': xgboost_regressor, 'LightGBM': lightgbm_regressor}
+ONLINE_MODELS = STATS_MODELS + tuple(GBM_MODELS)
+
+
+class OnlineForecaster:
+    """
+    Per-series model state updated incrementally as actuals arrive.
+
+    Stats models forecast `horizon` steps; GBM models forecast one step (the
+    walk-forward setting they are benchmarked in).
+    """
+
+    def __init__(
+        self,
+        models: Sequence[str] = ('AutoETS', 'LightGBM'),
+        horizon: int = 7,
+        freq: str = "D",
+        drift_model: Optional[str] = None,
+        drift_window: int = 28,
+        mae_threshold: float = 1.5,
+        bias_threshold: float = 0.6,
+        max_age: Optional[int] = None,
+        n_jobs: int = 1,
+    ):
+        """
+        Initialize forecaster.
+
+        Args:
+            models: Models to keep per series (subset of ONLINE_MODELS)
+            horizon: Steps forecast by the stats models
+            freq: Series frequency
+            drift_model: Model whose one-step errors drive refits (default: first of models)
+            drift_window: One-step errors per drift check; a series is only checked
+                once this many errors have accumulated since its last fit
+            mae_threshold: Refit when recent MAE exceeds this multiple of the
+                in-sample MAE at fit time
+            bias_threshold: Refit when |mean error| / MAE over the window exceeds this
+            max_age: Refit after this many updates regardless of drift (None = never)
+            n_jobs: Threads per GBM model
+        """
+        unknown = [m for m in models if m not in ONLINE_MODELS]
+        if unknown:
+            raise ValueError(f"Unknown models {unknown}, expected some of {list(ONLINE_MODELS)}")
+
+        self.models = list(models)
+        self.horizon = horizon
+        self.freq = freq
+        self.drift_model = drift_model or self.models[0]
+        if self.drift_model not in self.models:
+            raise ValueError(f"drift_model {self.drift_model!r} is not one of {self.models}")
+        self.drift_window = drift_window
+        self.mae_threshold = mae_threshold
+        self.bias_threshold = bias_threshold
+        self.max_age = max_age
+        self.n_jobs = n_jobs
+
+        # unique_id -> state dict (see _fit_series)
+        self.series = {}
+
+    def fit(self, history: pd.DataFrame) -> Dict:
+        """
+        Full fit of every model for every series.
+
+        Args:
+            history: Long frame with unique_id, ds, y
+
+        Returns:
+            Dict with series fitted and seconds
+        """
+        start = time.perf_counter()
+        for uid, group in history.sort_values(['unique_id', 'ds']).groupby('unique_id', sort=False):
+            self._fit_series(uid, pd.DatetimeIndex(group['ds']), group['y'].to_numpy(dtype=float))
+        return {'fitted': len(self.series), 'seconds': time.perf_counter() - start}
+
+    def _fit_series(self, uid, ds: pd.DatetimeIndex, y: np.ndarray):
+        """Fit every model on one series' full history and issue its forecasts."""
+        stats = {}
+        for model in statsforecast_models([m for m in self.models if m in STATS_MODELS]):
+            stats[model.alias] = model.fit(y)
+
+        gbms = {}
+        engine = LagFeatureEngine()
+        if any(m in GBM_MODELS for m in self.models):
+            train = create_lag_features(pd.DataFrame({'ds': ds, 'y': y}))
+            X = np.ascontiguousarray(train[feature_names()].values, dtype=np.float32)
+            target = np.ascontiguousarray(train['y'].values, dtype=np.float32)
+            for name in self.models:
+                if name in GBM_MODELS:
+                    gbms[name] = GBM_MODELS[name](self.n_jobs).fit(X, target)
+            engine.extend(ds, y)
+
+        # Drift reference: in-sample one-step MAE of the drift model over the recent history
+        if self.drift_model in stats:
+            residuals = y - stats[self.drift_model].predict_in_sample()['fitted']
+        else:
+            residuals = target - gbms[self.drift_model].predict(X)
+        residuals = residuals[~np.isnan(residuals)][-4 * self.drift_window:]
+
+        self.series[uid] = {
+            'ds': ds,
+            'y': y,
+            'stats': stats,
+            'gbms': gbms,
+            'engine': engine,
+            'reference_mae': max(float(np.mean(np.abs(residuals))), 1e-9) if len(residuals) else np.nan,
+            'errors': deque(maxlen=self.drift_window),
+            'age': 0,
+            'refit_reason': None,
+        }
+        self._forecast_series(uid)
+
+    def _forecast_series(self, uid):
+        """Forecasts from the current state (no re-estimation)."""
+        state = self.series[uid]
+        offset = pd.tseries.frequencies.to_offset(self.freq)
+        state['forecast_ds'] = pd.date_range(state['ds'][-1] + offset, periods=self.horizon, freq=self.freq)
+
+        forecast = {}
+        for name, model in state['stats'].items():
+            if state['age'] == 0:
+                forecast[name] = model.predict(self.horizon)['mean']
+            else:
+                # Fitted parameters re-applied to the extended series: filter update, no re-estimation
+                forecast[name] = model.forward(state['y'], self.horizon)['mean']
+
+        row = state['engine'].next_row(state['forecast_ds'][0])
+        for name, model in state['gbms'].items():
+            if row is None:
+                forecast[name] = np.array([state['engine'].history_mean])
+            else:
+                forecast[name] = model.predict(row[None, :].astype(np.float32))
+        state['forecast'] = forecast
+
+    def update(self, actuals: pd.DataFrame, refit: bool = True) -> Dict:
+        """
+        Ingest the newest actuals and refresh forecasts.
+
+        Errors of the issued one-step forecasts feed the drift monitor; series
+        whose drift metrics cross a threshold are refit (or, with refit=False,
+        left scheduled for refit_scheduled()).
+
+        Args:
+            actuals: Long frame with unique_id, ds, y (one or more new periods per series)
+            refit: Refit drifted series now
+
+        Returns:
+            Dict with updated count, scheduled refits (unique_id -> reason),
+            refit count and seconds for the update and refit stages
+        """
+        start = time.perf_counter()
+        updated = 0
+        for uid, group in actuals.sort_values(['unique_id', 'ds']).groupby('unique_id', sort=False):
+            if uid not in self.series:
+                raise KeyError(f"Series {uid!r} was never fit")
+            state = self.series[uid]
+
+            for ds, y in zip(pd.DatetimeIndex(group['ds']), group['y'].to_numpy(dtype=float)):
+                if ds <= state['ds'][-1]:
+                    continue
+
+                # One-step error of the forecast issued for this period
+                if len(state['forecast_ds']) and ds == state['forecast_ds'][0]:
+                    state['errors'].append(float(state['forecast'][self.drift_model][0]) - y)
+
+                state['ds'] = state['ds'].append(pd.DatetimeIndex([ds]))
+                state['y'] = np.append(state['y'], y)
+                state['engine'].push(ds, y)
+                state['age'] += 1
+                self._forecast_series(uid)
+
+            state['refit_reason'] = self._drift_reason(state)
+            updated += 1
+        update_s = time.perf_counter() - start
+
+        scheduled = {uid: s['refit_reason'] for uid, s in self.series.items() if s['refit_reason']}
+        start = time.perf_counter()
+        n_refit = self.refit_scheduled() if refit else 0
+
+        return {
+            'updated': updated,
+            'scheduled': scheduled,
+            'refit': n_refit,
+            'update_s': update_s,
+            'refit_s': time.perf_counter() - start,
+        }
+
+    def drift_metrics(self, uid) -> Dict:
+        """
+        Drift metrics of one series over its last drift_window one-step errors.
+
+        Returns:
+            Dict with n_errors, mae_ratio (recent MAE / in-sample MAE at fit time),
+            bias_ratio (mean error / MAE, in [-1, 1]) and age (updates since the fit)
+        """
+        state = self.series[uid]
+        errors = np.asarray(state['errors'])
+        metrics = {'n_errors': len(errors), 'mae_ratio': np.nan, 'bias_ratio': np.nan, 'age': state['age']}
+        if len(errors):
+            mae = np.mean(np.abs(errors))
+            metrics['mae_ratio'] = float(mae / state['reference_mae'])
+            metrics['bias_ratio'] = float(np.mean(errors) / mae) if mae > 0 else 0.0
+        return metrics
+
+    def _drift_reason(self, state: Dict) -> Optional[str]:
+        """Why a series needs a refit (None if it doesn't)."""
+        if self.max_age is not None and state['age'] >= self.max_age:
+            return f"age {state['age']}"
+        if len(state['errors']) < self.drift_window:
+            return None
+
+        errors = np.asarray(state['errors'])
+        mae = np.mean(np.abs(errors))
+        if mae > self.mae_threshold * state['reference_mae']:
+            return f"mae_ratio {mae / state['reference_mae']:.2f}"
+        if mae > 0 and abs(np.mean(errors)) > self.bias_threshold * mae:
+            return f"bias_ratio {np.mean(errors) / mae:+.2f}"
+        return None
+
+    def refit_scheduled(self) -> int:
+        """Fully refit every series scheduled by the drift monitor; returns the count."""
+        scheduled = [uid for uid, state in self.series.items() if state['refit_reason']]
+        for uid in scheduled:
+            state = self.series[uid]
+            self._fit_series(uid, state['ds'], state['y'])
+        return len(scheduled)
+
+    def forecasts(self) -> pd.DataFrame:
+        """
+        Current forecasts.
+
+        Returns:
+            Long frame with unique_id, ds and one column per model (GBM models
+            only have the first step)
+        """
+        frames = []
+        for uid, state in self.series.items():
+            frame = pd.DataFrame({'unique_id': uid, 'ds': state['forecast_ds']})
+            for name in self.models:
+                values = np.full(self.horizon, np.nan)
+                forecast = state['forecast'][name]
+                values[:len(forecast)] = forecast
+                frame[name] = values
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+
+def segments_panel(segments_data: List[Dict], n_series: Optional[int] = None, seed: int = 0) -> pd.DataFrame:
+    """
+    Long unique_id/ds/y frame of segment units, optionally tiled to n_series.
+
+    Copies beyond the real segments are Poisson resamples of a randomly scaled
+    segment, so a larger panel keeps realistic shapes for timing runs.
+
+    Args:
+        segments_data: Segment dicts
+        n_series: Series in the panel (default: one per segment)
+        seed: Random seed for the copies
+
+    Returns:
+        Long frame sorted by unique_id, ds
+    """
+    rng = np.random.default_rng(seed)
+    ds = pd.to_datetime(segments_data[0]['calendar']['ds'])
+    n_series = n_series or len(segments_data)
+
+    frames = []
+    for i in range(n_series):
+        seg = segments_data[i % len(segments_data)]
+        units = np.asarray(seg['observed']['units'], dtype=float)
+        name = seg['meta']['segment']
+        if i >= len(segments_data):
+            units = rng.poisson(units * rng.uniform(0.5, 2.0)).astype(float)
+            name = f"{name}_{i // len(segments_data)}"
+        frames.append(pd.DataFrame({'unique_id': name, 'ds': ds, 'y': units}))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def simulate_online(
+    panel: pd.DataFrame,
+    days: int = 28,
+    models: Sequence[str] = ('AutoETS', 'LightGBM'),
+    **forecaster_kwargs,
+) -> Dict:
+    """
+    Fit on all but the last `days` periods, then feed them one period at a time.
+
+    Args:
+        panel: Long unique_id/ds/y frame
+        days: Periods streamed through update()
+        models: Online models
+        **forecaster_kwargs: Extra OnlineForecaster options
+
+    Returns:
+        Dict with fit_s (initial full fit), per-day update log, and one-step
+        MAE per model over the streamed periods
+    """
+    dates = np.sort(panel['ds'].unique())
+    cutoff = dates[-days - 1]
+
+    forecaster = OnlineForecaster(models=models, **forecaster_kwargs)
+    print(f"Fitting {panel['unique_id'].nunique()} series ({', '.join(models)})...")
+    fit = forecaster.fit(panel[panel['ds'] <= cutoff])
+    print(f"  Full fit: {fit['seconds']:.1f}s")
+
+    log = []
+    errors = {name: [] for name in models}
+    for ds in dates[-days:]:
+        day = panel[panel['ds'] == ds]
+        issued = forecaster.forecasts()
+        issued = issued[issued['ds'] == ds].merge(day, on=['unique_id', 'ds'])
+        for name in models:
+            errors[name].append((issued[name] - issued['y']).to_numpy())
+
+        summary = forecaster.update(day)
+        log.append({
+            'ds': pd.Timestamp(ds),
+            'update_s': summary['update_s'],
+            'refit': summary['refit'],
+            'refit_s': summary['refit_s'],
+        })
+        print(f"  {pd.Timestamp(ds).date()}: update {summary['update_s']:.2f}s, "
+              f"{summary['refit']} refit ({summary['refit_s']:.1f}s)")
+
+    return {
+        'fit_s': fit['seconds'],
+        'log': pd.DataFrame(log),
+        'mae': {name: float(np.mean(np.abs(np.concatenate(values)))) for name, values in errors.items()},
+    }
+
+
+def main():
+    """Stream the last days of the Air Jordan segments through the online forecaster."""
+    parser = argparse.ArgumentParser(description="Online forecast updates with drift-triggered refits")
+    parser.add_argument("--data-dir", default="./data", help="Directory with AirJordan_*.json files")
+    parser.add_argument("--days", type=int, default=28, help="Periods streamed one at a time")
+    parser.add_argument("--series", type=int, default=None,
+                        help="Tile the segments into this many series (Poisson copies) for timing")
+    parser.add_argument("--models", default="AutoETS,LightGBM",
+                        help=f"Comma-separated online models ({', '.join(ONLINE_MODELS)})")
+    parser.add_argument("--mae-threshold", type=float, default=1.5,
+                        help="Refit when recent one-step MAE exceeds this multiple of the in-sample MAE")
+    parser.add_argument("--bias-threshold", type=float, default=0.6,
+                        help="Refit when |mean error| / MAE over the drift window exceeds this")
+    parser.add_argument("--drift-window", type=int, default=28, help="One-step errors per drift check")
+
+    args = parser.parse_args()
+    models = args.models.split(",")
+    unknown = [m for m in models if m not in ONLINE_MODELS]
+    if unknown:
+        parser.error(f"Unknown models {unknown}, expected some of {list(ONLINE_MODELS)}")
+
+    segments_data = []
+    for json_file in sorted(Path(args.data_dir).glob("AirJordan_*.json")):
+        with open(json_file, 'r') as f:
+            segments_data.append(json.load(f))
+
+    print("="*60)
+    print("ONLINE FORECAST UPDATES")
+    print("="*60)
+
+    result = simulate_online(
+        segments_panel(segments_data, args.series),
+        days=args.days,
+        models=models,
+        drift_window=args.drift_window,
+        mae_threshold=args.mae_threshold,
+        bias_threshold=args.bias_threshold,
+    )
+
+    log = result['log']
+    print("\n" + "="*60)
+    print("SUMMARY")
+    print("="*60)
+    print(f"Initial full fit:        {result['fit_s']:.1f}s")
+    print(f"Mean daily update:       {log['update_s'].mean():.2f}s")
+    print(f"Mean daily refits:       {log['refit'].mean():.1f} series ({log['refit_s'].mean():.1f}s)")
+    print(f"Speedup vs nightly refit: {result['fit_s'] / (log['update_s'] + log['refit_s']).mean():.0f}x")
+    print("One-step MAE over streamed days: " + ", ".join(f"{k} {v:.2f}" for k, v in result['mae'].items()))
+
+
+if __name__ == "__main__":
+    main()
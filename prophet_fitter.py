@@ -6,10 +6,12 @@ Fits Prophet models with multiplicative seasonality and runs rolling-origin back
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from prophet import Prophet
 import warnings
 
+from forecast_metrics import score, to_scalars
+
 warnings.filterwarnings('ignore')
 
 
@@ -23,6 +25,8 @@ class ProphetFitter:
         seasonality_mode: str = "multiplicative",
         changepoint_prior_scale: float = 0.05,
         seasonality_prior_scale: float = 10.0,
+        uncertainty_samples: int = 1000,
+        interval_scope: str = "all",
     ):
         """
         Initialize fitter.
@@ -31,10 +35,70 @@ class ProphetFitter:
             seasonality_mode: 'multiplicative' or 'additive'
             changepoint_prior_scale: Flexibility of trend
             seasonality_prior_scale: Strength of seasonality
+            uncertainty_samples: Simulated trend paths per prediction (Prophet default 1000)
+            interval_scope: Which predicted rows get yhat_lower/yhat_upper:
+                'all' (every row), 'horizon' (only rows after the training cutoff)
+                or 'none' (no intervals, point forecasts only). 'horizon' only
+                affects backtest folds; fit_segment's exported full-history
+                forecast has no cutoff and keeps intervals on every row
         """
+        if interval_scope not in ("all", "horizon", "none"):
+            raise ValueError(f"interval_scope must be 'all', 'horizon' or 'none', got {interval_scope!r}")
+
         self.seasonality_mode = seasonality_mode
         self.changepoint_prior_scale = changepoint_prior_scale
         self.seasonality_prior_scale = seasonality_prior_scale
+        self.uncertainty_samples = uncertainty_samples
+        self.interval_scope = interval_scope
+
+    def _predict(
+        self,
+        model: Prophet,
+        future: pd.DataFrame,
+        cutoff: Optional[pd.Timestamp] = None,
+        intervals: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Predict with uncertainty sampling limited to the rows that need intervals.
+
+        Prophet simulates `uncertainty_samples` trend paths for every row it predicts,
+        which dominates predict time on long histories. Rows that don't need
+        intervals are predicted with sampling switched off.
+
+        Args:
+            model: Fitted Prophet model
+            future: Rows to predict (must contain 'ds')
+            cutoff: Last training date; rows after it form the forecast horizon
+                (None: no horizon, so 'horizon' scope behaves like 'all')
+            intervals: Set False to skip intervals entirely (e.g. intermediate folds)
+
+        Returns:
+            Prophet forecast frame; yhat_lower/yhat_upper are NaN where skipped
+        """
+        if not intervals or self.interval_scope == "none" or self.uncertainty_samples <= 0:
+            interval_mask = np.zeros(len(future), dtype=bool)
+        elif self.interval_scope == "horizon" and cutoff is not None:
+            interval_mask = (future['ds'] > cutoff).values
+        else:
+            interval_mask = np.ones(len(future), dtype=bool)
+
+        parts = []
+
+        if (~interval_mask).any():
+            model.uncertainty_samples = 0
+            point = model.predict(future[~interval_mask])
+            point['yhat_lower'] = np.nan
+            point['yhat_upper'] = np.nan
+            parts.append(point)
+
+        if interval_mask.any():
+            model.uncertainty_samples = self.uncertainty_samples
+            parts.append(model.predict(future[interval_mask]))
+
+        model.uncertainty_samples = self.uncertainty_samples
+
+        forecast = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        return forecast.sort_values('ds').reset_index(drop=True)
 
     def fit_segment(
         self,
@@ -63,6 +127,7 @@ class ProphetFitter:
             changepoint_prior_scale=self.changepoint_prior_scale,
             seasonality_prior_scale=self.seasonality_prior_scale,
             interval_width=0.95,
+            uncertainty_samples=self.uncertainty_samples,
         )
 
         # Add US holidays
@@ -72,14 +137,14 @@ class ProphetFitter:
         # Fit
         model.fit(df)
 
-        # Predict on full history
-        forecast = model.predict(df)
+        # Predict on full history (no cutoff: 'horizon' scope keeps every row's interval)
+        forecast = self._predict(model, df[['ds']])
 
-        # Extract components
+        # Extract components (intervals are null with scope 'none' or 0 uncertainty samples)
         segment_data['prophet'] = {
             'yhat': forecast['yhat'].tolist(),
-            'yhat_lower': forecast['yhat_lower'].tolist(),
-            'yhat_upper': forecast['yhat_upper'].tolist(),
+            'yhat_lower': [None if np.isnan(v) else float(v) for v in forecast['yhat_lower']],
+            'yhat_upper': [None if np.isnan(v) else float(v) for v in forecast['yhat_upper']],
             'trend': forecast['trend'].tolist(),
             'weekly': forecast.get('weekly', pd.Series([0] * len(df))).tolist(),
             'yearly': forecast.get('yearly', pd.Series([0] * len(df))).tolist(),
@@ -88,34 +153,19 @@ class ProphetFitter:
 
         return segment_data
 
-    def backtest_segment(
-        self,
-        segment_data: Dict,
-        horizon_days: int = 56,
-        n_folds: int = 4,
-        add_holidays: bool = True,
-    ) -> Dict:
+    @staticmethod
+    def fold_cutoffs(df: pd.DataFrame, horizon_periods: int, n_folds: int) -> List[pd.Timestamp]:
         """
-        Run rolling-origin backtest and compute metrics.
+        Compute rolling-origin fold cutoffs (oldest first).
 
         Args:
-            segment_data: Segment data dict
-            horizon_days: Forecast horizon in days
-            n_folds: Number of backtest folds
-            add_holidays: Include US holidays
+            df: Frame with 'ds' and 'y'
+            horizon_periods: Test size per fold in periods
+            n_folds: Requested number of folds
 
         Returns:
-            Updated segment_data with metrics
+            Cutoff dates; each fold trains on ds <= cutoff
         """
-        df = pd.DataFrame({
-            'ds': pd.to_datetime(segment_data['calendar']['ds']),
-            'y': segment_data['observed']['units']
-        })
-
-        freq = segment_data['meta']['freq']
-        horizon_periods = horizon_days if freq == 'D' else (horizon_days // 7)
-
-        # Compute fold cutoffs
         total_periods = len(df)
         test_size = horizon_periods
         train_min = total_periods // 2  # Use at least half the data for training
@@ -130,82 +180,178 @@ class ProphetFitter:
             print(f"Warning: Not enough data for {n_folds} folds, using 1 fold")
             cutoffs = [df['ds'].iloc[total_periods - test_size]]
 
-        # Run folds
-        all_errors = []
-        all_actuals = []
-        all_predictions = []
-        all_in_bounds = []
+        return cutoffs
 
-        for cutoff in cutoffs:
-            train_df = df[df['ds'] <= cutoff].copy()
-            test_df = df[df['ds'] > cutoff].head(horizon_periods).copy()
+    def run_fold(
+        self,
+        df: pd.DataFrame,
+        cutoff: pd.Timestamp,
+        horizon_periods: int,
+        add_holidays: bool = True,
+        intervals: bool = True,
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Fit on data up to `cutoff` and forecast the following horizon.
 
-            if len(test_df) == 0:
-                continue
+        Args:
+            df: Frame with 'ds' and 'y'
+            cutoff: Last training date
+            horizon_periods: Number of periods to forecast
+            add_holidays: Include US holidays
+            intervals: Compute yhat_lower/yhat_upper for this fold
 
-            # Fit model
-            model = Prophet(
-                seasonality_mode=self.seasonality_mode,
-                changepoint_prior_scale=self.changepoint_prior_scale,
-                seasonality_prior_scale=self.seasonality_prior_scale,
-                interval_width=0.95,
-            )
+        Returns:
+            Dict of aligned arrays (ds, actuals, yhat, yhat_lower, yhat_upper),
+            or None if there is nothing to test after the cutoff
+        """
+        train_df = df[df['ds'] <= cutoff].copy()
+        test_df = df[df['ds'] > cutoff].head(horizon_periods).copy()
 
-            if add_holidays:
-                model.add_country_holidays(country_name='US')
+        if len(test_df) == 0:
+            return None
 
-            model.fit(train_df)
+        # Fit model
+        model = Prophet(
+            seasonality_mode=self.seasonality_mode,
+            changepoint_prior_scale=self.changepoint_prior_scale,
+            seasonality_prior_scale=self.seasonality_prior_scale,
+            interval_width=0.95,
+            uncertainty_samples=self.uncertainty_samples,
+        )
+
+        if add_holidays:
+            model.add_country_holidays(country_name='US')
 
-            # Predict
-            future = model.make_future_dataframe(periods=len(test_df), freq=freq)
-            forecast = model.predict(future)
-            forecast = forecast[forecast['ds'] > cutoff].head(horizon_periods)
+        model.fit(train_df)
 
-            # Align
-            test_df = test_df.merge(
-                forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']],
-                on='ds',
-                how='inner'
-            )
+        # Predict the horizon rows only (in-sample rows are never scored)
+        forecast = self._predict(model, test_df[['ds']], cutoff=cutoff, intervals=intervals)
+
+        # Align
+        test_df = test_df.merge(
+            forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']],
+            on='ds',
+            how='inner'
+        )
+
+        return {
+            'ds': test_df['ds'].values,
+            'actuals': test_df['y'].values,
+            'yhat': test_df['yhat'].values,
+            'yhat_lower': test_df['yhat_lower'].values,
+            'yhat_upper': test_df['yhat_upper'].values,
+        }
+
+    def backtest_segment(
+        self,
+        segment_data: Dict,
+        horizon_days: int = 56,
+        n_folds: int = 4,
+        add_holidays: bool = True,
+        coverage_folds: Optional[int] = None,
+        horizons: Optional[List[int]] = None,
+    ) -> Dict:
+        """
+        Run rolling-origin backtest and compute metrics.
 
-            # Collect metrics
-            actuals = test_df['y'].values
-            preds = test_df['yhat'].values
-            lower = test_df['yhat_lower'].values
-            upper = test_df['yhat_upper'].values
+        Args:
+            segment_data: Segment data dict
+            horizon_days: Forecast horizon in days
+            n_folds: Number of backtest folds
+            add_holidays: Include US holidays
+            coverage_folds: Number of trailing folds that compute intervals for
+                coverage (None = all folds, 0 = skip intervals entirely)
+            horizons: Horizons in days (each at most horizon_days) also scored
+                from the same folds by slicing their forecasts, stored under
+                metrics['by_horizon'] (no extra fits)
 
-            all_actuals.extend(actuals)
-            all_predictions.extend(preds)
-            all_errors.extend(actuals - preds)
-            all_in_bounds.extend([(lower[i] <= actuals[i] <= upper[i]) for i in range(len(actuals))])
+        Returns:
+            Updated segment_data with metrics
+        """
+        horizons = sorted(set(horizons or []))
+        if horizons and not 0 < horizons[0] <= horizons[-1] <= horizon_days:
+            raise ValueError(f"horizons must be between 1 and horizon_days={horizon_days}, got {horizons}")
 
-        # Compute aggregated metrics
-        all_actuals = np.array(all_actuals)
-        all_predictions = np.array(all_predictions)
-        all_errors = np.array(all_errors)
-        all_in_bounds = np.array(all_in_bounds)
+        df = pd.DataFrame({
+            'ds': pd.to_datetime(segment_data['calendar']['ds']),
+            'y': segment_data['observed']['units']
+        })
 
-        mae = np.mean(np.abs(all_errors))
+        freq = segment_data['meta']['freq']
+        horizon_periods = horizon_days if freq == 'D' else (horizon_days // 7)
+
+        cutoffs = self.fold_cutoffs(df, horizon_periods, n_folds)
+
+        # Only the last `coverage_folds` folds compute intervals
+        if coverage_folds is None:
+            coverage_folds = len(cutoffs)
+        interval_folds = set(range(len(cutoffs) - coverage_folds, len(cutoffs)))
+
+        # Run folds; stack them as (fold, horizon) blocks, NaN where a fold has no interval
+        fold_actuals = []
+        fold_preds = []
+        fold_lower = []
+        fold_upper = []
+
+        for fold_idx, cutoff in enumerate(cutoffs):
+            with_intervals = fold_idx in interval_folds
+            fold = self.run_fold(
+                df, cutoff, horizon_periods,
+                add_holidays=add_holidays,
+                intervals=with_intervals,
+            )
+            if fold is None:
+                continue
+
+            fold_actuals.append(fold['actuals'])
+            fold_preds.append(fold['yhat'])
+            fold_lower.append(fold['yhat_lower'] if with_intervals else np.full(len(fold['yhat']), np.nan))
+            fold_upper.append(fold['yhat_upper'] if with_intervals else np.full(len(fold['yhat']), np.nan))
 
-        # MAPE with floor to avoid division by near-zero
-        # Use max(actual, 5) as denominator to avoid inflation
-        mape = np.mean(np.abs(all_errors / np.maximum(all_actuals, 5.0))) * 100  # percentage
+        # Compute aggregated metrics over all folds in one pass
+        # (MAPE floored at 5 units to avoid division by near-zero)
+        blocks = [
+            _pad_blocks(folds, horizon_periods)
+            for folds in (fold_actuals, fold_preds, fold_lower, fold_upper)
+        ]
+        metrics = to_scalars(score(*blocks))
 
-        bias = np.mean(all_errors)
-        coverage = np.mean(all_in_bounds)
+        mae = metrics['mae']
+        mape = metrics['mape']
+
+        # Backtest bias is reported as actual - forecast
+        bias = -metrics['bias']
+
+        # Coverage only where intervals were computed
+        coverage = metrics['coverage']
 
         segment_data['metrics'] = {
             'backtest': {
                 'horizon_days': horizon_days,
                 'folds': len(cutoffs),
+                'coverage_folds': coverage_folds if coverage is not None else 0,
                 'window': 'rolling_origin',
             },
             'mae': round(float(mae), 2),
             'mape': round(float(mape), 2),
             'bias': round(float(bias), 2),
-            'coverage': round(float(coverage), 3),
+            'coverage': round(float(coverage), 3) if coverage is not None else None,
         }
 
+        # Shorter horizons: the first steps of every fold's forecast
+        if horizons:
+            by_horizon = {}
+            for days in horizons:
+                periods = days if freq == 'D' else max(1, days // 7)
+                sliced = to_scalars(score(*(block[:, :periods] for block in blocks)))
+                by_horizon[str(days)] = {
+                    'mae': round(sliced['mae'], 2),
+                    'mape': round(sliced['mape'], 2),
+                    'bias': round(-sliced['bias'], 2),
+                    'coverage': round(sliced['coverage'], 3) if sliced['coverage'] is not None else None,
+                }
+            segment_data['metrics']['by_horizon'] = by_horizon
+
         return segment_data
 
     def fit_and_backtest_all(
@@ -214,6 +360,8 @@ class ProphetFitter:
         horizon_days: int = 56,
         n_folds: int = 4,
         add_holidays: bool = True,
+        coverage_folds: Optional[int] = None,
+        horizons: Optional[List[int]] = None,
     ) -> List[Dict]:
         """
         Fit Prophet and run backtests for all segments.
@@ -223,6 +371,8 @@ class ProphetFitter:
             horizon_days: Forecast horizon
             n_folds: Number of backtest folds
             add_holidays: Include holidays
+            coverage_folds: Trailing folds that compute intervals (None = all)
+            horizons: Shorter horizons in days scored from the same folds
 
         Returns:
             Updated segments_data with prophet forecasts and metrics
@@ -239,12 +389,27 @@ class ProphetFitter:
                 segment_data,
                 horizon_days=horizon_days,
                 n_folds=n_folds,
-                add_holidays=add_holidays
+                add_holidays=add_holidays,
+                coverage_folds=coverage_folds,
+                horizons=horizons,
             )
 
             # Print metrics
             metrics = segment_data['metrics']
+            coverage = f"{metrics['coverage']:.2f}" if metrics['coverage'] is not None else "n/a"
             print(f"  MAE: {metrics['mae']:.1f}, MAPE: {metrics['mape']:.1f}%, "
-                  f"Bias: {metrics['bias']:.1f}, Coverage: {metrics['coverage']:.2f}")
+                  f"Bias: {metrics['bias']:.1f}, Coverage: {coverage}")
+            if 'by_horizon' in metrics:
+                print("  MAE by horizon: " + ", ".join(
+                    f"{days}d {m['mae']:.1f}" for days, m in metrics['by_horizon'].items()
+                ))
 
         return segments_data
+
+
+def _pad_blocks(blocks: List[np.ndarray], width: int) -> np.ndarray:
+    """Stack 1-D fold arrays into a (fold, width) array, NaN-padded."""
+    out = np.full((max(len(blocks), 1), width), np.nan)
+    for i, block in enumerate(blocks):
+        out[i, :len(block)] = block
+    return out
@@ -0,0 +1,334 @@
+"""
+Prophet Hyperparameter Tuning
+
+Searches changepoint/seasonality priors and seasonality mode per segment on the
+rolling-origin backtest. Configs are scored in parallel with successive halving:
+every config is scored on the most recent fold, and only the best 1/eta survive
+to be scored on more folds. Winning configs are cached per segment.
+
+Usage:
+    tuner = ProphetTuner(n_jobs=8, cache_path="data/prophet_tuning_cache.json")
+    best = tuner.tune_segment(segment_data)
+    fitter = tuner.best_fitter(segment_data)
+"""
+
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from prophet_fitter import ProphetFitter
+
+
+# Lists are searched as choices; (low, high) tuples are sampled log-uniformly in random search
+DEFAULT_SEARCH_SPACE = {
+    'changepoint_prior_scale': [0.001, 0.01, 0.05, 0.1, 0.5],
+    'seasonality_prior_scale': [0.1, 1.0, 10.0],
+    'seasonality_mode': ['additive', 'multiplicative'],
+}
+
+
+def _evaluate_fold(task: Tuple) -> Tuple[int, int, float, float, int]:
+    """
+    Worker: fit one config on one fold and return error sums.
+
+    Module-level so it can be pickled into worker processes.
+
+    Returns:
+        (config_idx, fold_idx, sum_abs_error, sum_abs_pct_error, n_points)
+    """
+    config_idx, fold_idx, config, ds, y, cutoff, horizon_periods, add_holidays = task
+
+    df = pd.DataFrame({'ds': pd.to_datetime(ds), 'y': y})
+    fitter = ProphetFitter(**config, uncertainty_samples=0, interval_scope='none')
+    fold = fitter.run_fold(df, cutoff, horizon_periods, add_holidays=add_holidays, intervals=False)
+
+    if fold is None:
+        return config_idx, fold_idx, 0.0, 0.0, 0
+
+    errors = np.abs(fold['actuals'] - fold['yhat'])
+    pct_errors = errors / np.maximum(fold['actuals'], 5.0) * 100
+
+    return config_idx, fold_idx, float(errors.sum()), float(pct_errors.sum()), len(errors)
+
+
+class ProphetTuner:
+    """
+    Per-segment Prophet hyperparameter search with successive halving over backtest folds.
+    """
+
+    def __init__(
+        self,
+        search_space: Optional[Dict] = None,
+        search: str = "grid",
+        n_iter: int = 20,
+        horizon_days: int = 56,
+        n_folds: int = 4,
+        eta: int = 3,
+        metric: str = "mae",
+        add_holidays: bool = True,
+        n_jobs: Optional[int] = None,
+        cache_path: Optional[Path] = None,
+        seed: int = 42,
+    ):
+        """
+        Initialize tuner.
+
+        Args:
+            search_space: Param name -> list of choices (or (low, high) for random search)
+            search: 'grid' (every combination) or 'random' (n_iter samples)
+            n_iter: Number of configs to sample in random search
+            horizon_days: Backtest horizon in days
+            n_folds: Maximum number of backtest folds per config
+            eta: Halving rate; keep the best 1/eta configs at each rung
+            metric: 'mae' or 'mape' (floored at 5 units, as in backtest_segment)
+            add_holidays: Include US holidays
+            n_jobs: Worker processes (None = all cores, 1 = run in-process)
+            cache_path: JSON file to persist best configs per segment
+            seed: Random seed for random search
+        """
+        if search not in ("grid", "random"):
+            raise ValueError(f"search must be 'grid' or 'random', got {search!r}")
+        if metric not in ("mae", "mape"):
+            raise ValueError(f"metric must be 'mae' or 'mape', got {metric!r}")
+
+        self.search_space = search_space or DEFAULT_SEARCH_SPACE
+        self.search = search
+        self.n_iter = n_iter
+        self.horizon_days = horizon_days
+        self.n_folds = n_folds
+        self.eta = max(2, eta)
+        self.metric = metric
+        self.add_holidays = add_holidays
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.seed = seed
+
+        self.cache = self._load_cache()
+
+    def _load_cache(self) -> Dict:
+        """Load cached best configs (empty if no cache file)."""
+        if self.cache_path is None or not self.cache_path.exists():
+            return {}
+
+        with open(self.cache_path, 'r') as f:
+            return json.load(f)
+
+    def _save_cache(self):
+        """Persist cached best configs."""
+        if self.cache_path is None:
+            return
+
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.cache, f, indent=2)
+        tmp_path.replace(self.cache_path)
+
+    def _fingerprint(self, segment_data: Dict) -> str:
+        """Hash of search settings and the segment's series; cache entries are reused only if it matches."""
+        payload = json.dumps({
+            'search_space': self.search_space,
+            'search': self.search,
+            'n_iter': self.n_iter,
+            'horizon_days': self.horizon_days,
+            'n_folds': self.n_folds,
+            'eta': self.eta,
+            'metric': self.metric,
+            'add_holidays': self.add_holidays,
+            'seed': self.seed,
+            'ds': segment_data['calendar']['ds'],
+            'y': segment_data['observed']['units'],
+        }, sort_keys=True, default=str)
+
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def candidate_configs(self) -> List[Dict]:
+        """
+        Enumerate configs to evaluate.
+
+        Returns:
+            List of ProphetFitter keyword dicts
+        """
+        names = sorted(self.search_space)
+
+        if self.search == "grid":
+            for name in names:
+                if not isinstance(self.search_space[name], list):
+                    raise ValueError(f"Grid search needs a list of choices for {name!r}")
+            return [dict(zip(names, values)) for values in itertools.product(*(self.search_space[n] for n in names))]
+
+        rng = np.random.default_rng(self.seed)
+        configs = []
+        for _ in range(self.n_iter):
+            config = {}
+            for name in names:
+                space = self.search_space[name]
+                if isinstance(space, tuple):
+                    low, high = space
+                    config[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+                else:
+                    config[name] = space[rng.integers(len(space))]
+            configs.append(config)
+
+        return configs
+
+    def _executor(self) -> ProcessPoolExecutor:
+        """Worker pool for fold fits (spawned: forking after Prophet/cmdstanpy are loaded is fragile)."""
+        return ProcessPoolExecutor(max_workers=self.n_jobs, mp_context=multiprocessing.get_context('spawn'))
+
+    def _run_tasks(self, tasks: List[Tuple], executor: Optional[ProcessPoolExecutor]) -> List[Tuple]:
+        """Evaluate fold tasks serially or on the worker pool."""
+        if executor is None:
+            return [_evaluate_fold(task) for task in tasks]
+        return list(executor.map(_evaluate_fold, tasks))
+
+    def tune_segment(
+        self,
+        segment_data: Dict,
+        executor: Optional[ProcessPoolExecutor] = None,
+        use_cache: bool = True,
+    ) -> Dict:
+        """
+        Find the best config for one segment.
+
+        Args:
+            segment_data: Segment data dict
+            executor: Shared worker pool (created per call if None and n_jobs > 1)
+            use_cache: Return the cached result when the fingerprint matches
+
+        Returns:
+            Dict with config, score, folds scored, configs evaluated and fits run
+        """
+        segment_name = segment_data['meta']['segment']
+        fingerprint = self._fingerprint(segment_data)
+
+        cached = self.cache.get(segment_name)
+        if use_cache and cached and cached.get('fingerprint') == fingerprint:
+            return {**cached, 'cached': True}
+
+        own_executor = executor is None and self.n_jobs > 1
+        if own_executor:
+            executor = self._executor()
+
+        try:
+            result = self._successive_halving(segment_data, executor)
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+        result['fingerprint'] = fingerprint
+        self.cache[segment_name] = result
+        self._save_cache()
+
+        return {**result, 'cached': False}
+
+    def _successive_halving(self, segment_data: Dict, executor: Optional[ProcessPoolExecutor]) -> Dict:
+        """Score configs on a growing number of folds, pruning the worst at each rung."""
+        ds = list(segment_data['calendar']['ds'])
+        y = list(segment_data['observed']['units'])
+        df = pd.DataFrame({'ds': pd.to_datetime(ds), 'y': y})
+
+        freq = segment_data['meta']['freq']
+        horizon_periods = self.horizon_days if freq == 'D' else (self.horizon_days // 7)
+
+        # Most recent fold first: it is the most representative of the next forecast
+        cutoffs = ProphetFitter.fold_cutoffs(df, horizon_periods, self.n_folds)[::-1]
+
+        configs = self.candidate_configs()
+        survivors = list(range(len(configs)))
+
+        # Error sums per config over the folds scored so far
+        abs_sum = np.zeros(len(configs))
+        pct_sum = np.zeros(len(configs))
+        points = np.zeros(len(configs), dtype=int)
+        folds_done = np.zeros(len(configs), dtype=int)
+        n_fits = 0
+
+        rung = 0
+        while True:
+            target_folds = min(len(cutoffs), self.eta ** rung)
+
+            tasks = [
+                (idx, fold_idx, configs[idx], ds, y, cutoffs[fold_idx], horizon_periods, self.add_holidays)
+                for idx in survivors
+                for fold_idx in range(folds_done[idx], target_folds)
+            ]
+            for idx, _, abs_err, pct_err, n in self._run_tasks(tasks, executor):
+                abs_sum[idx] += abs_err
+                pct_sum[idx] += pct_err
+                points[idx] += n
+            n_fits += len(tasks)
+            folds_done[survivors] = target_folds
+
+            sums = abs_sum if self.metric == "mae" else pct_sum
+            scores = np.where(points > 0, sums / np.maximum(points, 1), np.inf)
+
+            if target_folds >= len(cutoffs) or len(survivors) == 1:
+                break
+
+            n_keep = max(1, math.ceil(len(survivors) / self.eta))
+            survivors = sorted(survivors, key=lambda idx: scores[idx])[:n_keep]
+            rung += 1
+
+        best = min(survivors, key=lambda idx: scores[idx])
+
+        return {
+            'config': configs[best],
+            'score': round(float(scores[best]), 4),
+            'metric': self.metric,
+            'folds': int(folds_done[best]),
+            'configs_evaluated': len(configs),
+            'fits': n_fits,
+        }
+
+    def tune_all(self, segments_data: List[Dict], use_cache: bool = True) -> Dict[str, Dict]:
+        """
+        Tune every segment, sharing one worker pool.
+
+        Args:
+            segments_data: List of segment data dicts
+            use_cache: Skip segments whose cached fingerprint matches
+
+        Returns:
+            Segment name -> tuning result
+        """
+        results = {}
+        executor = self._executor() if self.n_jobs > 1 else None
+
+        try:
+            for i, segment_data in enumerate(segments_data):
+                segment_name = segment_data['meta']['segment']
+                result = self.tune_segment(segment_data, executor=executor, use_cache=use_cache)
+                results[segment_name] = result
+
+                source = "cached" if result['cached'] else f"{result['fits']} fits"
+                print(f"[{i+1}/{len(segments_data)}] {segment_name}: {result['config']} "
+                      f"({self.metric.upper()}={result['score']:.2f}, {source})")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return results
+
+    def best_fitter(self, segment_data: Dict, **fitter_kwargs) -> ProphetFitter:
+        """
+        Build a ProphetFitter with the segment's tuned config.
+
+        Args:
+            segment_data: Segment data dict (tuned on demand if not cached)
+            **fitter_kwargs: Extra ProphetFitter options (e.g. uncertainty_samples)
+
+        Returns:
+            Configured ProphetFitter
+        """
+        result = self.tune_segment(segment_data)
+        return ProphetFitter(**result['config'], **fitter_kwargs)
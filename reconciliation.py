@@ -0,0 +1,563 @@
+"""
+Hierarchical Forecast Reconciliation
+
+Segments are forecast independently, so region and product-line totals don't
+add up. This module makes forecasts coherent over product_line -> region ->
+channel (-> sku when present):
+- summing_matrix: sparse S (every node x bottom series) built from the bottom labels
+- reconcile: bottom-up, OLS and MinT-shrink reconciliation
+- shrinkage_lambda: Schafer-Strimmer shrinkage intensity from residuals
+- aggregate_segments: segment dicts for every aggregate node (summed units)
+- reconcile_benchmark: ForecastBenchmark base forecasts for every node, reconciled,
+  with accuracy per hierarchy level before and after
+- benchmark_reconciliation: timings on synthetic hierarchies
+
+OLS and MinT use the projection form (Wickramasuriya et al. 2019)
+
+    y_tilde = y_hat - W C' (C W C')^-1 C y_hat,    C = [I, -A]
+
+where A is the aggregate block of S. The only solve is over the aggregate
+nodes (sparse LU), and the MinT covariance is kept as diagonal + low rank
+(lambda * D + (1 - lambda) R'R / T), never as a dense n x n matrix, so the
+cost is linear in the number of bottom series.
+
+Usage:
+    python reconciliation.py --models Baselines,StatsForecast
+    python reconciliation.py --scale 10000,100000,300000
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy import sparse
+from scipy.sparse.linalg import splu
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from forecast_metrics import score
+from model_benchmark import ForecastBenchmark, resolve_models
+
+
+# Hierarchy levels, top to bottom; levels missing from the bottom labels are skipped
+HIERARCHY_LEVELS = ('product_line', 'region', 'channel', 'sku')
+
+METHODS = ('bottom_up', 'ols', 'mint_shrink')
+
+# Variance floor (relative to the largest) so constant series keep W invertible
+VARIANCE_FLOOR = 1e-8
+
+
+def summing_matrix(
+    bottom: pd.DataFrame,
+    levels: Sequence[str] = HIERARCHY_LEVELS,
+) -> Tuple[sparse.csr_matrix, pd.DataFrame]:
+    """
+    Sparse summing matrix for a strictly nested hierarchy.
+
+    Rows are aggregate nodes (grand total, then each level top-down, groups
+    sorted) followed by the bottom series in their given order, so
+    S = [A; I]. Aggregate levels with the same groups as the level above
+    (e.g. a single product line) are dropped.
+
+    Args:
+        bottom: One row per bottom series with its level labels
+        levels: Hierarchy levels, top to bottom
+
+    Returns:
+        (S (n_nodes x n_bottom) CSR, nodes frame with level, node name and the
+        level labels; deeper labels are None on aggregate rows)
+    """
+    levels = [level for level in levels if level in bottom.columns]
+    if not levels:
+        raise ValueError(f"bottom needs at least one of the columns {list(HIERARCHY_LEVELS)}")
+    if bottom.duplicated(subset=levels).any():
+        raise ValueError(f"Bottom series aren't unique over {levels}")
+
+    n_bottom = len(bottom)
+    labels = bottom[levels].astype(str).reset_index(drop=True)
+    bottom_index = np.arange(n_bottom)
+
+    rows, nodes = [], []
+    n_nodes = 0
+    previous_groups = 0
+    for depth in range(len(levels)):
+        prefix = levels[:depth]
+        if prefix:
+            grouped = labels.groupby(prefix, sort=True)
+            codes = grouped.ngroup().to_numpy()
+            keys = grouped.size().index.to_frame(index=False)
+        else:
+            codes = np.zeros(n_bottom, dtype=int)
+            keys = pd.DataFrame(index=range(1))
+
+        if len(keys) == previous_groups:
+            continue
+        previous_groups = len(keys)
+
+        rows.append(n_nodes + codes)
+        keys['level'] = prefix[-1] if prefix else 'total'
+        nodes.append(keys)
+        n_nodes += len(keys)
+
+    if previous_groups == n_bottom:
+        # The deepest aggregate level already identifies every series
+        rows.pop()
+        nodes.pop()
+        n_nodes -= n_bottom
+
+    rows.append(n_nodes + bottom_index)
+    leaves = labels.copy()
+    leaves['level'] = levels[-1]
+    nodes.append(leaves)
+
+    row = np.concatenate(rows)
+    col = np.tile(bottom_index, len(rows))
+    S = sparse.csr_matrix((np.ones(len(row)), (row, col)), shape=(n_nodes + n_bottom, n_bottom))
+
+    nodes = pd.concat(nodes, ignore_index=True)
+    nodes = nodes.astype(object).where(nodes.notna(), None)
+    nodes['node'] = [
+        '/'.join(label for label in row if label is not None) or 'total'
+        for row in nodes[levels].itertuples(index=False)
+    ]
+    return S, nodes[['level', 'node'] + levels]
+
+
+def shrinkage_lambda(residuals: np.ndarray) -> float:
+    """
+    Schafer-Strimmer shrinkage intensity towards the diagonal.
+
+    Same estimator as MinT-shrink in the R hts package (uncentered covariance,
+    off-diagonal sums), computed through the (T x T) Gram matrix of the
+    standardized residuals instead of the (n x n) correlation matrix.
+
+    Args:
+        residuals: (T, n) in-sample residuals, one column per node
+
+    Returns:
+        lambda in [0, 1]
+    """
+    n_obs = residuals.shape[0]
+    variances = np.mean(residuals ** 2, axis=0)
+    variances = np.maximum(variances, VARIANCE_FLOOR * max(variances.max(), 1.0))
+    xs = residuals / np.sqrt(variances)
+
+    gram = xs @ xs.T
+    squares = xs ** 2
+
+    # Sums of (xs'xs)_ij^2 and (xs^2' xs^2)_ij over all pairs, minus the diagonal
+    cross_off = np.sum(gram ** 2) - np.sum(squares.sum(axis=0) ** 2)
+    fourth_off = np.sum(squares.sum(axis=1) ** 2) - np.sum(squares ** 2)
+
+    variance_off = (fourth_off - cross_off / n_obs) / (n_obs * (n_obs - 1))
+    correlation_off = cross_off / n_obs ** 2
+    if correlation_off <= 0:
+        return 1.0
+    return float(np.clip(variance_off / correlation_off, 0.0, 1.0))
+
+
+def _project(
+    base: np.ndarray,
+    A: sparse.csr_matrix,
+    w_diag: np.ndarray,
+    U: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    y_hat - W C' (C W C')^-1 C y_hat for W = diag(w_diag) + U U'.
+
+    C W C' = diag(w_a) + A diag(w_b) A' + (C U)(C U)' is solved with a sparse LU
+    of the diagonal part and the Woodbury identity for the low-rank part.
+    """
+    n_agg = A.shape[0]
+
+    def c_times(x: np.ndarray) -> np.ndarray:
+        return x[:n_agg] - A @ x[n_agg:]
+
+    def c_transpose(z: np.ndarray) -> np.ndarray:
+        return np.vstack([z, -(A.T @ z)])
+
+    w_agg, w_bottom = w_diag[:n_agg], w_diag[n_agg:]
+    K = sparse.diags(w_agg) + (A @ sparse.diags(w_bottom) @ A.T)
+    solve = splu(sparse.csc_matrix(K)).solve
+
+    rhs = c_times(base)
+    z = solve(rhs)
+    if U is not None:
+        V = c_times(U)
+        KV = solve(V)
+        capacitance = np.eye(V.shape[1]) + V.T @ KV
+        z = z - KV @ np.linalg.solve(capacitance, V.T @ z)
+
+    correction = c_transpose(z)
+    adjustment = w_diag[:, None] * correction
+    if U is not None:
+        adjustment += U @ (U.T @ correction)
+    return base - adjustment
+
+
+def reconcile(
+    base: np.ndarray,
+    S: sparse.csr_matrix,
+    method: str = 'mint_shrink',
+    residuals: Optional[np.ndarray] = None,
+    shrinkage: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Reconcile base forecasts for every node so aggregates equal the sum of their series.
+
+    Args:
+        base: (n_nodes, horizon) base forecasts in summing_matrix node order
+        S: summing_matrix output
+        method: 'bottom_up' (sum the bottom forecasts), 'ols' (W = I) or
+            'mint_shrink' (W = shrunk residual covariance)
+        residuals: (T, n_nodes) in-sample residuals (mint_shrink only)
+        shrinkage: Fixed lambda (default: shrinkage_lambda(residuals))
+
+    Returns:
+        (n_nodes, horizon) coherent forecasts
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+
+    base = np.asarray(base, dtype=float)
+    squeeze = base.ndim == 1
+    if squeeze:
+        base = base[:, None]
+
+    n_nodes, n_bottom = S.shape
+    n_agg = n_nodes - n_bottom
+    A = S[:n_agg]
+
+    if method == 'bottom_up':
+        reconciled = S @ base[n_agg:]
+    elif method == 'ols':
+        reconciled = _project(base, A, np.ones(n_nodes))
+    else:
+        if residuals is None:
+            raise ValueError("mint_shrink needs in-sample residuals")
+        residuals = np.asarray(residuals, dtype=float)
+        residuals = residuals[~np.isnan(residuals).any(axis=1)]
+        if len(residuals) < 2:
+            raise ValueError("mint_shrink needs at least 2 complete residual rows")
+
+        lam = shrinkage_lambda(residuals) if shrinkage is None else shrinkage
+        n_obs = len(residuals)
+        variances = np.mean(residuals ** 2, axis=0)
+        variances = np.maximum(variances, VARIANCE_FLOOR * max(variances.max(), 1.0))
+
+        # W = lambda * D + (1 - lambda) * R'R / T, with lambda floored so W stays invertible
+        lam = max(lam, VARIANCE_FLOOR)
+        U = residuals.T * np.sqrt((1 - lam) / n_obs) if lam < 1 else None
+        reconciled = _project(base, A, lam * variances, U)
+
+    return reconciled[:, 0] if squeeze else reconciled
+
+
+def coherence_error(forecasts: np.ndarray, S: sparse.csr_matrix) -> float:
+    """Largest |aggregate - sum of its bottom series| over nodes and steps."""
+    forecasts = np.asarray(forecasts, dtype=float)
+    n_agg = S.shape[0] - S.shape[1]
+    if n_agg == 0:
+        return 0.0
+    return float(np.max(np.abs(forecasts[:n_agg] - S[:n_agg] @ forecasts[n_agg:])))
+
+
+def level_accuracy(
+    actuals: np.ndarray,
+    forecasts: Dict[str, np.ndarray],
+    nodes: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Accuracy per hierarchy level for several versions of the same forecasts.
+
+    Args:
+        actuals: (n_nodes, horizon) actuals
+        forecasts: Version name (e.g. 'base', 'mint_shrink') -> (n_nodes, horizon)
+        nodes: summing_matrix nodes frame
+
+    Returns:
+        One row per (version, level) with mae, rmse, mape and bias pooled over
+        that level's nodes and steps
+    """
+    rows = []
+    for version, values in forecasts.items():
+        for level in nodes['level'].unique():
+            mask = (nodes['level'] == level).to_numpy()
+            metrics = score(actuals[mask], values[mask])
+            rows.append({
+                'version': version,
+                'level': level,
+                **{name: float(metrics[name]) for name in ('mae', 'rmse', 'mape', 'bias')},
+            })
+    return pd.DataFrame(rows)
+
+
+def aggregate_segments(
+    segments_data: List[Dict],
+    levels: Sequence[str] = HIERARCHY_LEVELS,
+) -> Tuple[List[Dict], sparse.csr_matrix, pd.DataFrame]:
+    """
+    Segment dicts for every node of the segment hierarchy.
+
+    Aggregate nodes sum units and revenue over their segments; price is
+    revenue / units, event flags are the max and ground-truth drivers the mean
+    over the segments, so ForecastBenchmark (including Prophet's regressors)
+    runs on them unchanged.
+
+    Args:
+        segments_data: Bottom segment dicts sharing one calendar
+        levels: Hierarchy levels, top to bottom (read from each segment's meta)
+
+    Returns:
+        (node segment dicts in summing_matrix order, S, nodes frame)
+    """
+    bottom = pd.DataFrame([
+        {level: seg['meta'][level] for level in levels if level in seg['meta']}
+        for seg in segments_data
+    ])
+    S, nodes = summing_matrix(bottom, levels)
+    n_agg = S.shape[0] - S.shape[1]
+
+    units = np.array([seg['observed']['units'] for seg in segments_data], dtype=float)
+    revenue = np.array([seg['observed']['revenue'] for seg in segments_data], dtype=float)
+    agg_units = S[:n_agg] @ units
+    agg_revenue = S[:n_agg] @ revenue
+    counts = np.asarray(S[:n_agg].sum(axis=1)).ravel()
+
+    template = segments_data[0]
+    node_segments = []
+    for i in range(n_agg):
+        members = S[i].indices
+        with np.errstate(invalid='ignore', divide='ignore'):
+            price = np.where(agg_units[i] > 0, agg_revenue[i] / agg_units[i],
+                             np.mean([segments_data[j]['observed']['price'] for j in members], axis=0))
+
+        node_segments.append({
+            'meta': {
+                **{key: template['meta'][key] for key in ('freq', 'units') if key in template['meta']},
+                'segment': nodes['node'].iloc[i],
+                'level': nodes['level'].iloc[i],
+                'n_series': int(counts[i]),
+            },
+            'calendar': template['calendar'],
+            'observed': {
+                'units': agg_units[i].tolist(),
+                'revenue': agg_revenue[i].tolist(),
+                'price': price.tolist(),
+            },
+            'events': {
+                key: np.max([segments_data[j]['events'][key] for j in members], axis=0).tolist()
+                for key in template['events']
+            },
+            'ground_truth': {
+                key: np.mean([segments_data[j]['ground_truth'][key] for j in members], axis=0).tolist()
+                for key in template['ground_truth']
+            },
+        })
+
+    node_segments.extend(segments_data)
+    return node_segments, S, nodes
+
+
+def seasonal_residuals(history: np.ndarray, season: int = 7, window: Optional[int] = None) -> np.ndarray:
+    """
+    In-sample seasonal-naive errors y_t - y_(t-season), as a (T, n_nodes) residual matrix.
+
+    Benchmark families don't all expose fitted values, so these stand in for
+    the base models' residuals when estimating the MinT covariance.
+
+    Args:
+        history: (n_nodes, T_train) training history
+        season: Seasonal lag
+        window: Keep only the last `window` residuals (bounds memory at scale)
+
+    Returns:
+        (T, n_nodes) residuals
+    """
+    residuals = (history[:, season:] - history[:, :-season]).T
+    return residuals[-window:] if window else residuals
+
+
+def reconcile_benchmark(
+    segments_data: List[Dict],
+    test_horizon: int = 56,
+    families: Optional[List[str]] = None,
+    methods: Sequence[str] = METHODS,
+    residual_window: int = 365,
+) -> Dict:
+    """
+    Base forecasts for every node with ForecastBenchmark, then reconcile each model.
+
+    Intervals are not reconciled; only point forecasts are scored.
+
+    Args:
+        segments_data: Bottom segment dicts (AirJordan_*.json)
+        test_horizon: Periods held out
+        families: Registered model families to run (default: all)
+        methods: Reconciliation methods
+        residual_window: Training periods of seasonal-naive residuals for MinT
+
+    Returns:
+        Dict with nodes, S, per-model 'forecasts' (version -> (n_nodes, horizon)),
+        'accuracy' (level_accuracy rows with a model column) and 'coherence'
+        (model -> version -> max aggregation error)
+    """
+    families = resolve_models(families)
+    node_segments, S, nodes = aggregate_segments(segments_data)
+    print(f"Hierarchy: {S.shape[1]} bottom series, {S.shape[0]} nodes "
+          f"({', '.join(f'{lvl}: {n}' for lvl, n in nodes['level'].value_counts(sort=False).items())})")
+
+    units = np.array([seg['observed']['units'] for seg in node_segments], dtype=float)
+    actuals = units[:, -test_horizon:]
+    season = 7 if segments_data[0]['meta'].get('freq', 'D') == 'D' else 52
+    residuals = seasonal_residuals(units[:, :-test_horizon], season, residual_window)
+
+    # Base forecasts, one benchmark per node
+    base = {}
+    for i, seg in enumerate(node_segments):
+        print(f"\n[{i+1}/{len(node_segments)}] {nodes['node'].iloc[i]}")
+        results = ForecastBenchmark(seg, test_horizon=test_horizon).run_all(families=families)
+        for model_name, model_result in results.items():
+            if 'predictions' in model_result:
+                yhat = np.asarray(model_result['predictions']['yhat'], dtype=float)
+                base.setdefault(model_name, np.full(actuals.shape, np.nan))[i] = yhat
+
+    output = {'nodes': nodes, 'S': S, 'forecasts': {}, 'accuracy': [], 'coherence': {}}
+    for model_name, forecasts in base.items():
+        if np.isnan(forecasts).any():
+            print(f"Skipping {model_name}: no forecast for some nodes")
+            continue
+
+        versions = {'base': forecasts}
+        for method in methods:
+            versions[method] = reconcile(forecasts, S, method, residuals=residuals)
+
+        output['forecasts'][model_name] = versions
+        output['coherence'][model_name] = {name: coherence_error(values, S) for name, values in versions.items()}
+        accuracy = level_accuracy(actuals, versions, nodes)
+        accuracy.insert(0, 'model', model_name)
+        output['accuracy'].append(accuracy)
+
+    output['accuracy'] = pd.concat(output['accuracy'], ignore_index=True) if output['accuracy'] else pd.DataFrame()
+    return output
+
+
+def benchmark_reconciliation(
+    bottom_counts: Sequence[int] = (10_000, 100_000, 300_000),
+    horizon: int = 28,
+    n_obs: int = 56,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Time summing_matrix and every method on synthetic product_line/region/channel/sku hierarchies.
+
+    Args:
+        bottom_counts: Bottom (SKU-level) series per run
+        horizon: Forecast steps
+        n_obs: Residual rows for MinT-shrink
+        seed: Random seed
+
+    Returns:
+        One row per bottom count with node count and seconds per stage
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for n_bottom in bottom_counts:
+        bottom = pd.DataFrame({
+            'product_line': rng.choice(['Air Jordan', 'Air Max', 'Dunk'], n_bottom),
+            'region': rng.choice(['NA', 'EMEA', 'APAC', 'LATAM'], n_bottom),
+            'channel': rng.choice(['DTC', 'Retail', 'Online'], n_bottom),
+            'sku': np.arange(n_bottom),
+        })
+        row = {'bottom_series': n_bottom}
+
+        start = time.perf_counter()
+        S, nodes = summing_matrix(bottom)
+        row['summing_matrix_s'] = time.perf_counter() - start
+        row['nodes'] = S.shape[0]
+
+        truth = S @ rng.gamma(2.0, 5.0, (n_bottom, horizon))
+        base = truth + rng.normal(0, 1, truth.shape) * np.sqrt(truth + 1)
+        residuals = rng.normal(0, 1, (n_obs, S.shape[0])) * np.sqrt(truth[:, 0] + 1)
+
+        for method in METHODS:
+            start = time.perf_counter()
+            reconciled = reconcile(base, S, method, residuals=residuals)
+            row[f'{method}_s'] = time.perf_counter() - start
+            row[f'{method}_coherence'] = coherence_error(reconciled, S)
+
+        print(f"  {n_bottom:>8,} bottom series: " + ", ".join(
+            f"{key} {value:.2f}" for key, value in row.items() if key.endswith('_s')
+        ))
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def main():
+    """Reconcile benchmark forecasts over the Air Jordan hierarchy."""
+    parser = argparse.ArgumentParser(description="Hierarchical reconciliation of segment forecasts")
+    parser.add_argument("--data-dir", default="./data", help="Directory with AirJordan_*.json files")
+    parser.add_argument("--horizon", type=int, default=56, help="Test horizon in periods")
+    parser.add_argument("--models", default="Baselines,StatsForecast", help="Comma-separated model families")
+    parser.add_argument("--methods", default=",".join(METHODS), help=f"Comma-separated methods ({', '.join(METHODS)})")
+    parser.add_argument("--scale", default=None,
+                        help="Instead of the benchmark, time reconciliation at these bottom-series counts "
+                             "(comma-separated, e.g. 10000,100000,300000)")
+    parser.add_argument("--output", default="reconciliation_results.csv", help="Accuracy CSV")
+
+    args = parser.parse_args()
+
+    if args.scale:
+        print("="*60)
+        print("RECONCILIATION SCALING (seconds)")
+        print("="*60)
+        timings = benchmark_reconciliation([int(n) for n in args.scale.split(",")])
+        print(timings.round(3).to_string(index=False))
+        return
+
+    methods = args.methods.split(",")
+    unknown = [m for m in methods if m not in METHODS]
+    if unknown:
+        parser.error(f"Unknown methods {unknown}, expected some of {list(METHODS)}")
+
+    segments_data = []
+    for json_file in sorted(Path(args.data_dir).glob("AirJordan_*.json")):
+        with open(json_file, 'r') as f:
+            segments_data.append(json.load(f))
+
+    print("="*60)
+    print("HIERARCHICAL RECONCILIATION: Air Jordan")
+    print("="*60)
+
+    output = reconcile_benchmark(
+        segments_data,
+        test_horizon=args.horizon,
+        families=args.models.split(","),
+        methods=methods,
+    )
+
+    accuracy = output['accuracy']
+    if accuracy.empty:
+        print("\nNo model produced forecasts for every node")
+        return
+
+    accuracy.to_csv(args.output, index=False)
+    print(f"\n✓ Saved {args.output}")
+
+    for metric in ('mae', 'mape'):
+        print("\n" + "="*60)
+        print(f"{metric.upper()} by level, before (base) and after reconciliation")
+        print("="*60)
+        table = accuracy.pivot_table(index=['model', 'version'], columns='level', values=metric, sort=False)
+        print(table[output['nodes']['level'].unique()].round(2).to_string())
+
+    print("\nMax aggregation error (units):")
+    print(pd.DataFrame(output['coherence']).T.round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+One-Pass Rollups
+
+Daily, weekly and monthly aggregates at every hierarchy level from one
+(series x day) array per measure, instead of a groupby pass per output:
+- period_buckets: where each period starts in a sorted calendar, labelled like pd.Grouper
+- rollup_cube: one reduceat over the day axis per frequency, then bucket sums over
+  series groups for each hierarchy level
+- long_to_cube: long frame -> (series x day) arrays in one vectorized scatter
+- shoe_sales_rollups / segment_rollups: rollups for ShoeSalesGenerator output
+  (its cube, or its long frame) and the Air Jordan segment JSONs (stacked
+  through DemandCube)
+- save_rollups / load_rollup: CSVs under <data>/rollups/, read by charts and
+  weekly models instead of re-aggregating the daily data
+
+Measures aggregate as 'sum', 'mean' (over every row in the bucket, like a
+groupby mean on the long frame) or 'max'.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple, Union
+
+from demand_cube import DemandCube
+
+
+FREQ_NAMES = {'D': 'daily', 'W': 'weekly', 'M': 'monthly'}
+AGGREGATIONS = ('sum', 'mean', 'max')
+
+SHOE_SALES_MEASURES = {'units': 'sum', 'revenue': 'sum', 'price': 'mean', 'promo_flag': 'max'}
+SHOE_SALES_LEVELS = [('sku_family', 'region', 'channel'), (), ('sku_family',), ('region',), ('channel',)]
+
+SEGMENT_MEASURES = {'units': 'sum', 'revenue': 'sum', 'price': 'mean', 'stockout_rate': 'mean'}
+SEGMENT_LEVELS = [('region', 'channel'), (), ('region',), ('channel',)]
+
+
+def period_buckets(dates: Sequence, freq: str) -> Tuple[np.ndarray, pd.DatetimeIndex]:
+    """
+    Bucket a sorted calendar into periods.
+
+    Args:
+        dates: Sorted dates
+        freq: 'D', 'W' (weeks ending Sunday) or 'M'
+
+    Returns:
+        (index of each period's first date, period labels); labels are the period
+        end date, as pd.Grouper(freq=...) labels them
+    """
+    dates = pd.DatetimeIndex(dates)
+    if not dates.is_monotonic_increasing:
+        raise ValueError("dates must be sorted")
+
+    periods = dates.to_period(freq)
+    ordinals = periods.asi8
+    starts = np.flatnonzero(np.r_[True, ordinals[1:] != ordinals[:-1]])
+    labels = periods[starts].to_timestamp(how='end').normalize()
+    return starts, labels
+
+
+def _group_codes(series: pd.DataFrame, level: Tuple[str, ...]) -> Tuple[np.ndarray, pd.DataFrame]:
+    """Group number of each series at `level` (groupby order) and the group keys."""
+    if not level:
+        return np.zeros(len(series), dtype=int), pd.DataFrame(index=range(1))
+
+    grouped = series.groupby(list(level), sort=True, observed=True)
+    keys = grouped.size().index.to_frame(index=False)
+    return grouped.ngroup().to_numpy(), keys
+
+
+def _reduce_groups(values: np.ndarray, codes: np.ndarray, n_groups: int, how: str) -> np.ndarray:
+    """Combine per-series period aggregates into per-group ones (sum or max over series)."""
+    order = np.argsort(codes, kind='stable')
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+    if len(starts) != n_groups:
+        raise ValueError("Every group needs at least one series")
+    reducer = np.maximum if how == 'max' else np.add
+    return reducer.reduceat(values[order], starts, axis=0)
+
+
+def rollup_cube(
+    dates: Sequence,
+    series: pd.DataFrame,
+    measures: Dict[str, np.ndarray],
+    how: Dict[str, str],
+    levels: Sequence[Tuple[str, ...]],
+    freqs: Sequence[str] = ('D', 'W', 'M'),
+) -> Dict[Tuple[str, Tuple[str, ...]], pd.DataFrame]:
+    """
+    Aggregate (series x day) measures to every frequency and hierarchy level.
+
+    Each measure is reduced over the day axis once per frequency (reduceat over
+    period starts); hierarchy levels then combine those per-series period values
+    with bucket sums over series, so the daily data is only traversed once.
+
+    Args:
+        dates: (T,) sorted calendar shared by all series
+        series: One row per series with its hierarchy labels (e.g. region, channel)
+        measures: Measure name -> (n_series, T) array
+        how: Measure name -> 'sum', 'mean' or 'max'
+        levels: Hierarchy levels as tuples of `series` columns; () is the grand total
+        freqs: Period frequencies ('D', 'W', 'M')
+
+    Returns:
+        (freq, level) -> long frame with date, the level columns and the measures,
+        rows ordered by date then group (the order of a groupby on the long frame)
+    """
+    unknown = {name: agg for name, agg in how.items() if agg not in AGGREGATIONS}
+    if unknown:
+        raise ValueError(f"Unknown aggregations {unknown}, expected one of {AGGREGATIONS}")
+
+    n_days = len(dates)
+    groups = {level: _group_codes(series, tuple(level)) for level in levels}
+    rollups = {}
+
+    for freq in freqs:
+        starts, labels = period_buckets(dates, freq)
+        days_per_period = np.diff(np.r_[starts, n_days])
+
+        # One pass over the daily data per measure: per-series period aggregates
+        per_series = {}
+        for name, agg in how.items():
+            values = np.asarray(measures[name])
+            if agg == 'max':
+                per_series[name] = np.maximum.reduceat(values, starts, axis=1)
+            else:
+                dtype = np.int64 if np.issubdtype(values.dtype, np.integer) else float
+                per_series[name] = np.add.reduceat(values, starts, axis=1, dtype=dtype)
+
+        for level in levels:
+            codes, keys = groups[level]
+            n_groups = len(keys)
+            series_per_group = np.bincount(codes, minlength=n_groups)
+
+            columns = {'date': np.repeat(labels.values, n_groups)}
+            for col in level:
+                columns[col] = np.tile(keys[col].to_numpy(), len(labels))
+
+            for name, agg in how.items():
+                values = _reduce_groups(per_series[name], codes, n_groups, agg)
+                if agg == 'mean':
+                    values = values / (series_per_group[:, None] * days_per_period[None, :])
+                # (group, period) -> date-major rows
+                columns[name] = values.T.ravel()
+
+            rollups[(freq, tuple(level))] = pd.DataFrame(columns)
+
+    return rollups
+
+
+def long_to_cube(
+    df: pd.DataFrame,
+    series_cols: Sequence[str],
+    measures: Sequence[str],
+    date_col: str = 'date',
+) -> Tuple[pd.DatetimeIndex, pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Scatter a long frame into (series x day) arrays.
+
+    Args:
+        df: Long frame, one row per (series, date)
+        series_cols: Columns identifying a series (e.g. sku, sku_family, region, channel)
+        measures: Columns to extract
+        date_col: Date column
+
+    Returns:
+        (sorted dates, one row per series with its series_cols, measure -> (n_series, T));
+        (series, date) pairs missing from df are 0
+    """
+    grouped = df.groupby(list(series_cols), sort=True, observed=True)
+    series_codes = grouped.ngroup().to_numpy()
+    series = grouped.size().index.to_frame(index=False)
+
+    date_codes, dates = pd.factorize(df[date_col], sort=True)
+    shape = (len(series), len(dates))
+
+    cube = {}
+    for name in measures:
+        values = df[name].to_numpy()
+        cube[name] = np.zeros(shape, dtype=values.dtype)
+        cube[name][series_codes, date_codes] = values
+
+    return pd.DatetimeIndex(dates), series, cube
+
+
+def _shoe_sales_arrays(cube: DemandCube) -> Tuple[pd.DatetimeIndex, pd.DataFrame, Dict[str, np.ndarray]]:
+    """long_to_cube's output read straight off a generator cube (series in the same sorted order)."""
+    n_days = len(cube.coords['date'])
+    series = pd.MultiIndex.from_product(
+        [cube.coords['sku'], cube.coords['region'], cube.coords['channel']], names=['sku', 'region', 'channel']
+    ).to_frame(index=False)
+    families = dict(zip(cube.coords['sku'], cube.aux['sku_family'][1]))
+    series.insert(1, 'sku_family', series['sku'].map(families))
+    series = series.sort_values(['sku', 'sku_family', 'region', 'channel'])
+
+    arrays = {}
+    for name in SHOE_SALES_MEASURES:
+        values = cube.sel(measure=name).values.reshape(-1, n_days)[series.index]
+        # Integer measures as in the long frame (units int32, flags int8)
+        if name == 'units':
+            values = values.astype(np.int32)
+        elif name.endswith('_flag'):
+            values = values.astype(np.int8)
+        arrays[name] = values
+
+    return cube.coords['date'], series.reset_index(drop=True), arrays
+
+
+def shoe_sales_rollups(data: Union[pd.DataFrame, DemandCube]) -> Dict[Tuple[str, Tuple[str, ...]], pd.DataFrame]:
+    """
+    Daily/weekly/monthly rollups of ShoeSalesGenerator output at every SHOE_SALES_LEVELS level.
+
+    Args:
+        data: ShoeSalesGenerator.generate_cube output (arrays used as they are) or
+            ShoeSalesGenerator.generate output (scattered back into arrays first)
+
+    Returns:
+        rollup_cube output
+    """
+    if isinstance(data, DemandCube):
+        dates, series, cube = _shoe_sales_arrays(data)
+    else:
+        dates, series, cube = long_to_cube(
+            data, ['sku', 'sku_family', 'region', 'channel'], list(SHOE_SALES_MEASURES)
+        )
+    return rollup_cube(dates, series, cube, SHOE_SALES_MEASURES, SHOE_SALES_LEVELS)
+
+
+def segment_rollups(segments_data: List[Dict]) -> Dict[Tuple[str, Tuple[str, ...]], pd.DataFrame]:
+    """
+    Rollups of Air Jordan segments at every SEGMENT_LEVELS level.
+
+    Daily series get daily, weekly and monthly rollups; weekly series weekly
+    and monthly.
+
+    Args:
+        segments_data: Segment dicts (AirJordanDemandGenerator.generate_segment output)
+
+    Returns:
+        rollup_cube output; stockout_rate is the share of periods with a stockout
+    """
+    cube = DemandCube.from_segments(segments_data, measures=('units', 'revenue', 'price', 'stockout_flag'))
+    dates = cube.coords['date']
+    n_days = len(dates)
+
+    # One series per region x channel cell that has a segment
+    series = pd.MultiIndex.from_product(
+        [cube.coords['region'], cube.coords['channel']], names=['region', 'channel']
+    ).to_frame(index=False)
+    present = ~np.isnan(cube.values[0]).all(axis=-1).ravel()
+    series = series[present].reset_index(drop=True)
+
+    def measure(name: str) -> np.ndarray:
+        return cube.sel(measure=name).values.reshape(-1, n_days)[present]
+
+    arrays = {
+        'units': measure('units').astype(np.int64),
+        'revenue': measure('revenue'),
+        'price': measure('price'),
+        'stockout_rate': measure('stockout_flag'),
+    }
+    freqs = ('D', 'W', 'M') if segments_data[0]['meta']['freq'] == 'D' else ('W', 'M')
+
+    return rollup_cube(dates, series, arrays, SEGMENT_MEASURES, SEGMENT_LEVELS, freqs)
+
+
+def rollup_path(data_dir: Path, prefix: str, freq: str, level: Sequence[str]) -> Path:
+    """CSV path of one rollup, e.g. rollups/airjordan_weekly_region-channel.csv."""
+    level_name = '-'.join(level) if level else 'total'
+    return Path(data_dir) / 'rollups' / f"{prefix}_{FREQ_NAMES[freq]}_{level_name}.csv"
+
+
+def save_rollups(
+    rollups: Dict[Tuple[str, Tuple[str, ...]], pd.DataFrame],
+    data_dir: Path,
+    prefix: str,
+) -> List[Path]:
+    """
+    Write every rollup to <data_dir>/rollups/<prefix>_<freq>_<level>.csv.
+
+    Args:
+        rollups: rollup_cube output
+        data_dir: Data directory
+        prefix: File name prefix (e.g. 'shoe_sales', 'airjordan')
+
+    Returns:
+        Paths written
+    """
+    paths = []
+    for (freq, level), frame in rollups.items():
+        path = rollup_path(data_dir, prefix, freq, level)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        frame.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def load_rollup(data_dir: Path, prefix: str, freq: str, level: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    Read one precomputed rollup.
+
+    Args:
+        data_dir: Data directory the rollups were saved under
+        prefix: File name prefix used by save_rollups
+        freq: 'D', 'W' or 'M'
+        level: Hierarchy level, e.g. ('region', 'channel'); () for the total
+
+    Returns:
+        Rollup frame with parsed dates and string level columns
+    """
+    # Only empty cells are missing: region labels such as 'NA' must stay strings
+    return pd.read_csv(
+        rollup_path(data_dir, prefix, freq, tuple(level)),
+        parse_dates=['date'],
+        dtype={col: str for col in level},
+        keep_default_na=False,
+        na_values=[''],
+    )
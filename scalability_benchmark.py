@@ -0,0 +1,388 @@
+"""
+Scalability Benchmark: how the pipeline scales with series count and history length.
+
+Synthesizes grids of N segments x T periods x freq with AirJordanDemandGenerator
+and times every hot path on each grid point:
+- generate: AirJordanDemandGenerator segments
+- export_json / export_npz: JSON (as shoe_demand_generator writes it) and binary export
+- prophet_fitter: ProphetFitter.fit_segment
+- Prophet / StatsForecast / XGBoost / LightGBM: ForecastBenchmark.run_family
+
+Each stage runs in a fresh worker process, so peak RSS is that stage's own
+high-water mark. Results are written as JSON with the git commit, and can be
+compared against a baseline file to flag regressions.
+
+Usage:
+    python scalability_benchmark.py --series 6,24 --periods 365,1095 --freqs D,W
+    python scalability_benchmark.py --stages generate,export_json,XGBoost --output after.json \\
+        --compare before.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from model_benchmark import MODEL_REGISTRY, ForecastBenchmark, _limit_threads, cpu_seconds, peak_rss_mb
+
+
+# Stages in run order; model families come from the benchmark's registry
+DATA_STAGES = ['generate', 'export_json', 'export_npz', 'prophet_fitter']
+FAMILY_STAGES = list(MODEL_REGISTRY)
+ALL_STAGES = DATA_STAGES + FAMILY_STAGES
+
+# Grid point + stage identify a result row when comparing runs
+KEY_COLUMNS = ['n_series', 'n_periods', 'freq', 'stage']
+
+
+def git_commit() -> Dict:
+    """Current commit sha and whether the working tree has uncommitted changes."""
+    repo = Path(__file__).resolve().parent
+    try:
+        sha = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=repo, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo, capture_output=True, text=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {'sha': None, 'dirty': None}
+    return {'sha': sha, 'dirty': dirty}
+
+
+def generate_segments(
+    n_series: int,
+    n_periods: int,
+    freq: str,
+    start_date: str = "2019-01-01",
+    seed: int = 42,
+) -> List[Dict]:
+    """
+    Generate n_series segments of n_periods each.
+
+    Region/channel combinations are cycled; every segment gets fresh random draws
+    and a unique name (AirJordan_<region>_<channel>_<i>).
+
+    Args:
+        n_series: Number of segments
+        n_periods: Periods per segment
+        freq: 'D' or 'W'
+        start_date: First date
+        seed: Random seed
+
+    Returns:
+        List of segment data dicts
+    """
+    from shoe_demand_generator import AirJordanDemandGenerator
+
+    dates = pd.date_range(start_date, periods=n_periods, freq=freq)
+    generator = AirJordanDemandGenerator(
+        start_date=start_date,
+        end_date=dates[-1].strftime("%Y-%m-%d"),
+        freq=freq,
+        seed=seed,
+    )
+
+    combos = [(region, channel) for region in generator.regions for channel in generator.channels]
+
+    segments = []
+    for i in range(n_series):
+        region, channel = combos[i % len(combos)]
+        segment_data = generator.generate_segment(region, channel)
+        segment_data['meta']['segment'] = f"AirJordan_{region}_{channel}_{i:05d}"
+        segments.append(segment_data)
+
+    return segments
+
+
+def segment_arrays(segment_data: Dict) -> Dict[str, np.ndarray]:
+    """Numeric series of a segment as arrays keyed '<section>/<name>' (binary export layout)."""
+    arrays = {}
+    for section in ('ground_truth', 'events', 'inventory', 'observed'):
+        for name, values in segment_data[section].items():
+            arrays[f"{section}/{name}"] = np.asarray(values)
+    arrays['calendar/ds'] = np.asarray(segment_data['calendar']['ds'], dtype='datetime64[D]')
+    return arrays
+
+
+def _run_stage(
+    stage: str,
+    segments: Optional[List[Dict]],
+    grid: Dict,
+    horizon: int,
+    uncertainty_samples: int,
+    threads: int,
+) -> Dict:
+    """
+    Worker process entry: run one stage over every segment of a grid point.
+
+    Returns:
+        Dict with wall_s, cpu_s, peak_rss_mb (growth over the worker's baseline),
+        status, error, bytes (exports) and the segments (generate only)
+    """
+    _limit_threads(threads)
+
+    # Import backends before the baseline so import cost/memory isn't charged to the stage
+    if stage == 'prophet_fitter':
+        import prophet_fitter  # noqa: F401
+    elif stage in FAMILY_STAGES:
+        MODEL_REGISTRY[stage].import_backends()
+
+    rss_start = peak_rss_mb()
+    wall_start = time.perf_counter()
+    cpu_start = cpu_seconds()
+
+    result = {'status': 'ok', 'error': None, 'bytes': None}
+
+    try:
+        if stage == 'generate':
+            result['segments'] = generate_segments(grid['n_series'], grid['n_periods'], grid['freq'])
+
+        elif stage == 'export_json':
+            with tempfile.TemporaryDirectory() as tmp:
+                total = 0
+                for segment_data in segments:
+                    path = Path(tmp) / f"{segment_data['meta']['segment']}.json"
+                    with open(path, 'w') as f:
+                        json.dump(segment_data, f, indent=2)
+                    total += path.stat().st_size
+                result['bytes'] = total
+
+        elif stage == 'export_npz':
+            with tempfile.TemporaryDirectory() as tmp:
+                total = 0
+                for segment_data in segments:
+                    path = Path(tmp) / f"{segment_data['meta']['segment']}.npz"
+                    np.savez(path, **segment_arrays(segment_data))
+                    total += path.stat().st_size
+                result['bytes'] = total
+
+        elif stage == 'prophet_fitter':
+            from prophet_fitter import ProphetFitter
+
+            fitter = ProphetFitter(seasonality_mode="multiplicative", uncertainty_samples=uncertainty_samples)
+            for segment_data in segments:
+                fitter.fit_segment(segment_data, add_holidays=True)
+
+        elif stage in FAMILY_STAGES:
+            failures = []
+            for segment_data in segments:
+                benchmark = ForecastBenchmark(
+                    segment_data,
+                    test_horizon=horizon,
+                    forecast_freq=grid['freq'],
+                    prophet_uncertainty_samples=uncertainty_samples,
+                    n_jobs=threads,
+                )
+                family_results = benchmark.run_family(stage)
+                failures.extend(r['error'] for r in family_results.values() if 'error' in r)
+            if failures:
+                result.update({'status': 'error', 'error': failures[0]})
+
+        else:
+            raise ValueError(f"Unknown stage {stage!r}, expected one of {ALL_STAGES}")
+
+    except Exception as e:
+        result.update({'status': 'error', 'error': str(e)})
+
+    result['wall_s'] = time.perf_counter() - wall_start
+    result['cpu_s'] = cpu_seconds() - cpu_start
+
+    rss_end = peak_rss_mb()
+    result['peak_rss_mb'] = None if rss_start is None else rss_end - rss_start
+
+    return result
+
+
+def run_grid(
+    series: List[int],
+    periods: List[int],
+    freqs: List[str],
+    stages: List[str] = ALL_STAGES,
+    horizon: int = 28,
+    uncertainty_samples: int = 0,
+    threads: int = 1,
+) -> pd.DataFrame:
+    """
+    Time every stage on every grid point.
+
+    Args:
+        series: Segment counts N
+        periods: History lengths T (periods per segment)
+        freqs: Frequencies ('D', 'W')
+        stages: Subset of ALL_STAGES (data is always generated)
+        horizon: Test horizon for the model families
+        uncertainty_samples: Prophet uncertainty samples (0 = no intervals)
+        threads: BLAS/OpenMP/model threads per stage
+
+    Returns:
+        DataFrame with KEY_COLUMNS, wall_s, cpu_s, series_per_s, peak_rss_mb,
+        bytes, status and error
+    """
+    ctx = multiprocessing.get_context('spawn')
+    rows = []
+
+    for freq in freqs:
+        for n_periods in periods:
+            for n_series in series:
+                grid = {'n_series': n_series, 'n_periods': n_periods, 'freq': freq}
+                print(f"\nGrid point: N={n_series} T={n_periods} freq={freq}")
+
+                segments = None
+                for stage in ['generate'] + [s for s in stages if s != 'generate']:
+                    # Fresh worker per stage: its peak RSS belongs to this stage alone
+                    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+                        result = executor.submit(
+                            _run_stage, stage, segments, grid, horizon, uncertainty_samples, threads
+                        ).result()
+
+                    if stage == 'generate':
+                        segments = result.pop('segments', None)
+                        if segments is None:
+                            print(f"  generate failed: {result['error']}")
+                            break
+                        if 'generate' not in stages:
+                            continue
+
+                    rows.append({
+                        **grid,
+                        'stage': stage,
+                        'wall_s': result['wall_s'],
+                        'cpu_s': result['cpu_s'],
+                        'series_per_s': n_series / result['wall_s'] if result['wall_s'] > 0 else None,
+                        'peak_rss_mb': result['peak_rss_mb'],
+                        'bytes': result['bytes'],
+                        'status': result['status'],
+                        'error': result['error'],
+                    })
+
+                    status = "" if result['status'] == 'ok' else f"  [{result['status']}: {result['error']}]"
+                    print(f"  {stage:15s} {result['wall_s']:8.2f}s  {rows[-1]['series_per_s'] or 0:9.1f} series/s"
+                          f"  +{result['peak_rss_mb'] or 0:7.1f} MB{status}")
+
+    return pd.DataFrame(rows)
+
+
+def save_results(results: pd.DataFrame, output_path: Path, config: Dict):
+    """Write results with run metadata (commit, machine, settings) as JSON."""
+    payload = {
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'machine': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': config,
+        'results': json.loads(results.to_json(orient='records')),
+    }
+
+    with open(output_path, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+
+def compare_results(current: pd.DataFrame, baseline_path: Path, tolerance: float = 0.2) -> pd.DataFrame:
+    """
+    Compare wall time and memory against a baseline results file.
+
+    Args:
+        current: Results from run_grid
+        baseline_path: JSON written by save_results on another commit
+        tolerance: Allowed relative slowdown / memory growth before flagging
+
+    Returns:
+        Matched rows with time_ratio, rss_ratio and a regression flag
+    """
+    with open(baseline_path, 'r') as f:
+        baseline_payload = json.load(f)
+    baseline = pd.DataFrame(baseline_payload['results'])
+
+    ok = lambda df: df[df['status'] == 'ok']
+    merged = ok(current).merge(ok(baseline), on=KEY_COLUMNS, suffixes=('', '_base'))
+
+    merged['time_ratio'] = merged['wall_s'] / merged['wall_s_base']
+    # Memory growth below a few MB is noise from allocator/page granularity
+    merged['rss_ratio'] = (merged['peak_rss_mb'].clip(lower=8.0) /
+                           merged['peak_rss_mb_base'].clip(lower=8.0))
+    merged['regression'] = (merged['time_ratio'] > 1 + tolerance) | (merged['rss_ratio'] > 1 + tolerance)
+
+    print(f"\nCompared with {baseline_path} (commit {(baseline_payload['commit'].get('sha') or '?')[:10]})")
+    return merged[KEY_COLUMNS + ['wall_s_base', 'wall_s', 'time_ratio', 'rss_ratio', 'regression']]
+
+
+def main():
+    """Run the scalability grid."""
+    parser = argparse.ArgumentParser(description="Scaling benchmark over series count and history length")
+    parser.add_argument("--series", default="6,24", help="Comma-separated segment counts N")
+    parser.add_argument("--periods", default="365,1095", help="Comma-separated history lengths T")
+    parser.add_argument("--freqs", default="D", help="Comma-separated frequencies (D, W)")
+    parser.add_argument("--stages", default=",".join(ALL_STAGES), help=f"Comma-separated subset of {ALL_STAGES}")
+    parser.add_argument("--horizon", type=int, default=28, help="Test horizon in periods for model families")
+    parser.add_argument("--uncertainty-samples", type=int, default=0,
+                        help="Prophet uncertainty samples (0 = no intervals)")
+    parser.add_argument("--threads", type=int, default=1, help="Threads per stage worker")
+    parser.add_argument("--output", default="scalability_results.json", help="Results JSON")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative slowdown/memory growth flagged as a regression")
+
+    args = parser.parse_args()
+
+    stages = args.stages.split(",")
+    unknown = [s for s in stages if s not in ALL_STAGES]
+    if unknown:
+        parser.error(f"Unknown stages {unknown}, expected a subset of {ALL_STAGES}")
+
+    config = {
+        'series': [int(n) for n in args.series.split(",")],
+        'periods': [int(t) for t in args.periods.split(",")],
+        'freqs': args.freqs.split(","),
+        'stages': stages,
+        'horizon': args.horizon,
+        'uncertainty_samples': args.uncertainty_samples,
+        'threads': args.threads,
+    }
+
+    print("="*60)
+    print("SCALABILITY BENCHMARK")
+    print("="*60)
+
+    results = run_grid(**config)
+
+    save_results(results, Path(args.output), config)
+    print(f"\n✓ Saved {args.output}")
+
+    # Scaling curves: throughput per stage across the grid
+    print("\n" + "="*60)
+    print("THROUGHPUT (series/s)")
+    print("="*60)
+    ok = results[results['status'] == 'ok']
+    if len(ok):
+        table = ok.pivot_table(index='stage', columns=['freq', 'n_periods', 'n_series'], values='series_per_s')
+        print(table.reindex([s for s in ALL_STAGES if s in table.index]).round(2).to_string())
+
+    if args.compare:
+        comparison = compare_results(results, Path(args.compare), args.tolerance)
+        print(comparison.round(3).to_string(index=False))
+
+        regressions = comparison[comparison['regression']]
+        if len(regressions):
+            print(f"\n✗ {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print(f"\n✓ No regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,14 @@
 Air Jordan Demand Generator with Multiplicative Composition
 
 Generates realistic synthetic demand data for executive-level forecasting demos.
-Implements the full pipeline: generate → fit Prophet → backtest → export JSON.
+Implements the full pipeline: generate → fit Prophet → backtest → export JSON
+(plus precomputed rollups, see rollups.py).
 
 Usage:
     python shoe_demand_generator.py
     python shoe_demand_generator.py --no-fit --segments AJ_NA_DTC
     python shoe_demand_generator.py --start-date 2022-01-01 --freq W
+    python shoe_demand_generator.py --tune --tune-jobs 8
 """
 
 import numpy as np
@@ -19,6 +21,9 @@ import json
 import argparse
 from pathlib import Path
 
+from demand_cube import DemandCube
+from rollups import save_rollups, segment_rollups
+
 
 class AirJordanDemandGenerator:
     """
@@ -810,6 +815,15 @@ class AirJordanDemandGenerator:
 
         return segments
 
+    def generate_cube(self) -> DemandCube:
+        """
+        Generate all segments as a (measure x region x channel x date) cube.
+
+        Returns:
+            DemandCube of observed units, revenue and price
+        """
+        return DemandCube.from_segments(self.generate_all_segments())
+
 
 def main():
     """CLI entry point."""
@@ -824,10 +838,32 @@ def main():
     parser.add_argument("--no-backtest", action="store_true", help="Skip backtesting")
     parser.add_argument("--horizon", type=int, default=56, help="Backtest horizon in days")
     parser.add_argument("--folds", type=int, default=4, help="Number of backtest folds")
+    parser.add_argument("--horizons", default=None,
+                        help="Comma-separated shorter horizons in days (e.g. 7,14,28) scored from the same backtest folds")
+    parser.add_argument("--uncertainty-samples", type=int, default=1000,
+                        help="Prophet uncertainty samples per prediction (0 disables intervals)")
+    parser.add_argument("--interval-scope", default="all", choices=["all", "horizon", "none"],
+                        help="Rows that get Prophet intervals (all, forecast horizon only, none); "
+                             "'horizon' only affects backtest folds, the exported forecast keeps intervals")
+    parser.add_argument("--coverage-folds", type=int, default=None,
+                        help="Trailing backtest folds that compute intervals/coverage (default: all)")
+    parser.add_argument("--tune", action="store_true",
+                        help="Tune Prophet priors per segment (successive halving over backtest folds)")
+    parser.add_argument("--tune-jobs", type=int, default=None, help="Worker processes for tuning (default: all cores)")
     parser.add_argument("--seed", type=int, default=42, help="Random seed")
 
     args = parser.parse_args()
 
+    # Shorter backtest horizons come from slicing the --horizon folds
+    horizons = None
+    if args.horizons:
+        try:
+            horizons = sorted({int(h) for h in args.horizons.split(",")})
+        except ValueError:
+            parser.error("--horizons must be comma-separated integers")
+        if not 0 < horizons[0] <= horizons[-1] <= args.horizon:
+            parser.error(f"--horizons must be between 1 and --horizon ({args.horizon})")
+
     # Create generator
     generator = AirJordanDemandGenerator(
         start_date=args.start_date,
@@ -857,10 +893,47 @@ def main():
             print("Fitting Prophet models...")
             print("="*60)
 
-            fitter = ProphetFitter(seasonality_mode="multiplicative")
+            fitter = ProphetFitter(
+                seasonality_mode="multiplicative",
+                uncertainty_samples=args.uncertainty_samples,
+                interval_scope=args.interval_scope,
+            )
+
+            # Tuned priors per segment (cached next to the JSON output)
+            if args.tune:
+                from prophet_tuner import ProphetTuner
+
+                tuner = ProphetTuner(
+                    horizon_days=args.horizon,
+                    n_folds=args.folds,
+                    n_jobs=args.tune_jobs,
+                    cache_path=Path(args.output_dir) / "prophet_tuning_cache.json",
+                )
+                tuned = tuner.tune_all(segments_data)
+
+                for i, segment_data in enumerate(segments_data):
+                    segment_name = segment_data['meta']['segment']
+                    print(f"[{i+1}/{len(segments_data)}] Fitting {segment_name} (tuned)...")
+                    seg_fitter = ProphetFitter(
+                        **tuned[segment_name]['config'],
+                        uncertainty_samples=args.uncertainty_samples,
+                        interval_scope=args.interval_scope,
+                    )
+                    segment_data = seg_fitter.fit_segment(segment_data, add_holidays=True)
+                    if not args.no_backtest:
+                        segment_data = seg_fitter.backtest_segment(
+                            segment_data,
+                            horizon_days=args.horizon,
+                            n_folds=args.folds,
+                            add_holidays=True,
+                            coverage_folds=args.coverage_folds,
+                            horizons=horizons,
+                        )
+                    segment_data['meta']['prophet_config'] = tuned[segment_name]['config']
+                    segments_data[i] = segment_data
 
             # Fit only or fit + backtest
-            if args.no_backtest:
+            elif args.no_backtest:
                 for i, segment_data in enumerate(segments_data):
                     segment_name = segment_data['meta']['segment']
                     print(f"[{i+1}/{len(segments_data)}] Fitting {segment_name}...")
@@ -870,7 +943,9 @@ def main():
                     segments_data,
                     horizon_days=args.horizon,
                     n_folds=args.folds,
-                    add_holidays=True
+                    add_holidays=True,
+                    coverage_folds=args.coverage_folds,
+                    horizons=horizons,
                 )
 
             print("\n✓ Prophet fitting complete")
@@ -897,6 +972,10 @@ def main():
 
         print(f"✓ Saved {output_file}")
 
+    # Daily/weekly/monthly totals by region and channel for charts and weekly models
+    rollup_paths = save_rollups(segment_rollups(segments_data), output_dir, "airjordan")
+    print(f"✓ Saved {len(rollup_paths)} rollups to {output_dir / 'rollups'}")
+
     print(f"\n✓ Generated {len(segments_data)} segments")
     print(f"✓ Output directory: {output_dir.absolute()}")
 
@@ -909,16 +988,19 @@ def main():
             metrics = segment_data.get("metrics", {})
             if metrics:
                 seg_name = segment_data["meta"]["segment"]
+                coverage = f"{metrics['coverage']:.2f}" if metrics.get("coverage") is not None else " n/a"
                 print(f"{seg_name:25s} | MAE: {metrics['mae']:6.1f} | "
-                      f"MAPE: {metrics['mape']:5.1f}% | Coverage: {metrics['coverage']:.2f}")
+                      f"MAPE: {metrics['mape']:5.1f}% | Coverage: {coverage}")
 
         # Average metrics
         avg_mae = np.mean([s["metrics"]["mae"] for s in segments_data if s.get("metrics")])
         avg_mape = np.mean([s["metrics"]["mape"] for s in segments_data if s.get("metrics")])
-        avg_coverage = np.mean([s["metrics"]["coverage"] for s in segments_data if s.get("metrics")])
+        coverages = [s["metrics"]["coverage"] for s in segments_data
+                     if s.get("metrics") and s["metrics"].get("coverage") is not None]
+        avg_coverage = f"{np.mean(coverages):.2f}" if coverages else " n/a"
 
         print("-" * 60)
-        print(f"{'AVERAGE':25s} | MAE: {avg_mae:6.1f} | MAPE: {avg_mape:5.1f}% | Coverage: {avg_coverage:.2f}")
+        print(f"{'AVERAGE':25s} | MAE: {avg_mae:6.1f} | MAPE: {avg_mape:5.1f}% | Coverage: {avg_coverage}")
 
 
 if __name__ == "__main__":
@@ -7,15 +7,31 @@ Includes trends, seasonality, promotions, holidays, and realistic correlations b
 - Regions (economic conditions)
 - Channels (customer behavior)
 - Price and demand (elasticity)
+
+All series are simulated as one (sku x region x channel x day) cube and the
+long-format frame is built from it with repeat/tile; `--benchmark` compares
+that against building one dict per row. `--partitioned` streams one series at
+a time to a hive-partitioned Parquet dataset (pyarrow) instead.
 """
 
+import argparse
+import time
+import tracemalloc
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional, Union
+from urllib.parse import quote
 import holidays
 from scipy import stats
 
+from demand_cube import DemandCube
+from rollups import save_rollups, shoe_sales_rollups
+
+
+# Hive partition columns of the streamed dataset (one partition per series)
+PARTITION_COLUMNS = ["sku", "region", "channel"]
+
 
 class ShoeSalesGenerator:
     """
@@ -77,6 +93,9 @@ class ShoeSalesGenerator:
         self.region_correlation = None
         self.channel_correlation = None
 
+        # Target / implied / realized average correlation of factor noise (noise_model="factor")
+        self.noise_correlation = None
+
     def _generate_correlation_matrix(self, n: int, strength: float = 0.3) -> np.ndarray:
         """
         Generate a valid correlation matrix.
@@ -91,13 +110,11 @@ class ShoeSalesGenerator:
         # Start with identity
         corr = np.eye(n)
 
-        # Add random correlations
-        for i in range(n):
-            for j in range(i + 1, n):
-                # Random correlation with given strength
-                c = np.random.uniform(-strength, strength)
-                corr[i, j] = c
-                corr[j, i] = c
+        # Add random correlations, drawn row by row over the upper triangle
+        upper = np.triu_indices(n, k=1)
+        c = np.random.uniform(-strength, strength, size=len(upper[0]))
+        corr[upper] = c
+        corr[upper[::-1]] = c
 
         # Ensure positive definite (make valid correlation matrix)
         eigvals, eigvecs = np.linalg.eigh(corr)
@@ -110,6 +127,75 @@ class ShoeSalesGenerator:
 
         return corr
 
+    def _generate_factor_loadings(self, n: int, target_corr: float, n_factors: int = 3) -> np.ndarray:
+        """
+        Loadings of a k-factor noise model with a target average pairwise correlation.
+
+        Series i is x_i = l_i . f + sqrt(1 - |l_i|^2) e_i with independent standard
+        normal factors f and noise e, so corr(x_i, x_j) = l_i . l_j. Factor 0 is a
+        common factor shared equally by all series; the other k-1 give each series
+        random exposures (group structure). The common loading is solved so the
+        average off-diagonal correlation equals target_corr exactly (when reachable).
+
+        Args:
+            n: Number of series
+            target_corr: Target average pairwise correlation (0 <= target_corr < 1)
+            n_factors: Number of factors k (>= 1)
+
+        Returns:
+            n x k loading matrix with every row norm below 1
+        """
+        if not 0 <= target_corr < 1:
+            raise ValueError(f"Factor noise needs a target correlation in [0, 1), got {target_corr}")
+        if n_factors < 1:
+            raise ValueError(f"n_factors must be >= 1, got {n_factors}")
+
+        # Random exposures take about half of the variance the common factor leaves;
+        # centered across series so they add structure without shifting the average
+        specific = np.random.normal(0, 1, size=(n, n_factors - 1))
+        if n_factors > 1 and n > 1:
+            specific -= specific.mean(axis=0)
+            specific *= np.sqrt((1 - target_corr) / 2 / (n_factors - 1))
+            # Cap heavy-tailed rows so the common loading below still fits under unit variance
+            norms = np.sqrt(np.sum(specific ** 2, axis=1, keepdims=True))
+            specific *= np.minimum(1.0, np.sqrt(0.9 * (1 - target_corr)) / np.maximum(norms, 1e-12))
+
+        # Average off-diagonal l_i . l_j = a^2 + (|sum r_i|^2 - sum |r_i|^2) / (n(n-1)) in O(n k)
+        n_pairs = max(n * (n - 1), 1)
+        specific_avg = (np.sum(specific.sum(axis=0) ** 2) - np.sum(specific ** 2)) / n_pairs
+        common = np.full((n, 1), np.sqrt(max(target_corr - specific_avg, 0.0)))
+        loadings = np.hstack([common, specific])
+
+        # Keep some idiosyncratic variance in every series (only binds for tiny n)
+        norms = np.sqrt(np.sum(loadings ** 2, axis=1, keepdims=True))
+        loadings *= np.minimum(1.0, 0.99 / np.maximum(norms, 1e-12))
+
+        return loadings
+
+    @staticmethod
+    def _loadings_average_correlation(loadings: np.ndarray) -> float:
+        """Average off-diagonal correlation implied by factor loadings, in O(n k)."""
+        n = len(loadings)
+        if n < 2:
+            return float("nan")
+        return float((np.sum(loadings.sum(axis=0) ** 2) - np.sum(loadings ** 2)) / (n * (n - 1)))
+
+    def _generate_factor_noise(self, loadings: np.ndarray) -> np.ndarray:
+        """
+        Draw correlated unit-variance noise from factor loadings in O(n k T).
+
+        Args:
+            loadings: n x k loadings from _generate_factor_loadings
+
+        Returns:
+            n_days x n noise (same layout as multivariate_normal output)
+        """
+        n, n_factors = loadings.shape
+        factors = np.random.randn(self.n_days, n_factors)
+        idiosyncratic = np.sqrt(1 - np.sum(loadings ** 2, axis=1))
+
+        return factors @ loadings.T + np.random.randn(self.n_days, n) * idiosyncratic
+
     def _generate_base_signals(self) -> Dict[str, np.ndarray]:
         """
         Generate correlated base signals that will be shared across series.
@@ -248,27 +334,141 @@ class ShoeSalesGenerator:
         include_weather: bool = False,
         sku_correlation_strength: float = 0.4,
         region_correlation_strength: float = 0.5,
-    ) -> pd.DataFrame:
+        noise_model: str = "full",
+        n_factors: int = 3,
+        return_cube: bool = False,
+    ) -> Union[pd.DataFrame, Tuple[pd.DataFrame, DemandCube]]:
         """
         Generate the full synthetic dataset.
 
         Args:
             include_weather: Include weather effects (temperature, precipitation)
-            sku_correlation_strength: How correlated are SKU sales (0-1)
-            region_correlation_strength: How correlated are regional sales (0-1)
+            sku_correlation_strength: How correlated are SKU sales (0-1); with
+                noise_model="factor" the target average pairwise correlation
+            region_correlation_strength: How correlated are regional sales (0-1);
+                same meaning as sku_correlation_strength
+            noise_model: "full" (random correlation matrix, O(n^3)) or "factor"
+                (k-factor loadings + idiosyncratic noise, O(n*k*T)) for large catalogues
+            n_factors: Number of factors k when noise_model="factor"
+            return_cube: Also return the simulated values as a DemandCube (what
+                generate_cube returns), e.g. for save_datasets' rollups
 
         Returns:
-            DataFrame with columns: date, sku, region, channel, units, price, revenue, etc.
+            DataFrame with columns: date, sku, region, channel, units, price, revenue, etc.;
+            (DataFrame, DemandCube) with return_cube
         """
         print(f"Generating synthetic shoe sales data from {self.start_date.date()} to {self.end_date.date()}...")
 
-        # Generate correlation matrices
-        self.sku_correlation = self._generate_correlation_matrix(
-            len(self.skus), sku_correlation_strength
+        signals = self._generate_signals(
+            sku_correlation_strength, region_correlation_strength, noise_model, n_factors
         )
-        self.region_correlation = self._generate_correlation_matrix(
-            len(self.regions), region_correlation_strength
+        units, price_series = self._simulate_units(**signals)
+        df = self._long_frame(units, price_series, signals["promo_effects"], signals["holiday_effects"])
+
+        print(f"Generated {len(df):,} rows across {self.n_days} days")
+        print(f"SKUs: {len(self.skus)}, Regions: {len(self.regions)}, Channels: {len(self.channels)}")
+
+        if return_cube:
+            return df, self._cube(units, price_series, signals["promo_effects"], signals["holiday_effects"])
+        return df
+
+    def generate_cube(
+        self,
+        sku_correlation_strength: float = 0.4,
+        region_correlation_strength: float = 0.5,
+        noise_model: str = "full",
+        n_factors: int = 3,
+    ) -> DemandCube:
+        """
+        Generate the dataset as a (measure x sku x region x channel x date) cube.
+
+        Same draws and values as generate (same seed and arguments), without
+        building the long frame; cube.to_frame() gives generate's rows.
+
+        Args:
+            sku_correlation_strength: See generate
+            region_correlation_strength: See generate
+            noise_model: See generate
+            n_factors: See generate
+
+        Returns:
+            DemandCube with measures units, price, revenue, promo_flag, holiday_flag
+            and a sku_family coordinate on the sku axis
+        """
+        signals = self._generate_signals(
+            sku_correlation_strength, region_correlation_strength, noise_model, n_factors
         )
+        units, price_series = self._simulate_units(**signals)
+        return self._cube(units, price_series, signals["promo_effects"], signals["holiday_effects"])
+
+    def _cube(
+        self,
+        units: np.ndarray,
+        price_series: np.ndarray,
+        promo_effects: np.ndarray,
+        holiday_effects: np.ndarray,
+    ) -> DemandCube:
+        """DemandCube of simulated (sku, region, channel, day) units, like _long_frame's rows."""
+        price = price_series[:, None, None, :]
+        values = np.empty((5,) + units.shape)
+        values[0] = units
+        values[1] = np.round(price, 2)
+        values[2] = np.round(units * price, 2)
+        values[3] = promo_effects > 0
+        values[4] = holiday_effects > 0
+
+        return DemandCube(
+            values,
+            ("measure", "sku", "region", "channel", "date"),
+            {
+                "measure": ["units", "price", "revenue", "promo_flag", "holiday_flag"],
+                "sku": [sku["sku"] for sku in self.skus],
+                "region": self.regions,
+                "channel": self.channels,
+                "date": self.dates,
+            },
+            aux={"sku_family": ("sku", [sku["family"] for sku in self.skus])},
+        )
+
+    def _generate_signals(
+        self,
+        sku_correlation_strength: float,
+        region_correlation_strength: float,
+        noise_model: str,
+        n_factors: int,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Draw everything shared across series: base signals, holidays, promos and shocks.
+
+        Args:
+            sku_correlation_strength: See generate
+            region_correlation_strength: See generate
+            noise_model: "full" or "factor" (see generate)
+            n_factors: Factors for noise_model="factor"
+
+        Returns:
+            Keyword arguments for _simulate_units (base_signals, holiday_effects,
+            promo_effects, sku_noise, region_noise)
+        """
+        if noise_model not in ("full", "factor"):
+            raise ValueError(f"noise_model must be 'full' or 'factor', got {noise_model!r}")
+
+        if noise_model == "full":
+            # Generate correlation matrices
+            self.sku_correlation = self._generate_correlation_matrix(
+                len(self.skus), sku_correlation_strength
+            )
+            self.region_correlation = self._generate_correlation_matrix(
+                len(self.regions), region_correlation_strength
+            )
+        else:
+            # Loadings only; the n x n matrices are never formed
+            self.sku_correlation = None
+            self.region_correlation = None
+            sku_loadings = self._generate_factor_loadings(len(self.skus), sku_correlation_strength, n_factors)
+            region_loadings = self._generate_factor_loadings(
+                len(self.regions), region_correlation_strength, n_factors
+            )
 
         # Generate base signals
         base_signals = self._generate_base_signals()
@@ -276,117 +476,245 @@ class ShoeSalesGenerator:
         promo_effects = self._generate_promo_campaigns(n_promos=25)
 
         # Generate correlated noise for SKUs and regions
-        sku_noise = np.random.multivariate_normal(
-            mean=np.zeros(len(self.skus)),
-            cov=self.sku_correlation,
-            size=self.n_days
-        )
+        if noise_model == "full":
+            sku_noise = np.random.multivariate_normal(
+                mean=np.zeros(len(self.skus)),
+                cov=self.sku_correlation,
+                size=self.n_days
+            )
+
+            region_noise = np.random.multivariate_normal(
+                mean=np.zeros(len(self.regions)),
+                cov=self.region_correlation,
+                size=self.n_days
+            )
+        else:
+            sku_noise = self._generate_factor_noise(sku_loadings)
+            region_noise = self._generate_factor_noise(region_loadings)
+
+            self.noise_correlation = {
+                "sku": {
+                    "target": sku_correlation_strength,
+                    "implied": self._loadings_average_correlation(sku_loadings),
+                    "realized": average_correlation(sku_noise),
+                },
+                "region": {
+                    "target": region_correlation_strength,
+                    "implied": self._loadings_average_correlation(region_loadings),
+                    "realized": average_correlation(region_noise),
+                },
+            }
+            for name, stats_ in self.noise_correlation.items():
+                print(f"{name.upper()} noise ({n_factors}-factor): average correlation target "
+                      f"{stats_['target']:.3f}, implied {stats_['implied']:.3f}, realized {stats_['realized']:.3f}")
 
-        region_noise = np.random.multivariate_normal(
-            mean=np.zeros(len(self.regions)),
-            cov=self.region_correlation,
-            size=self.n_days
-        )
+        return {
+            "base_signals": base_signals,
+            "holiday_effects": holiday_effects,
+            "promo_effects": promo_effects,
+            "sku_noise": sku_noise,
+            "region_noise": region_noise,
+        }
+
+    def generate_blocks(
+        self,
+        sku_correlation_strength: float = 0.4,
+        region_correlation_strength: float = 0.5,
+        noise_model: str = "full",
+        n_factors: int = 3,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Stream the dataset one (sku, region, channel) block at a time.
 
-        # Build dataset
-        rows = []
+        Series are simulated one SKU at a time, drawing the random stream in the
+        same order as generate, so concatenating the blocks gives generate's frame
+        (same seed and arguments). Besides the block being yielded, only one SKU's
+        (region x channel x day) cube and the (day x sku) shock matrix are held.
+
+        Args:
+            sku_correlation_strength: See generate
+            region_correlation_strength: See generate
+            noise_model: See generate
+            n_factors: See generate
+
+        Yields:
+            Long-format frame for one series (generate's columns and dtypes)
+        """
+        signals = self._generate_signals(
+            sku_correlation_strength, region_correlation_strength, noise_model, n_factors
+        )
+        sku_noise = signals.pop("sku_noise")
 
         for sku_idx, sku_info in enumerate(self.skus):
+            units, price_series = self._simulate_units(
+                **signals, sku_noise=sku_noise[:, [sku_idx]], skus=[sku_info]
+            )
             for region_idx, region in enumerate(self.regions):
-                for channel in self.channels:
-                    # Base parameters
-                    base_demand = sku_info["base_demand"]
-                    base_price = sku_info["base_price"]
-
-                    # Regional multipliers
-                    region_mult = {
-                        "North America": 1.0,
-                        "EMEA": 0.8,
-                        "APAC": 0.9,
-                        "LATAM": 0.6
-                    }[region]
-
-                    # Channel multipliers (Ecommerce growing)
-                    if channel == "Retail":
-                        channel_base = 0.5
-                        channel_trend = -0.0002  # Declining
-                        ecom_sensitivity = -0.3  # Negatively affected by ecom shift
-                    elif channel == "Ecommerce":
-                        channel_base = 0.35
-                        channel_trend = 0.0005  # Growing
-                        ecom_sensitivity = 1.2  # Benefits from ecom shift
-                    else:  # Wholesale
-                        channel_base = 0.15
-                        channel_trend = -0.0001
-                        ecom_sensitivity = 0.0
-
-                    # Generate price series (base price + fluctuations + promos)
-                    price_variation = 0.05 * np.sin(2 * np.pi * np.arange(self.n_days) / 365.25)
-                    promo_discount = 0.15 * (promo_effects > 0)  # 15% off during promos
-                    price_series = base_price * (1 + price_variation) * (1 - promo_discount)
-
-                    # Build demand signal with all components
-                    t = np.arange(self.n_days)
-                    demand = base_demand * np.ones(self.n_days)
-
-                    # Apply factors
-                    demand *= base_signals["global_trend"]
-                    demand *= base_signals["covid_shock"]
-                    demand *= region_mult
-                    demand *= (channel_base + channel_trend * t)
-                    demand *= (1 + base_signals["yearly_season"])
-                    demand *= (1 + base_signals["monthly_season"])
-                    demand *= (1 + base_signals["weekly_pattern"])
-                    demand *= (1 + holiday_effects)
-                    demand *= (1 + promo_effects)
-
-                    # Ecommerce shift effect
-                    demand *= (1 + ecom_sensitivity * (base_signals["ecom_shift"] - 1))
-
-                    # Apply price elasticity
-                    demand = self._apply_price_elasticity(
-                        demand, price_series, base_price, elasticity=-1.8
+                for channel_idx, channel in enumerate(self.channels):
+                    yield self._long_frame(
+                        units[:, region_idx:region_idx + 1, channel_idx:channel_idx + 1],
+                        price_series,
+                        signals["promo_effects"],
+                        signals["holiday_effects"],
+                        skus=[sku_info],
+                        regions=[region],
+                        channels=[channel],
                     )
 
-                    # Add correlated noise
-                    demand *= (1 + 0.15 * sku_noise[:, sku_idx])  # SKU-specific shocks
-                    demand *= (1 + 0.1 * region_noise[:, region_idx])  # Regional shocks
-
-                    # Add independent noise (daily fluctuations)
-                    demand *= (1 + 0.08 * np.random.randn(self.n_days))
-
-                    # Convert to integer units (can't sell fractional shoes)
-                    units = np.maximum(0, demand).astype(int)
-
-                    # Calculate revenue
-                    revenue = units * price_series
-
-                    # Add to dataset
-                    for i, date in enumerate(self.dates):
-                        rows.append({
-                            "date": date,
-                            "sku": sku_info["sku"],
-                            "sku_family": sku_info["family"],
-                            "region": region,
-                            "channel": channel,
-                            "units": units[i],
-                            "price": round(price_series[i], 2),
-                            "revenue": round(revenue[i], 2),
-                            "promo_flag": int(promo_effects[i] > 0),
-                            "holiday_flag": int(holiday_effects[i] > 0),
-                        })
-
-        df = pd.DataFrame(rows)
-        print(f"Generated {len(df):,} rows across {self.n_days} days")
-        print(f"SKUs: {len(self.skus)}, Regions: {len(self.regions)}, Channels: {len(self.channels)}")
+    def _simulate_units(
+        self,
+        base_signals: Dict[str, np.ndarray],
+        holiday_effects: np.ndarray,
+        promo_effects: np.ndarray,
+        sku_noise: np.ndarray,
+        region_noise: np.ndarray,
+        skus: Optional[List[Dict]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Simulate daily units for every (sku, region, channel) series at once.
 
-        return df
+        Factors are applied in the same order as a per-series loop and the daily
+        noise is drawn as one (sku, region, channel, day) block, which consumes the
+        random stream exactly like one draw per series in that order.
+
+        Args:
+            base_signals: Output of _generate_base_signals
+            holiday_effects: (day,) holiday lift
+            promo_effects: (day,) promotional lift
+            sku_noise: (day, sku) correlated SKU shocks
+            region_noise: (day, region) correlated regional shocks
+            skus: Catalogue entries to simulate (default: all), matching sku_noise columns
+
+        Returns:
+            (units (sku, region, channel, day) int64, price (sku, day))
+        """
+        skus = self.skus if skus is None else skus
+        t = np.arange(self.n_days)
+
+        # Regional multipliers
+        region_mult = {
+            "North America": 1.0,
+            "EMEA": 0.8,
+            "APAC": 0.9,
+            "LATAM": 0.6
+        }
+        # Channel (base share, trend, ecom sensitivity); Ecommerce growing, Retail declining
+        channel_params = {
+            "Retail": (0.5, -0.0002, -0.3),
+            "Ecommerce": (0.35, 0.0005, 1.2),
+            "Wholesale": (0.15, -0.0001, 0.0),
+        }
+
+        base_demand = np.array([sku["base_demand"] for sku in skus], dtype=float)[:, None, None, None]
+        base_price = np.array([sku["base_price"] for sku in skus], dtype=float)[:, None]
+        region_factor = np.array([region_mult[r] for r in self.regions])[None, :, None, None]
+        channel_base, channel_trend, ecom_sensitivity = (
+            np.array(values)[None, None, :, None] for values in zip(*(channel_params[c] for c in self.channels))
+        )
+
+        # Price series (base price + fluctuations + promos), one per SKU
+        price_variation = 0.05 * np.sin(2 * np.pi * t / 365.25)
+        promo_discount = 0.15 * (promo_effects > 0)  # 15% off during promos
+        price_series = base_price * (1 + price_variation) * (1 - promo_discount)
+
+        # Build demand signal with all components
+        demand = base_demand * np.ones(self.n_days)
+        demand = demand * base_signals["global_trend"]
+        demand = demand * base_signals["covid_shock"]
+        demand = demand * region_factor
+        demand = demand * (channel_base + channel_trend * t)
+        demand = demand * (1 + base_signals["yearly_season"])
+        demand = demand * (1 + base_signals["monthly_season"])
+        demand = demand * (1 + base_signals["weekly_pattern"])
+        demand = demand * (1 + holiday_effects)
+        demand = demand * (1 + promo_effects)
+
+        # Ecommerce shift effect
+        demand = demand * (1 + ecom_sensitivity * (base_signals["ecom_shift"] - 1))
+
+        # Apply price elasticity
+        demand = self._apply_price_elasticity(
+            demand, price_series[:, None, None, :], base_price[:, None, None], elasticity=-1.8
+        )
+
+        # Add correlated noise
+        demand *= (1 + 0.15 * sku_noise.T[:, None, None, :])  # SKU-specific shocks
+        demand *= (1 + 0.1 * region_noise.T[None, :, None, :])  # Regional shocks
+
+        # Add independent noise (daily fluctuations)
+        demand *= (1 + 0.08 * np.random.randn(*demand.shape))
+
+        # Convert to integer units (can't sell fractional shoes)
+        units = np.maximum(0, demand).astype(int)
+
+        return units, price_series
+
+    def _long_frame(
+        self,
+        units: np.ndarray,
+        price_series: np.ndarray,
+        promo_effects: np.ndarray,
+        holiday_effects: np.ndarray,
+        skus: Optional[List[Dict]] = None,
+        regions: Optional[List[str]] = None,
+        channels: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Long-format frame (one row per sku, region, channel, day) built from the cube.
+
+        Rows are ordered sku, region, channel, date (date fastest). Label columns
+        are categoricals, units int32 and flags int8.
+
+        Args:
+            units: (sku, region, channel, day) units
+            price_series: (sku, day) prices
+            promo_effects: (day,) promotional lift
+            holiday_effects: (day,) holiday lift
+            skus: Catalogue entries along the sku axis (default: all)
+            regions: Regions along the region axis (default: all)
+            channels: Channels along the channel axis (default: all)
+
+        Returns:
+            DataFrame with columns: date, sku, sku_family, region, channel, units,
+            price, revenue, promo_flag, holiday_flag
+        """
+        skus = self.skus if skus is None else skus
+        regions = self.regions if regions is None else regions
+        channels = self.channels if channels is None else channels
+        n_skus, n_regions, n_channels, n_days = units.shape
+        n_series = n_skus * n_regions * n_channels
+        per_sku = n_regions * n_channels * n_days
+
+        price = price_series[:, None, None, :]
+        revenue = units * price
+
+        def labels(positions: np.ndarray, values: List[str]) -> pd.Categorical:
+            # Sorted categories so groupby orders groups like the plain string columns did
+            categories = sorted(set(values))
+            codes = np.array([categories.index(v) for v in values])
+            return pd.Categorical.from_codes(codes[positions], categories=categories)
+
+        sku_positions = np.repeat(np.arange(n_skus), per_sku)
+
+        return pd.DataFrame({
+            "date": np.tile(self.dates.values, n_series),
+            "sku": labels(sku_positions, [sku["sku"] for sku in skus]),
+            "sku_family": labels(sku_positions, [sku["family"] for sku in skus]),
+            "region": labels(np.tile(np.repeat(np.arange(n_regions), n_channels * n_days), n_skus), regions),
+            "channel": labels(np.tile(np.repeat(np.arange(n_channels), n_days), n_skus * n_regions), channels),
+            "units": units.astype(np.int32).ravel(),
+            "price": np.broadcast_to(np.round(price, 2), units.shape).ravel(),
+            "revenue": np.round(revenue, 2).ravel(),
+            "promo_flag": np.tile((promo_effects > 0).astype(np.int8), n_series),
+            "holiday_flag": np.tile((holiday_effects > 0).astype(np.int8), n_series),
+        })
 
     def save_datasets(
         self,
         df: pd.DataFrame,
         output_dir: str = ".",
-        include_aggregates: bool = True
+        include_aggregates: bool = True,
+        cube: Optional[DemandCube] = None,
     ):
         """
         Save datasets to CSV files.
@@ -394,7 +722,10 @@ class ShoeSalesGenerator:
         Args:
             df: Generated dataframe
             output_dir: Directory to save files
-            include_aggregates: Also save weekly/monthly aggregates
+            include_aggregates: Also save weekly/monthly aggregates and the
+                rollups/ directory (see rollups.shoe_sales_rollups)
+            cube: The same data as a DemandCube (generate(return_cube=True));
+                rollups then read its arrays instead of re-scattering df
         """
         import os
         os.makedirs(output_dir, exist_ok=True)
@@ -404,46 +735,273 @@ class ShoeSalesGenerator:
         df.to_csv(daily_path, index=False)
         print(f"Saved daily data: {daily_path}")
 
+        # Every frequency x hierarchy level in one pass over the daily data
+        rollups = shoe_sales_rollups(df if cube is None else cube)
+
         if include_aggregates:
-            # Weekly aggregates
-            weekly = df.groupby([
-                pd.Grouper(key="date", freq="W"),
-                "sku_family", "region", "channel"
-            ]).agg({
-                "units": "sum",
-                "revenue": "sum",
-                "price": "mean",
-                "promo_flag": "max",
-            }).reset_index()
-
-            weekly_path = os.path.join(output_dir, "shoe_sales_weekly.csv")
-            weekly.to_csv(weekly_path, index=False)
-            print(f"Saved weekly data: {weekly_path}")
-
-            # Monthly aggregates
-            monthly = df.groupby([
-                pd.Grouper(key="date", freq="M"),
-                "sku_family", "region", "channel"
-            ]).agg({
-                "units": "sum",
-                "revenue": "sum",
-                "price": "mean",
-                "promo_flag": "max",
-            }).reset_index()
-
-            monthly_path = os.path.join(output_dir, "shoe_sales_monthly.csv")
-            monthly.to_csv(monthly_path, index=False)
-            print(f"Saved monthly data: {monthly_path}")
+            # Weekly / monthly by family x region x channel (the original aggregate files)
+            for freq, name in (("W", "weekly"), ("M", "monthly")):
+                path = os.path.join(output_dir, f"shoe_sales_{name}.csv")
+                rollups[(freq, ("sku_family", "region", "channel"))].to_csv(path, index=False)
+                print(f"Saved {name} data: {path}")
+
+            paths = save_rollups(rollups, output_dir, "shoe_sales")
+            print(f"Saved {len(paths)} rollups (daily/weekly/monthly x total/family/region/channel): "
+                  f"{paths[0].parent}")
+
+        daily_total = rollups[("D", ())]
+        print("\nDataset summary:")
+        print(f"  Date range: {daily_total['date'].iloc[0].date()} to {daily_total['date'].iloc[-1].date()}")
+        print(f"  Total units: {daily_total['units'].sum():,}")
+        print(f"  Total revenue: ${daily_total['revenue'].sum():,.2f}")
+        print(f"  Avg daily units: {daily_total['units'].mean():.0f}")
+
+
+    def save_partitioned(
+        self,
+        output_dir: str = ".",
+        sku_correlation_strength: float = 0.4,
+        region_correlation_strength: float = 0.5,
+        noise_model: str = "full",
+        n_factors: int = 3,
+    ) -> str:
+        """
+        Stream the daily data to a partitioned Parquet dataset, one file per series.
+
+        Layout is hive-style, <output_dir>/shoe_sales_daily/sku=.../region=.../channel=.../part-0.parquet,
+        so readers can load one partition without scanning the rest (see
+        read_partitioned). Blocks come from generate_blocks and are written as they
+        are produced, so peak memory doesn't grow with the number of series.
+        Requires pyarrow.
+
+        Args:
+            output_dir: Directory to write into (an existing shoe_sales_daily/ is replaced)
+            sku_correlation_strength: See generate
+            region_correlation_strength: See generate
+            noise_model: See generate
+            n_factors: See generate
+
+        Returns:
+            Path of the dataset directory
+        """
+        import os
+        import shutil
 
+        dataset_dir = os.path.join(output_dir, "shoe_sales_daily")
+        if os.path.exists(dataset_dir):
+            shutil.rmtree(dataset_dir)
+
+        print(f"Streaming synthetic shoe sales data from {self.start_date.date()} to {self.end_date.date()}...")
+
+        n_rows = 0
+        n_files = 0
+        total_units = 0
+        total_revenue = 0.0
+        daily_units = np.zeros(self.n_days)
+
+        blocks = self.generate_blocks(
+            sku_correlation_strength, region_correlation_strength, noise_model, n_factors
+        )
+        for block in blocks:
+            first = block.iloc[0]
+            partition_dir = os.path.join(
+                dataset_dir, *(f"{col}={quote(str(first[col]), safe='')}" for col in PARTITION_COLUMNS)
+            )
+            os.makedirs(partition_dir, exist_ok=True)
+            block.drop(columns=PARTITION_COLUMNS).to_parquet(
+                os.path.join(partition_dir, "part-0.parquet"), index=False
+            )
+
+            n_rows += len(block)
+            n_files += 1
+            total_units += int(block["units"].sum())
+            total_revenue += block["revenue"].sum()
+            daily_units += block["units"].values
+
+        print(f"Saved {n_rows:,} rows in {n_files} partitions: {dataset_dir}")
         print("\nDataset summary:")
-        print(f"  Date range: {df['date'].min().date()} to {df['date'].max().date()}")
-        print(f"  Total units: {df['units'].sum():,}")
-        print(f"  Total revenue: ${df['revenue'].sum():,.2f}")
-        print(f"  Avg daily units: {df.groupby('date')['units'].sum().mean():.0f}")
+        print(f"  Date range: {self.dates[0].date()} to {self.dates[-1].date()}")
+        print(f"  Total units: {total_units:,}")
+        print(f"  Total revenue: ${total_revenue:,.2f}")
+        print(f"  Avg daily units: {daily_units.mean():.0f}")
+
+        return dataset_dir
+
+
+def read_partitioned(
+    dataset_dir: str,
+    sku: Optional[str] = None,
+    region: Optional[str] = None,
+    channel: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Load (part of) a dataset written by ShoeSalesGenerator.save_partitioned.
+
+    Filters on partition columns prune whole directories, so reading one series
+    only opens that series' file.
+
+    Args:
+        dataset_dir: Dataset directory returned by save_partitioned
+        sku: Only this SKU
+        region: Only this region
+        channel: Only this channel
+        columns: Columns to load (default: all, partition columns included)
+
+    Returns:
+        Long-format frame; sku/region/channel come back as categoricals
+    """
+    selected = {"sku": sku, "region": region, "channel": channel}
+    filters = [(col, "==", value) for col, value in selected.items() if value is not None]
+
+    df = pd.read_parquet(dataset_dir, columns=columns, filters=filters or None)
+    if "date" in df.columns:
+        sort_cols = [c for c in ["sku", "region", "channel", "date"] if c in df.columns]
+        df = df.sort_values(sort_cols, kind="stable").reset_index(drop=True)
+    return df
+
+
+def average_correlation(noise: np.ndarray) -> float:
+    """
+    Average off-diagonal sample correlation between the columns of noise, in O(n T).
+
+    With standardized columns Z, the correlation matrix sums to |Z 1|^2 / T and its
+    diagonal to n, so the n x n matrix is never formed.
+
+    Args:
+        noise: T x n array (one column per series)
+
+    Returns:
+        Mean correlation over all pairs of distinct columns
+    """
+    n_obs, n = noise.shape
+    if n < 2:
+        return float("nan")
+    z = (noise - noise.mean(axis=0)) / noise.std(axis=0)
+    row_sums = z.sum(axis=1)
+    return float((row_sums @ row_sums / n_obs - n) / (n * (n - 1)))
+
+
+def _rows_long_frame(
+    generator: ShoeSalesGenerator,
+    units: np.ndarray,
+    price_series: np.ndarray,
+    promo_effects: np.ndarray,
+    holiday_effects: np.ndarray,
+) -> pd.DataFrame:
+    """Reference long-format construction: one dict per row (the pre-vectorized path)."""
+    revenue = units * price_series[:, None, None, :]
+    rows = []
+
+    for sku_idx, sku_info in enumerate(generator.skus):
+        for region_idx, region in enumerate(generator.regions):
+            for channel_idx, channel in enumerate(generator.channels):
+                for i, date in enumerate(generator.dates):
+                    rows.append({
+                        "date": date,
+                        "sku": sku_info["sku"],
+                        "sku_family": sku_info["family"],
+                        "region": region,
+                        "channel": channel,
+                        "units": units[sku_idx, region_idx, channel_idx, i],
+                        "price": round(price_series[sku_idx, i], 2),
+                        "revenue": round(revenue[sku_idx, region_idx, channel_idx, i], 2),
+                        "promo_flag": int(promo_effects[i] > 0),
+                        "holiday_flag": int(holiday_effects[i] > 0),
+                    })
+
+    return pd.DataFrame(rows)
+
+
+def benchmark_long_frame(sku_counts: Tuple[int, ...] = (5, 20), seed: int = 42) -> pd.DataFrame:
+    """
+    Time and size the long-format construction, dict rows vs the vectorized cube.
+
+    The 5-SKU catalogue is replicated to reach each SKU count. Both builders get
+    the same simulated cube and must produce the same values.
+
+    Args:
+        sku_counts: Catalogue sizes to benchmark
+        seed: Random seed
+
+    Returns:
+        DataFrame with rows, build time (s), peak allocation (MB) and frame
+        memory (MB) per builder and SKU count
+    """
+    results = []
+
+    for n_skus in sku_counts:
+        generator = ShoeSalesGenerator(seed=seed)
+        catalogue = generator.skus
+        generator.skus = [
+            {**catalogue[k % len(catalogue)], "sku": f"{catalogue[k % len(catalogue)]['sku']}-{k // len(catalogue)}"}
+            for k in range(n_skus)
+        ]
+
+        base_signals = generator._generate_base_signals()
+        holiday_effects = generator._generate_holiday_effects()
+        promo_effects = generator._generate_promo_campaigns(n_promos=25)
+        sku_noise = np.random.randn(generator.n_days, n_skus)
+        region_noise = np.random.randn(generator.n_days, len(generator.regions))
+        units, price_series = generator._simulate_units(
+            base_signals, holiday_effects, promo_effects, sku_noise, region_noise
+        )
+        args = (units, price_series, promo_effects, holiday_effects)
+
+        frames = {}
+        for builder, build in (("rows", lambda: _rows_long_frame(generator, *args)),
+                               ("vectorized", lambda: generator._long_frame(*args))):
+            start = time.perf_counter()
+            frames[builder] = build()
+            elapsed = time.perf_counter() - start
+
+            # Separate traced pass: tracemalloc slows allocation-heavy code a lot
+            tracemalloc.start()
+            build()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results.append({
+                "n_skus": n_skus,
+                "builder": builder,
+                "rows": len(frames[builder]),
+                "build_s": elapsed,
+                "peak_alloc_mb": peak / 1e6,
+                "frame_mb": frames[builder].memory_usage(deep=True).sum() / 1e6,
+            })
+
+        reference, vectorized = frames["rows"], frames["vectorized"]
+        for col in reference.columns:
+            if not np.array_equal(reference[col].values, vectorized[col].astype(reference[col].dtype).values):
+                raise AssertionError(f"Column {col} differs between builders at {n_skus} SKUs")
+
+    results = pd.DataFrame(results)
+    print(results.round(3).to_string(index=False))
+
+    timing = results.pivot(index="n_skus", columns="builder", values=["build_s", "frame_mb"])
+    for n_skus, row in timing.iterrows():
+        print(f"{n_skus} SKUs: {row[('build_s', 'rows')] / row[('build_s', 'vectorized')]:.0f}x faster, "
+              f"{row[('frame_mb', 'rows')] / row[('frame_mb', 'vectorized')]:.1f}x less memory")
+
+    return results
 
 
 # Example usage
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic shoe sales data")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Benchmark long-format construction (dict rows vs vectorized) and exit")
+    parser.add_argument("--noise-model", default="full", choices=["full", "factor"],
+                        help="Correlated noise: full correlation matrix or k-factor model (large catalogues)")
+    parser.add_argument("--n-factors", type=int, default=3, help="Factors for --noise-model factor")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="Stream daily data to a partitioned Parquet dataset instead of in-memory CSVs")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_long_frame()
+        raise SystemExit
+
     # Create generator
     generator = ShoeSalesGenerator(
         start_date="2019-01-01",
@@ -451,14 +1009,29 @@ if __name__ == "__main__":
         seed=42
     )
 
+    if args.partitioned:
+        dataset_dir = generator.save_partitioned(
+            output_dir="./data",
+            sku_correlation_strength=0.4,
+            region_correlation_strength=0.5,
+            noise_model=args.noise_model,
+            n_factors=args.n_factors,
+        )
+        sample = read_partitioned(dataset_dir, sku="RUN-100", region="EMEA", channel="Ecommerce")
+        print(f"\nRead back one partition: {len(sample):,} rows for RUN-100 / EMEA / Ecommerce")
+        raise SystemExit
+
     # Generate data with correlations
-    df = generator.generate(
+    df, cube = generator.generate(
         sku_correlation_strength=0.4,  # SKUs are moderately correlated
         region_correlation_strength=0.5,  # Regions are strongly correlated
+        noise_model=args.noise_model,
+        n_factors=args.n_factors,
+        return_cube=True,
     )
 
-    # Save to files
-    generator.save_datasets(df, output_dir="./data", include_aggregates=True)
+    # Save to files (rollups straight from the simulated cube)
+    generator.save_datasets(df, output_dir="./data", include_aggregates=True, cube=cube)
 
     # Show some stats
     print("\n" + "="*60)
@@ -466,11 +1039,11 @@ if __name__ == "__main__":
     print("="*60)
 
     # Compute correlation between two SKUs
-    pivot = df.groupby(['date', 'sku'])['units'].sum().unstack()
+    pivot = df.groupby(['date', 'sku'], observed=True)['units'].sum().unstack()
     print("\nSKU correlations (daily units):")
     print(pivot.corr().round(2))
 
     # Channel correlation
-    pivot_channel = df.groupby(['date', 'channel'])['units'].sum().unstack()
+    pivot_channel = df.groupby(['date', 'channel'], observed=True)['units'].sum().unstack()
     print("\nChannel correlations (daily units):")
     print(pivot_channel.corr().round(2))
@@ -10,6 +10,10 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
+from typing import Optional, Union
+
+from demand_cube import DemandCube
+from rollups import load_rollup
 
 sns.set_style("whitegrid")
 plt.rcParams['figure.figsize'] = (14, 8)
@@ -42,11 +46,15 @@ def plot_segment_overview(segment_data: dict, save_path: Path):
 
     if segment_data.get('prophet') and segment_data['prophet'].get('yhat'):
         yhat = np.array(segment_data['prophet']['yhat'])
-        yhat_lower = np.array(segment_data['prophet']['yhat_lower'])
-        yhat_upper = np.array(segment_data['prophet']['yhat_upper'])
+        # Bounds are null when the fit skipped intervals (interval scope 'none', 0 samples)
+        yhat_lower = np.array(segment_data['prophet']['yhat_lower'], dtype=float)
+        yhat_upper = np.array(segment_data['prophet']['yhat_upper'], dtype=float)
 
         ax.plot(dates, yhat, label='Prophet Forecast', color='blue', alpha=0.6, linewidth=1.5)
-        ax.fill_between(dates, yhat_lower, yhat_upper, alpha=0.2, color='blue', label='95% CI')
+        has_interval = ~(np.isnan(yhat_lower) | np.isnan(yhat_upper))
+        if has_interval.any():
+            ax.fill_between(dates, yhat_lower, yhat_upper, where=has_interval,
+                            alpha=0.2, color='blue', label='95% CI')
 
     ax.set_ylabel('Units (pairs)', fontsize=11)
     ax.set_title('Demand: Actual vs Forecast', fontsize=12)
@@ -156,9 +164,15 @@ def plot_components_detail(segment_data: dict, save_path: Path):
     print(f"  Saved components: {save_path}")
 
 
-def plot_inventory_analysis(segment_data: dict, save_path: Path):
+def plot_inventory_analysis(segment_data: dict, save_path: Path, weekly: Optional[pd.DataFrame] = None):
     """
     Plot inventory flow and stockout analysis.
+
+    Args:
+        segment_data: Segment dict
+        save_path: Output image
+        weekly: Precomputed weekly region x channel rollup (rollups.load_rollup);
+            the weekly stockout rate is aggregated from the daily flags if omitted
     """
     if not segment_data['meta'].get('inventory_cap', True):
         print("  Skipping inventory plot (cap disabled)")
@@ -194,11 +208,18 @@ def plot_inventory_analysis(segment_data: dict, save_path: Path):
     ax = axes[1]
 
     # Weekly stockout rate
-    df = pd.DataFrame({'date': dates, 'stockout': stockout_flag})
-    df['week'] = pd.to_datetime(df['date']).dt.to_period('W')
-    weekly_stockout_rate = df.groupby('week')['stockout'].mean()
+    meta = segment_data['meta']
+    if weekly is not None:
+        rows = weekly[(weekly['region'] == meta['region']) & (weekly['channel'] == meta['channel'])]
+        # Rollup weeks are labelled by their last day (Sunday)
+        week_dates = rows['date'] - pd.Timedelta(days=6)
+        weekly_stockout_rate = rows['stockout_rate']
+    else:
+        df = pd.DataFrame({'date': dates, 'stockout': stockout_flag})
+        df['week'] = pd.to_datetime(df['date']).dt.to_period('W')
+        weekly_stockout_rate = df.groupby('week')['stockout'].mean()
+        week_dates = [period.start_time for period in weekly_stockout_rate.index]
 
-    week_dates = [period.start_time for period in weekly_stockout_rate.index]
     ax.bar(week_dates, weekly_stockout_rate.values, width=5,
            color='red', alpha=0.6, label='Weekly Stockout Rate')
 
@@ -215,19 +236,28 @@ def plot_inventory_analysis(segment_data: dict, save_path: Path):
     print(f"  Saved inventory: {save_path}")
 
 
-def plot_correlation_analysis(segments_data: list, save_path: Path):
+def plot_correlation_analysis(segments_data: Union[list, DemandCube], save_path: Path):
     """
     Plot cross-segment correlations.
+
+    Args:
+        segments_data: Segment dicts or a DemandCube (DemandCube.from_segments)
+        save_path: Output image
     """
-    # Extract daily units for all segments
-    segment_names = []
-    units_matrix = []
+    if isinstance(segments_data, DemandCube):
+        # (date x region/channel) straight from the cube; segments absent from it are NaN
+        units_df = segments_data.sel(measure='units').wide().dropna(axis=1, how='all')
+        units_df.columns = [f"AirJordan_{region}_{channel}" for region, channel in units_df.columns]
+    else:
+        # Extract daily units for all segments
+        segment_names = []
+        units_matrix = []
 
-    for seg in segments_data:
-        segment_names.append(seg['meta']['segment'])
-        units_matrix.append(seg['observed']['units'])
+        for seg in segments_data:
+            segment_names.append(seg['meta']['segment'])
+            units_matrix.append(seg['observed']['units'])
 
-    units_df = pd.DataFrame(units_matrix, index=segment_names).T
+        units_df = pd.DataFrame(units_matrix, index=segment_names).T
 
     # Compute correlation
     corr_matrix = units_df.corr()
@@ -263,6 +293,12 @@ def main():
     print(f"Found {len(json_files)} segments")
     print("="*60)
 
+    # Precomputed weekly rollup from shoe_demand_generator.py (older data dirs may lack it)
+    try:
+        weekly = load_rollup(data_dir, "airjordan", "W", ("region", "channel"))
+    except FileNotFoundError:
+        weekly = None
+
     segments_data = []
 
     for json_file in sorted(json_files):
@@ -279,11 +315,11 @@ def main():
         plot_components_detail(segment_data, plots_dir / f"{segment_name}_components.png")
 
         # Inventory
-        plot_inventory_analysis(segment_data, plots_dir / f"{segment_name}_inventory.png")
+        plot_inventory_analysis(segment_data, plots_dir / f"{segment_name}_inventory.png", weekly)
 
     # Cross-segment correlation
     print(f"\nPlotting cross-segment analysis...")
-    plot_correlation_analysis(segments_data, plots_dir / "segment_correlations.png")
+    plot_correlation_analysis(DemandCube.from_segments(segments_data), plots_dir / "segment_correlations.png")
 
     print("\n" + "="*60)
     print(f"✓ All plots saved to {plots_dir.absolute()}")